@@ -1,6 +1,5 @@
 import tkinter as tk
 from tkinter import messagebox, font, ttk
-import copy
 import math
 import random
 import threading
@@ -8,98 +7,314 @@ import time
 import os
 import subprocess
 import json
+import multiprocessing
+import queue
+import re
 from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 
 class GoBoard:
+    # Zobrist 随机数表按棋盘大小缓存，固定种子保证不同进程/实例间哈希一致
+    _zobrist_tables = {}
+
     def __init__(self, size=19):
         self.size = size
-        self.board = [[None for _ in range(size)] for _ in range(size)]
-        self.last_board = None  # 用于检测劫的情况
         self.black_captures = 0
         self.white_captures = 0
         self.move_history = []  # 记录落子历史
-        
+
+        # 扁平下标 p = row * size + col 的相邻点表，避免每次落子重复做边界判断
+        self.neighbors = []
+        for p in range(size * size):
+            r, c = divmod(p, size)
+            self.neighbors.append(tuple(
+                nr * size + nc
+                for nr, nc in [(r-1, c), (r+1, c), (r, c-1), (r, c+1)]
+                if 0 <= nr < size and 0 <= nc < size
+            ))
+        self.zobrist = self._get_zobrist_table(size)
+        self._clear_state()
+
+    @classmethod
+    def _get_zobrist_table(cls, size):
+        """获取指定大小棋盘的Zobrist随机数表"""
+        if size not in cls._zobrist_tables:
+            rng = random.Random(size)
+            cls._zobrist_tables[size] = {
+                'black': [rng.getrandbits(64) for _ in range(size * size)],
+                'white': [rng.getrandbits(64) for _ in range(size * size)],
+            }
+        return cls._zobrist_tables[size]
+
+    def _clear_state(self):
+        """清空紧凑棋盘表示"""
+        n = self.size * self.size
+        self.board = [[None for _ in range(self.size)] for _ in range(self.size)]  # 供界面读取的二维视图，随落子增量同步
+        self.cells = [None] * n           # 扁平棋盘
+        self.parent = list(range(n))      # 并查集，棋块根节点
+        self.group_stones = {}            # 根节点 -> 棋块所有棋子
+        self.group_libs = {}              # 根节点 -> 棋块的气（集合）
+        self.hash = 0                     # 当前局面的Zobrist哈希
+        self.position_hashes = {0}        # 历史局面哈希，用于全局同形（positional superko）检测
+        self.ko_point = None              # 当前的劫争点（仅作提示，合法性以全局同形为准）
+
+    def find(self, p):
+        """并查集查找棋块根节点（路径减半）"""
+        parent = self.parent
+        while parent[p] != p:
+            parent[p] = parent[parent[p]]
+            p = parent[p]
+        return p
+
+    def _union(self, a, b):
+        """合并两个同色棋块，小块并入大块"""
+        ra, rb = self.find(a), self.find(b)
+        if ra == rb:
+            return ra
+        if len(self.group_stones[ra]) < len(self.group_stones[rb]):
+            ra, rb = rb, ra
+        self.parent[rb] = ra
+        self.group_stones[ra].extend(self.group_stones.pop(rb))
+        self.group_libs[ra] |= self.group_libs.pop(rb)
+        return ra
+
+    def _set_cell(self, p, color):
+        """修改一个交叉点，同时维护二维视图和哈希"""
+        old = self.cells[p]
+        if old is not None:
+            self.hash ^= self.zobrist[old][p]
+        if color is not None:
+            self.hash ^= self.zobrist[color][p]
+        self.cells[p] = color
+        r, c = divmod(p, self.size)
+        self.board[r][c] = color
+
+    def _remove_group(self, root):
+        """提走整个棋块，并把空出的点加回相邻棋块的气"""
+        stones = self.group_stones.pop(root)
+        del self.group_libs[root]
+        for s in stones:
+            self._set_cell(s, None)
+            self.parent[s] = s
+        for s in stones:
+            for q in self.neighbors[s]:
+                if self.cells[q] is not None:
+                    self.group_libs[self.find(q)].add(s)
+        return stones
+
+    def _check_move(self, p, color):
+        """不修改棋盘地检查落子合法性，合法时返回将被提走的棋块根节点列表，否则返回None"""
+        if self.cells[p] is not None:
+            return None
+        opponent = 'black' if color == 'white' else 'white'
+        captured_roots = []
+        has_liberty = False
+        new_hash = self.hash ^ self.zobrist[color][p]
+        for q in self.neighbors[p]:
+            stone = self.cells[q]
+            if stone is None:
+                has_liberty = True
+                continue
+            root = self.find(q)
+            libs = self.group_libs[root]
+            if stone == color:
+                if len(libs) > 1:
+                    has_liberty = True
+            elif len(libs) == 1 and root not in captured_roots:
+                captured_roots.append(root)
+                for s in self.group_stones[root]:
+                    new_hash ^= self.zobrist[opponent][s]
+        # 自杀规则
+        if not captured_roots and not has_liberty:
+            return None
+        # 全局同形（包含普通劫）
+        if new_hash in self.position_hashes:
+            return None
+        return captured_roots
+
+    def is_legal(self, row, col, color):
+        """判断落子是否合法（不修改棋盘）"""
+        if not (0 <= row < self.size and 0 <= col < self.size):
+            return False
+        return self._check_move(row * self.size + col, color) is not None
+
     def place_stone(self, row, col, color):
         """尝试在指定位置放置棋子，返回是否成功放置"""
-        # 检查位置是否为空
-        if not (0 <= row < self.size and 0 <= col < self.size) or self.board[row][col] is not None:
-            return False
-            
-        # 备份当前状态用于劫争检测
-        old_board = copy.deepcopy(self.board)
-        old_black_captures = self.black_captures
-        old_white_captures = self.white_captures
-            
-        # 临时放置棋子
-        self.board[row][col] = color
-        
-        # 检查并移除被吃掉的棋子
+        return self.play(row, col, color) is not None
+
+    def play(self, row, col, color):
+        """落子并返回可供undo使用的差异记录，不合法时返回None
+        差异记录: (落子点, 颜色, 被提棋子, 之前的劫争点, 之前的黑方提子数, 之前的白方提子数)
+        """
+        # 检查位置是否在棋盘内
+        if not (0 <= row < self.size and 0 <= col < self.size):
+            return None
+        return self.play_point(row * self.size + col, color)
+
+    def play_point(self, p, color):
+        """按扁平下标落子，供搜索引擎直接调用"""
+        captured_roots = self._check_move(p, color)
+        if captured_roots is None:
+            return None
+        record_head = (p, color)
+        record_tail = (self.ko_point, self.black_captures, self.white_captures)
+
+        # 放置棋子，单子成块
+        self._set_cell(p, color)
+        self.parent[p] = p
+        self.group_stones[p] = [p]
+        self.group_libs[p] = {q for q in self.neighbors[p] if self.cells[q] is None}
+
+        # 与相邻己方棋块合并，相邻对方棋块减少一气
+        for q in self.neighbors[p]:
+            stone = self.cells[q]
+            if stone == color:
+                self._union(p, q)
+            elif stone is not None:
+                self.group_libs[self.find(q)].discard(p)
+        root = self.find(p)
+        self.group_libs[root].discard(p)
+
+        # 执行提子
         captured = []
-        for r, c in [(row-1, col), (row+1, col), (row, col-1), (row, col+1)]:
-            if 0 <= r < self.size and 0 <= c < self.size and self.board[r][c] == ('black' if color == 'white' else 'white'):
-                group, liberties = self.find_group_and_liberties(r, c)
-                if not liberties:
-                    captured.extend(group)
-        
+        for captured_root in captured_roots:
+            captured.extend(self._remove_group(captured_root))
+
         # 更新提子数量
         if color == 'black':
             self.black_captures += len(captured)
         else:
             self.white_captures += len(captured)
-            
-        # 执行提子
-        for r, c in captured:
-            self.board[r][c] = None
-            
-        # 如果没有吃子，检查自己的气
-        if not captured:
-            group, liberties = self.find_group_and_liberties(row, col)
-            if not liberties:
-                # 自杀规则，撤销落子
-                self.board = old_board
-                self.black_captures = old_black_captures
-                self.white_captures = old_white_captures
-                return False
-                
-        # 检查劫规则
-        if self.last_board and self.board == self.last_board:
-            # 违反劫规则，撤销落子
-            self.board = old_board
-            self.black_captures = old_black_captures
-            self.white_captures = old_white_captures
-            return False
-            
+
+        # 单子提单子时记录劫争点
+        if len(captured) == 1 and len(self.group_stones[root]) == 1 and len(self.group_libs[root]) == 1:
+            self.ko_point = captured[0]
+        else:
+            self.ko_point = None
+
+        self.position_hashes.add(self.hash)
+
         # 记录落子历史
-        self.move_history.append((row, col, color))
-        
-        self.last_board = copy.deepcopy(old_board)
-        return True
-        
+        self.move_history.append(divmod(p, self.size) + (color,))
+        return record_head + (captured,) + record_tail
+
+    def undo(self, record):
+        """撤销play返回的那一手，只处理该手涉及的棋块"""
+        p, color, captured, ko_point, black_captures, white_captures = record
+        opponent = 'black' if color == 'white' else 'white'
+        self.position_hashes.discard(self.hash)
+
+        # 拆掉落子所在的棋块
+        root = self.find(p)
+        stones = self.group_stones.pop(root)
+        del self.group_libs[root]
+        for s in stones:
+            self.parent[s] = s
+        self._set_cell(p, None)
+
+        # 放回被提的棋子
+        for s in captured:
+            self._set_cell(s, opponent)
+
+        # 重新建立受影响的棋块：落子点两侧被拆开的己方棋块、被提回的对方棋块
+        rebuilt = set()
+        for q in self.neighbors[p]:
+            if self.cells[q] == color and q not in rebuilt:
+                rebuilt.update(self._rebuild_group(q))
+        for s in captured:
+            if s not in rebuilt:
+                rebuilt.update(self._rebuild_group(s))
+
+        # 其余相邻棋块的气：落子点重新成为气，被提回的点不再是气
+        for q in self.neighbors[p]:
+            if self.cells[q] == opponent:
+                self.group_libs[self.find(q)].add(p)
+        for s in captured:
+            for q in self.neighbors[s]:
+                if self.cells[q] == color:
+                    self.group_libs[self.find(q)].discard(s)
+
+        self.ko_point = ko_point
+        self.black_captures = black_captures
+        self.white_captures = white_captures
+        self.move_history.pop()
+
+    def _rebuild_group(self, start):
+        """从start出发泛洪重建一个棋块及其气，返回棋块的棋子"""
+        color = self.cells[start]
+        stones = [start]
+        libs = set()
+        seen = {start}
+        i = 0
+        while i < len(stones):
+            s = stones[i]
+            i += 1
+            self.parent[s] = start
+            for q in self.neighbors[s]:
+                stone = self.cells[q]
+                if stone is None:
+                    libs.add(q)
+                elif stone == color and q not in seen:
+                    seen.add(q)
+                    stones.append(q)
+        self.group_stones[start] = stones
+        self.group_libs[start] = libs
+        return stones
+
     def find_group_and_liberties(self, row, col):
         """查找与给定棋子相连的所有棋子（一个组）以及它们的气"""
-        color = self.board[row][col]
-        if color is None:
+        p = row * self.size + col
+        if self.cells[p] is None:
             return [], []
-            
-        visited = set()
-        liberties = set()
-        
-        def dfs(r, c):
-            if (r, c) in visited:
-                return
-                
-            visited.add((r, c))
-            
-            for nr, nc in [(r-1, c), (r+1, c), (r, c-1), (r, c+1)]:
-                if 0 <= nr < self.size and 0 <= nc < self.size:
-                    if self.board[nr][nc] is None:
-                        liberties.add((nr, nc))
-                    elif self.board[nr][nc] == color:
-                        dfs(nr, nc)
-        
-        dfs(row, col)
-        return list(visited), list(liberties)
-        
+        root = self.find(p)
+        size = self.size
+        group = [divmod(s, size) for s in self.group_stones[root]]
+        liberties = [divmod(s, size) for s in self.group_libs[root]]
+        return group, liberties
+
+    def copy(self):
+        """复制棋盘（只复制紧凑表示，不做深拷贝）"""
+        new = GoBoard.__new__(GoBoard)
+        new.size = self.size
+        new.black_captures = self.black_captures
+        new.white_captures = self.white_captures
+        new.move_history = self.move_history.copy()
+        new.neighbors = self.neighbors
+        new.zobrist = self.zobrist
+        new.board = [row[:] for row in self.board]
+        new.cells = self.cells[:]
+        new.parent = self.parent[:]
+        new.group_stones = {root: stones[:] for root, stones in self.group_stones.items()}
+        new.group_libs = {root: set(libs) for root, libs in self.group_libs.items()}
+        new.hash = self.hash
+        new.position_hashes = set(self.position_hashes)
+        new.ko_point = self.ko_point
+        return new
+        
+    def to_compact(self):
+        """序列化为紧凑的可pickle元组，用于发送给工作进程"""
+        cells = ''.join('.' if stone is None else stone[0] for stone in self.cells)
+        return (self.size, cells, self.move_history, self.black_captures, self.white_captures,
+                self.ko_point, tuple(self.position_hashes))
+
+    @classmethod
+    def from_compact(cls, data):
+        """由to_compact的结果重建棋盘"""
+        size, cells, move_history, black_captures, white_captures, ko_point, position_hashes = data
+        board = cls(size)
+        for p, ch in enumerate(cells):
+            if ch != '.':
+                board._set_cell(p, 'black' if ch == 'b' else 'white')
+        for p in range(size * size):
+            if board.cells[p] is not None and p not in board.group_stones and board.parent[p] == p:
+                board._rebuild_group(p)
+        board.move_history = list(move_history)
+        board.black_captures = black_captures
+        board.white_captures = white_captures
+        board.ko_point = ko_point
+        board.position_hashes = set(position_hashes)
+        return board
+
     def count_territory(self):
         """计算双方领地（粗略计算，不考虑死子）"""
         black_territory = 0
@@ -157,8 +372,7 @@ class GoBoard:
 
     def reset(self):
         """重置棋盘状态"""
-        self.board = [[None for _ in range(self.size)] for _ in range(self.size)]
-        self.last_board = None
+        self._clear_state()
         self.black_captures = 0
         self.white_captures = 0
         self.move_history = []
@@ -166,24 +380,10 @@ class GoBoard:
     def get_valid_moves(self, color):
         """获取所有合法落子点"""
         valid_moves = []
-        for r in range(self.size):
-            for c in range(self.size):
-                if self.board[r][c] is None:
-                    # 临时尝试放子
-                    board_copy = copy.deepcopy(self.board)
-                    black_captures_copy = self.black_captures
-                    white_captures_copy = self.white_captures
-                    last_board_copy = self.last_board
-                    move_history_copy = self.move_history.copy()
-                    
-                    if self.place_stone(r, c, color):
-                        valid_moves.append((r, c))
-                        # 还原棋盘
-                        self.board = board_copy
-                        self.black_captures = black_captures_copy
-                        self.white_captures = white_captures_copy
-                        self.last_board = last_board_copy
-                        self.move_history = move_history_copy
+        for p in range(self.size * self.size):
+            # 只做合法性检查，不需要临时落子再还原
+            if self.cells[p] is None and self._check_move(p, color) is not None:
+                valid_moves.append(divmod(p, self.size))
         
         return valid_moves
     
@@ -207,18 +407,21 @@ class GoBoard:
     
     def evaluate_move_advanced(self, row, col, color, difficulty):
         """高级落子评估函数"""
-        # 备份棋盘状态
-        board_copy = copy.deepcopy(self.board)
         black_captures_copy = self.black_captures
         white_captures_copy = self.white_captures
-        last_board_copy = self.last_board
-        move_history_copy = self.move_history.copy()
         
-        # 尝试落子
-        if not self.place_stone(row, col, color):
+        # 尝试落子，评估结束后用undo撤销
+        record = self.play(row, col, color)
+        if record is None:
             # 无效落子
             return float('-inf')
-        
+        try:
+            return self._score_move(row, col, color, difficulty, black_captures_copy, white_captures_copy)
+        finally:
+            self.undo(record)
+
+    def _score_move(self, row, col, color, difficulty, black_captures_copy, white_captures_copy):
+        """在已落子的局面上计算该手的评分"""
         score = 0
         
         # 1. 基础评分 - 所有难度级别都考虑
@@ -342,19 +545,15 @@ class GoBoard:
                             own_stones_nearby += 1
                 score += own_stones_nearby * 0.5
         
-        # 恢复棋盘状态
-        self.board = board_copy
-        self.black_captures = black_captures_copy
-        self.white_captures = white_captures_copy
-        self.last_board = last_board_copy
-        self.move_history = move_history_copy
-        
         return score
         
     def ai_make_move(self, color, difficulty=1):
         """AI选择落子位置
-        difficulty: 0-简单, 1-中等, 2-困难
+        difficulty: 0-简单, 1-中等, 2-困难, 3-专家（蒙特卡洛树搜索）
         """
+        if difficulty >= 3:
+            return MCTSEngine().get_move(self, color)
+        
         valid_moves = self.get_valid_moves(color)
         if not valid_moves:
             return None  # 无处可下，选择跳过
@@ -399,12 +598,348 @@ class GoBoard:
                 return sorted_moves[random.randint(0, top_n - 1)][0]
 
 
+class MCTSNode:
+    """蒙特卡洛搜索树节点"""
+    __slots__ = ('move', 'parent', 'color', 'children', 'untried', 'visits', 'wins')
+
+    def __init__(self, move, parent, color):
+        self.move = move          # 到达该节点的落子（扁平下标，None表示跳过）
+        self.parent = parent
+        self.color = color        # 该节点轮到落子的一方
+        self.children = {}
+        self.untried = None       # 尚未展开的落子，首次访问时生成
+        self.visits = 0
+        self.wins = 0.0           # 以“走到该节点的一方”视角统计的胜局数
+
+
+class MCTSEngine:
+    """基于UCT的蒙特卡洛树搜索AI（专家难度）
+    time_limit: 每步思考的时间预算（秒）
+    max_playouts: 每步模拟局数上限，为None时只受时间限制
+    min_playouts: 根节点至少有这么多次访问（含复用子树的访问）后才响应提前结束信号，保证总有可用的结果
+    """
+    def __init__(self, time_limit=5.0, max_playouts=None, exploration=1.0, komi=6.5, min_playouts=32):
+        self.time_limit = time_limit
+        self.max_playouts = max_playouts
+        self.min_playouts = min_playouts
+        self.exploration = exploration
+        self.komi = komi
+        self.root = None
+        self.root_history = []  # 根节点对应局面的落子历史
+        self.last_playouts = 0
+
+    def reset(self):
+        """丢弃搜索树（新游戏或换棋盘时调用）"""
+        self.root = None
+        self.root_history = []
+
+    def get_move(self, board, color, stop_event=None):
+        """在预算内搜索并返回(row, col)，选择跳过时返回None"""
+        root = self.search(board, color, stop_event)
+        if not root.children:
+            return None
+        best = max(root.children.values(), key=lambda child: child.visits)
+        if best.move is None:
+            return None
+        return divmod(best.move, board.size)
+
+    def search(self, board, color, stop_event=None):
+        """在预算内搜索，返回搜索树根节点；stop_event被设置且根节点已有 min_playouts 次访问时提前结束"""
+        board = board.copy()  # 在副本上搜索，不影响界面显示的棋盘
+        root = self._reuse_root(board, color)
+        deadline = time.time() + self.time_limit if self.time_limit else None
+        playouts = 0
+        while True:
+            if self.max_playouts is not None and playouts >= self.max_playouts:
+                break
+            if deadline is not None and time.time() >= deadline:
+                break
+            if stop_event is not None and stop_event.is_set() and root.visits >= self.min_playouts:
+                break
+            self._search_once(board, root)
+            playouts += 1
+        self.last_playouts = playouts
+        return root
+
+    def _reuse_root(self, board, color):
+        """沿着上次搜索之后的实际落子向下找到可复用的子树"""
+        node = self.root
+        history = board.move_history
+        known = len(self.root_history)
+        if node is not None and history[:known] == self.root_history:
+            for row, col, stone in history[known:]:
+                if node.color != stone:
+                    node = None
+                    break
+                node = node.children.get(row * board.size + col)
+                if node is None:
+                    break
+        else:
+            node = None
+        if node is None or node.color != color:
+            node = MCTSNode(None, None, color)
+        node.parent = None
+        self.root = node
+        self.root_history = list(history)
+        return node
+
+    def _search_once(self, board, root):
+        """一次完整的选择-展开-模拟-回传"""
+        records = []
+        node = root
+        passes = 0
+
+        # 选择与展开
+        while True:
+            if node.untried is None:
+                node.untried = self._candidate_moves(board, node.color)
+                random.shuffle(node.untried)
+            if node.untried:
+                move = node.untried.pop()
+                child = MCTSNode(move, node, self._opponent(node.color))
+                node.children[move] = child
+                node = child
+                passes = self._apply(board, move, node.parent.color, records, passes)
+                break
+            if not node.children:
+                break
+            node = self._select_child(node)
+            passes = self._apply(board, node.move, node.parent.color, records, passes)
+            if passes >= 2:
+                break
+
+        # 模拟
+        if passes < 2:
+            self._playout(board, node.color, records)
+        black_wins = self._score(board) > 0
+
+        # 撤销本次搜索的所有落子
+        for record in reversed(records):
+            board.undo(record)
+
+        # 回传
+        while node is not None:
+            node.visits += 1
+            if node.parent is not None and (node.parent.color == 'black') == black_wins:
+                node.wins += 1
+            node = node.parent
+
+    def _apply(self, board, move, color, records, passes):
+        """在搜索路径上执行一步（含跳过），返回连续跳过次数"""
+        if move is None:
+            return passes + 1
+        records.append(board.play_point(move, color))
+        return 0
+
+    def _select_child(self, node):
+        """按UCT公式选择子节点"""
+        log_n = math.log(node.visits + 1)
+        c = self.exploration
+        return max(
+            node.children.values(),
+            key=lambda child: child.wins / child.visits + c * math.sqrt(log_n / child.visits)
+        )
+
+    def _candidate_moves(self, board, color):
+        """树内候选落子：所有不填自己眼的合法点，无处可下时只能跳过"""
+        moves = [
+            p for p in range(board.size * board.size)
+            if board.cells[p] is None and not self._is_eye(board, p, color)
+            and board._check_move(p, color) is not None
+        ]
+        return moves or [None]
+
+    def _playout(self, board, color, records):
+        """轻量随机模拟，避免填自己的眼，双方连续跳过时结束"""
+        empties = [p for p in range(board.size * board.size) if board.cells[p] is None]
+        max_moves = board.size * board.size * 2
+        passes = 0
+        for _ in range(max_moves):
+            record = self._random_move(board, empties, color)
+            if record is None:
+                passes += 1
+                if passes >= 2:
+                    break
+            else:
+                passes = 0
+                records.append(record)
+                empties.remove(record[0])
+                empties.extend(record[2])
+            color = self._opponent(color)
+
+    def _random_move(self, board, empties, color):
+        """从空点中随机挑选一个合法且不填眼的落子"""
+        n = len(empties)
+        while n > 0:
+            i = random.randrange(n)
+            p = empties[i]
+            if not self._is_eye(board, p, color):
+                record = board.play_point(p, color)
+                if record is not None:
+                    return record
+            n -= 1
+            empties[i], empties[n] = empties[n], empties[i]
+        return None
+
+    def _is_eye(self, board, p, color):
+        """判断空点是否为color一方的真眼（近似）"""
+        cells = board.cells
+        for q in board.neighbors[p]:
+            if cells[q] != color:
+                return False
+        size = board.size
+        r, c = divmod(p, size)
+        opponent_diagonals = 0
+        off_board = 0
+        for dr, dc in [(-1, -1), (-1, 1), (1, -1), (1, 1)]:
+            nr, nc = r + dr, c + dc
+            if 0 <= nr < size and 0 <= nc < size:
+                if cells[nr * size + nc] not in (None, color):
+                    opponent_diagonals += 1
+            else:
+                off_board += 1
+        # 中腹允许一个对方斜角，边角不允许
+        return opponent_diagonals < (1 if off_board else 2)
+
+    def _score(self, board):
+        """数子法计算黑方领先的目数（已含贴目）"""
+        cells = board.cells
+        score = -self.komi
+        for p, stone in enumerate(cells):
+            if stone == 'black':
+                score += 1
+            elif stone == 'white':
+                score -= 1
+            else:
+                owners = {cells[q] for q in board.neighbors[p]}
+                if owners == {'black'}:
+                    score += 1
+                elif owners == {'white'}:
+                    score -= 1
+        return score
+
+    @staticmethod
+    def _opponent(color):
+        return 'black' if color == 'white' else 'white'
+
+
+# ---------- 多进程根并行搜索 ----------
+# 工作进程内的全局状态：停止信号由主进程在创建进程池时传入，搜索引擎在同一进程内跨步复用
+_worker_stop_event = None
+_worker_engine = None
+
+
+def _init_search_worker(stop_event):
+    """进程池初始化：记录共享的停止信号，并为每个进程设置不同的随机种子"""
+    global _worker_stop_event
+    _worker_stop_event = stop_event
+    random.seed(os.getpid() ^ int(time.time() * 1000))
+
+
+def _worker_search(compact_board, color, time_limit, max_playouts, min_playouts):
+    """工作进程：独立搜索一棵树，返回根节点各子节点的 (访问次数, 胜局数)"""
+    global _worker_engine
+    if _worker_engine is None:
+        _worker_engine = MCTSEngine()
+    _worker_engine.time_limit = time_limit
+    _worker_engine.max_playouts = max_playouts
+    _worker_engine.min_playouts = min_playouts
+    board = GoBoard.from_compact(compact_board)
+    root = _worker_engine.search(board, color, _worker_stop_event)
+    stats = {move: (child.visits, child.wins) for move, child in root.children.items()}
+    return stats, _worker_engine.last_playouts
+
+
+class ParallelMCTSEngine(MCTSEngine):
+    """根并行的蒙特卡洛树搜索：每个工作进程独立搜索一棵树，按落子合并访问次数
+    workers: 进程数，默认使用全部CPU核心
+    """
+    def __init__(self, workers=None, **kwargs):
+        super().__init__(**kwargs)
+        self.workers = workers or os.cpu_count() or 1
+        self.executor = None
+        self.stop_event = None
+
+    def _ensure_executor(self):
+        """延迟创建进程池，之后各步复用"""
+        if self.executor is None:
+            self.stop_event = multiprocessing.Event()
+            self.executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                initializer=_init_search_worker,
+                initargs=(self.stop_event,)
+            )
+        return self.executor
+
+    def get_move(self, board, color, stop_event=None):
+        """把局面分发给所有工作进程搜索，合并结果后返回(row, col)，选择跳过时返回None"""
+        executor = self._ensure_executor()
+        self.stop_event.clear()
+        compact_board = board.to_compact()
+        # 每个进程分担一部分模拟局数上限，时间预算各自相同
+        max_playouts = None
+        if self.max_playouts is not None:
+            max_playouts = max(1, self.max_playouts // self.workers)
+        min_playouts = max(1, self.min_playouts // self.workers)
+        futures = [
+            executor.submit(_worker_search, compact_board, color, self.time_limit, max_playouts, min_playouts)
+            for _ in range(self.workers)
+        ]
+
+        # 等待期间转发主线程的取消信号
+        while not all(future.done() for future in futures):
+            if stop_event is not None and stop_event.is_set():
+                self.stop_event.set()
+            time.sleep(0.02)
+
+        visits = {}
+        self.last_playouts = 0
+        for future in futures:
+            try:
+                stats, playouts = future.result()
+            except Exception as e:
+                print(f"搜索进程出错: {e}")
+                continue
+            self.last_playouts += playouts
+            for move, (n, _) in stats.items():
+                visits[move] = visits.get(move, 0) + n
+
+        if not visits:
+            return None
+        best_move = max(visits, key=visits.get)
+        if best_move is None:
+            return None
+        return divmod(best_move, board.size)
+
+    def cancel(self):
+        """通知所有工作进程尽快结束当前搜索"""
+        if self.stop_event is not None:
+            self.stop_event.set()
+
+    def close(self):
+        """关闭进程池"""
+        if self.executor is not None:
+            self.cancel()
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
+
+
 class ExternalAI:
-    """外部AI引擎接口（示例实现，实际使用需要安装相应软件）"""
-    def __init__(self, engine_path=None):
+    """外部AI引擎接口（示例实现，实际使用需要安装相应软件）
+    引擎进程常驻，棋盘局面按落子历史增量同步，命令批量流水线发送；
+    每条命令带GTP数字编号，响应按编号匹配，超时后迟到的响应会被丢弃，不会错位到之后的命令上
+    """
+    def __init__(self, engine_path=None, timeout=30.0):
         self.engine_path = engine_path
         self.process = None
         self.engine_type = None  # 'gnugo', 'katago', 等
+        self.timeout = timeout  # 单条命令等待响应的默认超时（秒）
+        self.responses = queue.Queue()  # 后台线程读取到的输出行
+        self.reader_thread = None
+        self.next_id = 1  # 下一条命令的GTP编号
+        self.supported_commands = set()
+        self.synced_size = None  # 引擎端当前的棋盘大小
+        self.synced_moves = []  # 引擎端已知的落子序列 (row, col, color)
         
     def initialize(self, engine_type='gnugo'):
         """初始化AI引擎"""
@@ -418,14 +953,7 @@ class ExternalAI:
                 cmd = ['gnugo', '--mode', 'gtp']  # 假设gnugo在PATH中
             
             try:
-                self.process = subprocess.Popen(
-                    cmd,
-                    stdin=subprocess.PIPE,
-                    stdout=subprocess.PIPE,
-                    stderr=subprocess.PIPE,
-                    universal_newlines=True,
-                    bufsize=1
-                )
+                self._start_process(cmd)
                 return True
             except Exception as e:
                 print(f"启动GNU Go失败: {e}")
@@ -438,14 +966,7 @@ class ExternalAI:
                 
             try:
                 cmd = [self.engine_path, 'gtp', '-config', 'default_gtp.cfg']
-                self.process = subprocess.Popen(
-                    cmd,
-                    stdin=subprocess.PIPE,
-                    stdout=subprocess.PIPE,
-                    stderr=subprocess.PIPE,
-                    universal_newlines=True,
-                    bufsize=1
-                )
+                self._start_process(cmd)
                 return True
             except Exception as e:
                 print(f"启动KataGo失败: {e}")
@@ -453,60 +974,157 @@ class ExternalAI:
         
         return False
     
-    def send_command(self, command):
-        """向AI引擎发送GTP命令"""
-        if not self.process:
-            return None
-            
-        try:
-            self.process.stdin.write(command + '\n')
-            
-            # 读取响应
-            response = ""
-            while True:
-                line = self.process.stdout.readline()
-                response += line
-                if line.strip() == '':
+    def _start_process(self, cmd):
+        """启动引擎进程、后台读取线程，并查询引擎支持的命令"""
+        self.process = subprocess.Popen(
+            cmd,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,  # 不读取stderr，避免引擎日志写满管道后阻塞
+            universal_newlines=True,
+            bufsize=1
+        )
+        self.responses = queue.Queue()
+        self.reader_thread = threading.Thread(target=self._reader, args=(self.process.stdout, self.responses), daemon=True)
+        self.reader_thread.start()
+        self.next_id = 1
+        self.synced_size = None
+        self.synced_moves = []
+        
+        commands = self.send_command("list_commands")
+        self.supported_commands = set(commands.split()) if commands else set()
+    
+    @staticmethod
+    def _reader(stream, responses):
+        """后台线程：持续读取引擎输出，EOF时放入None"""
+        for line in iter(stream.readline, ''):
+            responses.put(line)
+        responses.put(None)
+    
+    def _read_response(self, command_id, deadline):
+        """读取编号为command_id的GTP响应，跳过之前超时命令迟到的响应；超时、引擎退出或命令失败时返回None"""
+        while True:
+            response = self._read_raw_response(deadline)
+            if response is None:
+                return None
+            match = re.match(r'([=?])(\d*)\s*(.*)', response, re.DOTALL)
+            if not match:
+                continue  # 不是GTP响应，丢弃
+            status, response_id, text = match.groups()
+            if response_id and int(response_id) < command_id:
+                continue  # 之前超时命令的响应
+            return text.strip() if status == '=' else None
+    
+    def _read_raw_response(self, deadline):
+        """读取一条完整的GTP响应（以空行结束），超时或引擎退出时返回None"""
+        lines = []
+        while True:
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                print("等待AI引擎响应超时")
+                return None
+            try:
+                line = self.responses.get(timeout=remaining)
+            except queue.Empty:
+                print("等待AI引擎响应超时")
+                return None
+            if line is None:
+                print("AI引擎已退出")
+                self.process = None
+                return None
+            if line.strip() == '':
+                if lines:
                     break
+                continue  # 跳过响应之间多余的空行
+            lines.append(line)
+        return ''.join(lines)
+    
+    def send_commands(self, commands, timeout=None):
+        """流水线发送多条GTP命令：一次写入，再依次读取响应，返回各命令的结果列表"""
+        if not self.process or not commands:
+            return [None] * len(commands)
             
-            # 处理响应
-            if response.startswith('='):
-                return response[1:].strip()
-            else:
-                return None
+        first_id = self.next_id
+        self.next_id += len(commands)
+        try:
+            self.process.stdin.write(''.join(f"{first_id + i} {command}\n" for i, command in enumerate(commands)))
+            self.process.stdin.flush()
         except Exception as e:
             print(f"与AI引擎通信失败: {e}")
-            return None
+            return [None] * len(commands)
+        
+        deadline = time.time() + (timeout if timeout is not None else self.timeout)
+        results = []
+        for i in range(len(commands)):
+            results.append(self._read_response(first_id + i, deadline) if self.process else None)
+        return results
+    
+    def send_command(self, command, timeout=None):
+        """向AI引擎发送GTP命令"""
+        return self.send_commands([command], timeout)[0]
+    
+    def set_time_settings(self, main_time, byo_yomi_time=0, byo_yomi_stones=0):
+        """设置引擎用时（time_settings，单位秒）"""
+        return self.send_command(f"time_settings {main_time} {byo_yomi_time} {byo_yomi_stones}") is not None
+    
+    def sync_position(self, board):
+        """把引擎端局面同步到board：历史一致时只发送新增落子，否则清盘后按历史重放（保留提子与劫的状态）"""
+        history = board.move_history
+        known = len(self.synced_moves)
+        if self.synced_size == board.size and history[:known] == self.synced_moves:
+            commands = []
+            new_moves = history[known:]
+        else:
+            commands = [f"boardsize {board.size}", "clear_board"]
+            new_moves = history
+        for row, col, stone_color in new_moves:
+            commands.append(f"play {stone_color} {self._coord_to_vertex(row, col)}")
+        if not commands:
+            return True
+        
+        results = self.send_commands(commands)
+        # 任意一条失败时清空同步记录，下次整盘重放
+        if any(result is None for result in results):
+            self.synced_size = None
+            self.synced_moves = []
+            return False
+        self.synced_size = board.size
+        self.synced_moves = list(history)
+        return True
     
-    def get_move(self, board, color):
-        """获取AI引擎推荐的落子位置"""
+    def get_move(self, board, color, cleanup=False):
+        """获取AI引擎推荐的落子位置
+        cleanup: 为True且引擎支持时使用kgs-genmove_cleanup（终局时先提净死子）
+        """
         if not self.process:
             return None
             
-        # 清除棋盘并设置新局面
-        self.send_command("clear_board")
-        
-        # 设置已有的棋子
-        for r in range(board.size):
-            for c in range(board.size):
-                if board.board[r][c]:
-                    stone_color = board.board[r][c]
-                    vertex = self._coord_to_vertex(r, c)
-                    self.send_command(f"play {stone_color} {vertex}")
+        if not self.sync_position(board):
+            return None
         
         # 请求AI引擎计算下一步
         gtp_color = color
-        response = self.send_command(f"genmove {gtp_color}")
+        if cleanup and "kgs-genmove_cleanup" in self.supported_commands:
+            response = self.send_command(f"kgs-genmove_cleanup {gtp_color}")
+        else:
+            response = self.send_command(f"genmove {gtp_color}")
         
         if response:
             # 解析落子位置
             vertex = response.strip()
             if vertex.lower() == 'pass':
                 return None  # AI选择跳过
+            elif vertex.lower() == 'resign':
+                return None  # 引擎认输时按跳过处理
             else:
                 row, col = self._vertex_to_coord(vertex)
+                # genmove已在引擎端落子，记入同步历史
+                self.synced_moves.append((row, col, color))
                 return (row, col)
         
+        # 无响应（超时等）时引擎状态未知，下次整盘重放
+        self.synced_size = None
+        self.synced_moves = []
         return None
     
     def _coord_to_vertex(self, row, col):
@@ -531,8 +1149,9 @@ class ExternalAI:
         """关闭AI引擎"""
         if self.process:
             try:
-                self.send_command("quit")
-                self.process.terminate()
+                self.send_command("quit", timeout=2)
+                if self.process:
+                    self.process.terminate()
                 self.process = None
             except:
                 pass
@@ -549,8 +1168,15 @@ class GoGame:
         self.ai_color = 'white'  # AI默认执白
         self.ai_thinking = False
         self.ai_difficulty = 1  # 默认中等难度
+        self.parallel_search = (os.cpu_count() or 1) > 1  # 多核时专家难度默认使用多进程搜索
+        self.mcts_engine = ParallelMCTSEngine() if self.parallel_search else MCTSEngine()  # 专家难度使用的搜索引擎
+        self.ai_stop_event = threading.Event()  # 通知当前这次AI思考尽快按已有结果落子，每次思考使用新的Event
+        self.ai_cancel_event = threading.Event()  # 通知当前这次AI思考被取消，结果将被丢弃
+        self.ai_thread = None  # 最近一次AI思考的线程
+        self.ai_generation = 0  # 每次取消AI思考时递增，用于丢弃过期的AI结果
         self.external_ai = None
         self.use_external_ai = False
+        self.external_ai_seconds = 5  # 外部引擎每步的思考时间（秒，按读秒方式设置）
         
         # 设置更大的字体
         self.large_font = font.Font(family="Helvetica", size=14, weight="bold")
@@ -575,6 +1201,10 @@ class GoGame:
         self.settings_menu = tk.Menu(self.menu_bar, tearoff=0)
         self.menu_bar.add_cascade(label="设置", menu=self.settings_menu)
         self.settings_menu.add_command(label="棋盘大小", command=self.change_board_size)
+        self.parallel_search_var = tk.BooleanVar(value=self.parallel_search)
+        self.settings_menu.add_checkbutton(label="专家AI多进程搜索",
+                                           variable=self.parallel_search_var,
+                                           command=self.toggle_parallel_search)
         
         # 创建主框架
         self.main_frame = tk.Frame(master)
@@ -622,7 +1252,7 @@ class GoGame:
         self.ai_difficulty_var = tk.IntVar(value=1)
         self.ai_difficulty_combo = ttk.Combobox(self.ai_difficulty_frame, 
                                                textvariable=self.ai_difficulty_var,
-                                               values=["简单", "中等", "困难", "专家(外部引擎)"],
+                                               values=["简单", "中等", "困难", "专家", "外部引擎"],
                                                state="readonly",
                                                width=12)
         self.ai_difficulty_combo.current(1)  # 默认选择中等难度
@@ -743,13 +1373,24 @@ class GoGame:
         """启用或禁用AI"""
         self.ai_enabled = self.ai_var.get()
         
-        # 如果选择了专家级别（外部引擎）但未配置
-        if self.ai_enabled and self.ai_difficulty_var.get() == 3 and not self.use_external_ai:
+        # 如果选择了外部引擎但未配置
+        if self.ai_enabled and self.ai_difficulty == 4 and not self.use_external_ai:
             self.configure_external_ai()
             
         if self.ai_enabled and self.current_player == self.ai_color:
             self.make_ai_move()
             
+    def toggle_parallel_search(self):
+        """切换专家AI的单进程/多进程搜索"""
+        self.cancel_ai_move()
+        if isinstance(self.mcts_engine, ParallelMCTSEngine):
+            self.mcts_engine.close()
+        self.parallel_search = self.parallel_search_var.get()
+        self.mcts_engine = ParallelMCTSEngine() if self.parallel_search else MCTSEngine()
+        
+        if self.ai_enabled and self.current_player == self.ai_color:
+            self.make_ai_move()
+            
     def set_ai_color(self):
         """设置AI执黑或执白"""
         self.ai_color = self.ai_color_var.get()
@@ -759,10 +1400,10 @@ class GoGame:
             
     def set_ai_difficulty(self, event=None):
         """设置AI难度"""
-        self.ai_difficulty = self.ai_difficulty_var.get()
+        self.ai_difficulty = self.ai_difficulty_combo.current()
         
-        # 如果选择了专家级别（外部引擎）
-        if self.ai_difficulty == 3:
+        # 如果选择了外部引擎
+        if self.ai_difficulty == 4:
             if not self.use_external_ai:
                 self.configure_external_ai()
         else:
@@ -856,6 +1497,8 @@ class GoGame:
                 
             self.external_ai = ExternalAI(engine_path)
             if self.external_ai.initialize(engine_type):
+                # 每步固定读秒，避免引擎按默认的不限时长思考
+                self.external_ai.set_time_settings(0, self.external_ai_seconds, 1)
                 self.use_external_ai = True
                 tk.messagebox.showinfo("设置成功", f"已成功配置{engine_var.get()}引擎。")
                 dialog.destroy()
@@ -944,8 +1587,12 @@ class GoGame:
     
     def handle_click(self, event):
         """处理鼠标点击事件"""
-        # 如果AI正在思考或当前玩家是AI，忽略点击
-        if self.ai_thinking or (self.ai_enabled and self.current_player == self.ai_color):
+        # AI思考时点击棋盘：让专家AI在已有足够模拟后按当前搜索结果落子，其他难度忽略点击
+        if self.ai_thinking:
+            self.ai_stop_event.set()
+            return
+        # 如果当前玩家是AI，忽略点击
+        if self.ai_enabled and self.current_player == self.ai_color:
             return
             
         margin = self.cell_size
@@ -984,28 +1631,51 @@ class GoGame:
             return
             
         self.ai_thinking = True
-        difficulty_names = ["简单", "中等", "困难", "专家"]
+        # 每次思考使用自己的停止信号、棋盘副本和落子方，取消后的旧线程不会被新的思考唤醒，也不会碰到界面上的棋盘
+        stop_event = threading.Event()
+        cancel_event = threading.Event()
+        self.ai_stop_event = stop_event
+        self.ai_cancel_event = cancel_event
+        generation = self.ai_generation
+        board = self.board.copy()
+        color = self.current_player
+        # 对方刚刚停一手时终局在即，让外部引擎先提净死子再停一手
+        cleanup = self.passed_last_turn
+        previous_thread = self.ai_thread
+        difficulty_names = ["简单", "中等", "困难", "专家", "外部引擎"]
         self.status_var.set(f"{difficulty_names[self.ai_difficulty]}级AI正在思考...")
         self.master.update()
         
         # 在单独的线程中运行AI，避免UI卡顿
         def ai_thread():
-            time.sleep(0.5)  # 稍作延迟，让用户看到AI在"思考"
+            # 已取消的上一次思考还在运行时，等它退出后再使用共享的搜索引擎和外部引擎
+            if previous_thread is not None:
+                previous_thread.join()
+            cancel_event.wait(0.5)  # 稍作延迟，让用户看到AI在"思考"；点击棋盘不会跳过这段延迟，停止信号留给搜索
+            if generation != self.ai_generation:
+                return
             
             if self.use_external_ai and self.external_ai:
                 # 使用外部AI引擎
-                move = self.external_ai.get_move(self.board, self.current_player)
+                move = self.external_ai.get_move(board, color, cleanup)
+            elif self.ai_difficulty == 3:
+                # 专家：蒙特卡洛树搜索
+                move = self.mcts_engine.get_move(board, color, stop_event)
             else:
                 # 使用内置AI
-                move = self.board.ai_make_move(self.current_player, self.ai_difficulty)
+                move = board.ai_make_move(color, self.ai_difficulty)
             
             # 在主线程中更新UI
-            self.master.after(0, lambda: self.complete_ai_move(move))
+            self.master.after(0, lambda: self.complete_ai_move(move, generation))
         
-        threading.Thread(target=ai_thread).start()
+        self.ai_thread = threading.Thread(target=ai_thread, daemon=True)
+        self.ai_thread.start()
     
-    def complete_ai_move(self, move):
+    def complete_ai_move(self, move, generation=None):
         """完成AI的落子"""
+        # 思考期间游戏已被重置，丢弃过期结果
+        if generation is not None and generation != self.ai_generation:
+            return
         self.ai_thinking = False
         self.status_var.set("")
         
@@ -1017,6 +1687,18 @@ class GoGame:
             if self.board.place_stone(row, col, self.current_player):
                 self.after_move()
     
+    def cancel_ai_move(self):
+        """取消正在进行的AI思考，结果将被丢弃"""
+        if not self.ai_thinking:
+            return
+        self.ai_generation += 1
+        self.ai_cancel_event.set()
+        self.ai_stop_event.set()
+        if isinstance(self.mcts_engine, ParallelMCTSEngine):
+            self.mcts_engine.cancel()
+        self.ai_thinking = False
+        self.status_var.set("")
+    
     def update_winrate(self):
         """更新胜率显示"""
         black_winrate = self.board.estimate_winrate()
@@ -1060,16 +1742,14 @@ class GoGame:
     
     def restart_game(self):
         """重新开始游戏"""
-        # 如果AI正在思考，忽略
-        if self.ai_thinking:
-            return
-            
         if messagebox.askyesno("重新开始", "确定要重新开始游戏吗？"):
             self.reset_game()
     
     def reset_game(self):
         """重置游戏状态"""
+        self.cancel_ai_move()
         self.board.reset()
+        self.mcts_engine.reset()
         self.current_player = 'black'
         self.passed_last_turn = False
         self.turn_var.set("当前玩家: 黑方")
@@ -1106,9 +1786,11 @@ class GoGame:
         self.reset_game()
         
     def __del__(self):
-        """析构函数，确保关闭外部AI引擎"""
+        """析构函数，确保关闭外部AI引擎和搜索进程池"""
         if self.external_ai:
             self.external_ai.close()
+        if isinstance(self.mcts_engine, ParallelMCTSEngine):
+            self.mcts_engine.close()
 
 def main():
     root = tk.Tk()
@@ -1,5 +1,5 @@
 import pandas as pd
-import numpy as np
+from bootstrap import bootstrap
 
 # 读取整个Excel文件
 df = pd.read_excel('FINM3008 - Assignment Data Analysis S1 2024.xlsx', sheet_name='Qtr Returns', index_col=0)
@@ -10,40 +10,22 @@ asset_classes = df.iloc[0].tolist()
 # 删除前1行
 df = df.iloc[1:]
 
-# 设置bootstrap参数
-n_boot = 1000
-sample_length = len(df)
-
-# 定义一个函数来计算统计量
-def calculate_stats(data):
-    # 将非数值类型转换为NaN
-    data = pd.to_numeric(data, errors='coerce')
-    return {'mean': data.mean(), 'std': data.std(), 'min': data.min(), 'max': data.max(), 'median': data.median()}
-
-# 初始化一个字典来存储结果
-results = {col: {'mean': [], 'std': [], 'min': [], 'max': [], 'median': []} for col in df.columns}
+# 将非数值类型转换为NaN
+values = df.apply(pd.to_numeric, errors='coerce').to_numpy(dtype=float)
 
-# 进行bootstrapping
-for i in range(n_boot):
-    sample = df.sample(n=sample_length, replace=True)
-    for col in df.columns:
-        stats = calculate_stats(sample[col])
-        for key, value in stats.items():
-            results[col][key].append(value)
-
-# 将结果转换为DataFrame
-boot_df = pd.DataFrame(results)
+# 设置bootstrap参数：全部资产类别一起重抽样，下标矩阵分批生成、统计量按轴计算
+n_boot = 1000
+results = bootstrap(values, statistics=['mean', 'std', 'min', 'max', 'median'], n_boot=n_boot)
 
 # 计算置信区间和确定值
 output = {}
-for col in df.columns:
-    asset_class = asset_classes[df.columns.get_loc(col)]
+for i, asset_class in enumerate(asset_classes):
     output[asset_class] = {
-        'mean': {'value': df[col].mean(),'ci': np.percentile(boot_df[col]['mean'], [2.5, 97.5])},
-        'std': {'value': df[col].std(), 'ci': np.percentile(boot_df[col]['std'], [2.5, 97.5]) },
-        'min': {'value': df[col].min()},
-        'max': {'value': df[col].max()},
-        'median': {'value': df[col].median()}
+        'mean': {'value': results['mean']['value'][i], 'ci': results['mean']['ci'][:, i]},
+        'std': {'value': results['std']['value'][i], 'ci': results['std']['ci'][:, i]},
+        'min': {'value': results['min']['value'][i]},
+        'max': {'value': results['max']['value'][i]},
+        'median': {'value': results['median']['value'][i]}
     }
 
 # 打印结果
@@ -1,20 +1,14 @@
+import os
+import sys
+
+# 共用的风险指标模块位于目录 金融/
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '../金融')))
+from risk_metrics import max_drawdown
+
+
 def calculate_max_drawdown(prices):
-    # 初始化
-    max_drawdown = 0
-    peak = prices[0]
-    
-    # 遍历
-    for price in prices:
-        # 更新最高价
-        if price > peak:
-            peak = price
-        # 当前点的回撤
-        drawdown = (peak - price) / peak
-        # 更新最大回撤
-        if drawdown > max_drawdown:
-            max_drawdown = drawdown
-    
-    return max_drawdown
+    # 截至各期的最大回撤，最后一期即整段序列的最大回撤；prices 可以是 (期数, 序列数) 的多条序列
+    return max_drawdown(prices)[-1]
 
 # 示例
 prices = [100, 110, 107, 115, 155, 135, 130, 125, 140, 133, 137, 129, 95]
@@ -1,5 +1,11 @@
 import pandas as pd
 import numpy as np
+import os
+import sys
+
+# 共用的风险指标模块位于目录 金融/
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '../金融')))
+from risk_metrics import block_mean_std
 
 # 读取 CSV 文件
 df = pd.read_csv('sp500_data.csv', header=None, names=['Date', 'Value','Scaled'])
@@ -7,13 +13,7 @@ df = pd.read_csv('sp500_data.csv', header=None, names=['Date', 'Value','Scaled']
 # 将第3列设置为数值型
 df['Scaled'] = pd.to_numeric(df['Scaled'], errors='coerce')
 
-# 将数据分成每 52 天一组
-groups = [df['Scaled'][i:i+52] for i in range(0, len(df), 52)]
-
-# 计算每组的平均值
-group_means = [g.mean() for g in groups]
-
-# 计算这些平均值的标准差
-std_dev = np.std(group_means)
+# 将数据分成每 52 天一组，计算每组平均值的标准差
+std_dev = block_mean_std(df['Scaled'].values, 52)
 
 print(f"Standard Deviation (window size = 52): {std_dev}")
\ No newline at end of file
@@ -0,0 +1,161 @@
+"""
+分块流式 AES-GCM 加密容器
+
+  - 文件按 chunk_size 分块加密，读写都只保存一块，内存占用与文件大小无关
+  - 每块单独认证 (AES-GCM，16 字节 tag)，nonce = 8 字节随机前缀 + 4 字节块序号，同一密钥下不重复；
+    头部和"是否最后一块"标志作为附加认证数据，块被调换、删除、截断或头部被篡改都会在解密时发现
+  - 加密和解密都先写入 <输出文件>.partial，全部完成并落盘后再原子改名，中途崩溃不会留下不完整的输出，
+    调用方在改名成功后再删除原文件
+  - decrypt_chunks 逐块校验并产出明文，可以直接流式使用而不落盘；verify_file 只校验不输出
+
+文件格式:
+    头部 24 字节: MAGIC (8) | 版本 (1) | 保留 (3) | chunk_size (4，大端) | nonce 前缀 (8)
+    之后每块: 密文 (最后一块不足 chunk_size，可以为 0 字节) | tag (16)
+
+用法:
+    from stream_cipher import encrypt_file, decrypt_file, is_stream_file
+    encrypt_file('data.bin', 'data.bin.enc', key)
+    decrypt_file('data.bin.enc', 'data.bin', key)
+"""
+import os
+import struct
+from Crypto.Cipher import AES
+from Crypto.Random import get_random_bytes
+
+MAGIC = b'AESGCMS\x00'
+VERSION = 1
+HEADER_FORMAT = '>8sB3xI8s'
+HEADER_SIZE = struct.calcsize(HEADER_FORMAT)
+TAG_SIZE = 16
+DEFAULT_CHUNK_SIZE = 1 << 20
+MAX_CHUNKS = 1 << 32
+
+
+def _chunk_cipher(key, prefix, index):
+    if index >= MAX_CHUNKS:
+        raise ValueError("文件过大：块数超过 2^32，请增大 chunk_size")
+    return AES.new(key, AES.MODE_GCM, nonce=prefix + struct.pack('>I', index), mac_len=TAG_SIZE)
+
+
+def is_stream_file(filename):
+    """文件是否为本格式（以 MAGIC 开头）"""
+    with open(filename, 'rb') as f:
+        return f.read(len(MAGIC)) == MAGIC
+
+
+def _read_full(f, size):
+    """读满 size 字节，除非到达文件末尾"""
+    data = f.read(size)
+    while len(data) < size:
+        more = f.read(size - len(data))
+        if not more:
+            break
+        data += more
+    return data
+
+
+def encrypt_file(input_file, output_file, key, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    分块加密文件
+
+    参数:
+        input_file: 明文文件
+        output_file: 密文文件，先写 output_file + '.partial'，完成后改名
+        key: 16/24/32 字节的 AES 密钥
+        chunk_size: 每块明文字节数
+    """
+    prefix = get_random_bytes(8)
+    header = struct.pack(HEADER_FORMAT, MAGIC, VERSION, chunk_size, prefix)
+    partial = output_file + '.partial'
+    try:
+        with open(input_file, 'rb') as src, open(partial, 'wb') as dst:
+            dst.write(header)
+            index = 0
+            chunk = _read_full(src, chunk_size)
+            while True:
+                # 读到下一块才知道当前块是否为最后一块；空文件也写一个空的最后一块，截断可被发现
+                next_chunk = _read_full(src, chunk_size) if len(chunk) == chunk_size else b''
+                final = not next_chunk
+                cipher = _chunk_cipher(key, prefix, index)
+                cipher.update(header + bytes([final]))
+                ciphertext, tag = cipher.encrypt_and_digest(chunk)
+                dst.write(ciphertext)
+                dst.write(tag)
+                if final:
+                    break
+                chunk = next_chunk
+                index += 1
+            dst.flush()
+            os.fsync(dst.fileno())
+        os.replace(partial, output_file)
+    except BaseException:
+        if os.path.exists(partial):
+            os.remove(partial)
+        raise
+
+
+def decrypt_chunks(input_file, key):
+    """
+    逐块解密并校验，产出明文块
+
+    每块在产出前已通过认证；截断或缺少最后一块会在迭代结束时抛出 ValueError，
+    流式使用时应在迭代正常结束后才认为数据完整
+    """
+    with open(input_file, 'rb') as f:
+        header = _read_full(f, HEADER_SIZE)
+        if len(header) < HEADER_SIZE:
+            raise ValueError("文件头不完整")
+        magic, version, chunk_size, prefix = struct.unpack(HEADER_FORMAT, header)
+        if magic != MAGIC:
+            raise ValueError("不是分块加密格式的文件")
+        if version != VERSION:
+            raise ValueError(f"不支持的格式版本: {version}")
+
+        record_size = chunk_size + TAG_SIZE
+        index = 0
+        record = _read_full(f, record_size)
+        while True:
+            if len(record) < TAG_SIZE:
+                raise ValueError("文件被截断：缺少最后一块")
+            next_record = _read_full(f, record_size) if len(record) == record_size else b''
+            final = not next_record
+            cipher = _chunk_cipher(key, prefix, index)
+            cipher.update(header + bytes([final]))
+            try:
+                plaintext = cipher.decrypt_and_verify(record[:-TAG_SIZE], record[-TAG_SIZE:])
+            except ValueError:
+                raise ValueError(f"第 {index} 块校验失败：密钥错误或文件已损坏/被截断") from None
+            yield plaintext
+            if final:
+                return
+            record = next_record
+            index += 1
+
+
+def verify_file(input_file, key):
+    """只校验全部块，不输出明文；通过返回 True"""
+    try:
+        for _ in decrypt_chunks(input_file, key):
+            pass
+    except ValueError:
+        return False
+    return True
+
+
+def decrypt_file(input_file, output_file, key):
+    """
+    分块解密文件，先写 output_file + '.partial'，全部块校验通过后改名；
+    校验失败时删除未完成的输出并抛出 ValueError
+    """
+    partial = output_file + '.partial'
+    try:
+        with open(partial, 'wb') as dst:
+            for plaintext in decrypt_chunks(input_file, key):
+                dst.write(plaintext)
+            dst.flush()
+            os.fsync(dst.fileno())
+        os.replace(partial, output_file)
+    except BaseException:
+        if os.path.exists(partial):
+            os.remove(partial)
+        raise
@@ -1,8 +1,7 @@
-from Crypto.Cipher import AES
 from Crypto.Random import get_random_bytes
-from Crypto.Util.Padding import pad, unpad
 import os
 import py7zr
+import stream_cipher
 
 BASE_PATH = r"C:\Users\11470\Desktop\加密"
 
@@ -23,20 +22,15 @@ def split_key(key: bytes, n: int) -> tuple[list[bytes], int]:
 
 
 def encrypt_file(filename, key):
-    cipher = AES.new(key, AES.MODE_CBC)
-    with open(filename, 'rb') as f:
-        plaintext = f.read()
-    ciphertext = cipher.encrypt(pad(plaintext, AES.block_size))
-    with open(filename + ".enc", 'wb') as f:
-        f.write(cipher.iv)
-        f.write(ciphertext)
+    """Encrypt in fixed-size AES-GCM chunks; the original is removed only after the .enc file is complete."""
+    stream_cipher.encrypt_file(filename, filename + ".enc", key)
     os.remove(filename)
 
 key = get_random_bytes(32)
 
 for root, dirs, files in os.walk(BASE_PATH):
     for file in files:
-        if not file.endswith('.py'):
+        if not file.endswith(('.py', '.enc', '.partial')):
             encrypt_file(os.path.join(root, file), key)
 
 shares, last_share_length = split_key(key, 3)
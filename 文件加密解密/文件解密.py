@@ -2,6 +2,7 @@ from Crypto.Cipher import AES
 from Crypto.Util.Padding import unpad
 import os
 import py7zr
+import stream_cipher
 
 BASE_PATH = r"C:\Users\11470\Desktop\加密"
 
@@ -9,14 +10,23 @@ def recover_key(shares: list[bytes], last_share_length: int) -> bytes:
     """Use the length of the last share to recover the key."""
     return b''.join(shares[:-1]) + shares[-1][:last_share_length]
 
-def decrypt_file(filename, key):
+def decrypt_legacy_file(filename, key):
+    """Files encrypted by the old whole-file AES-CBC version: IV followed by the padded ciphertext."""
     with open(filename, 'rb') as f:
         iv = f.read(16)
         ciphertext = f.read()
     cipher = AES.new(key, AES.MODE_CBC, iv)
     plaintext = unpad(cipher.decrypt(ciphertext), AES.block_size)
-    with open(filename[:-4], 'wb') as f:
+    with open(filename[:-4] + ".partial", 'wb') as f:
         f.write(plaintext)
+    os.replace(filename[:-4] + ".partial", filename[:-4])
+
+def decrypt_file(filename, key):
+    """Decrypt and verify chunk by chunk; the .enc file is removed only after the output is complete."""
+    if stream_cipher.is_stream_file(filename):
+        stream_cipher.decrypt_file(filename, filename[:-4], key)
+    else:
+        decrypt_legacy_file(filename, key)
     os.remove(filename)
 
 with py7zr.SevenZipFile(os.path.join(BASE_PATH, 'keys.7z'), mode='r', password='1021') as z:
@@ -0,0 +1,128 @@
+"""
+社交网络数据的增量持久化：追加式操作日志 + 定期压缩的快照
+
+目录结构:
+  - users_<序号>.json: 快照时的全部用户 [[user_id, name, age, [interests]], ...]（不缩进）
+  - edges_<序号>.npy: 快照时的全部好友对 (边数, 2) int64
+  - snapshot.json: 当前快照覆盖到的操作序号，数据文件都写完后才替换，作为快照完整的标志
+  - oplog.jsonl: 每次修改一行 {"seq": 序号, "op": 操作, ...}
+
+每次修改只在日志末尾追加一行，I/O 与网络规模无关；启动时读取快照，只重放序号大于快照序号的日志。
+日志达到 compact_every 行时由调用方写新快照，写完后清空日志、删除旧快照。
+任一步骤中途崩溃都能恢复：snapshot.json 仍指向旧快照时新文件被忽略，日志中已包含在快照里的操作按序号跳过，
+写了一半的最后一行日志读取时忽略。
+
+用法:
+    store = NetworkStore('social_network_data')
+    users, (src, dst), ops = store.load()
+    store.append({'op': 'add_friendship', 'user_id_1': 1, 'user_id_2': 2})
+    if store.needs_compaction():
+        store.write_snapshot(users, src, dst)
+"""
+import json
+import os
+import numpy as np
+
+
+class NetworkStore:
+    def __init__(self, root, compact_every=10000):
+        self.root = root
+        self.compact_every = compact_every
+        self.meta_path = os.path.join(root, 'snapshot.json')
+        self.log_path = os.path.join(root, 'oplog.jsonl')
+        self.seq = 0
+        self.snapshot_seq = 0
+        self._log_file = None
+
+    def _snapshot_paths(self, seq):
+        return os.path.join(self.root, f'users_{seq}.json'), os.path.join(self.root, f'edges_{seq}.npy')
+
+    def exists(self):
+        return os.path.exists(self.meta_path)
+
+    def load(self):
+        """
+        读取快照和快照之后的日志
+
+        返回: (users, (src, dst), ops)
+            users: [[user_id, name, age, [interests]], ...]
+            src, dst: 好友对的用户 ID 数组
+            ops: 需要按顺序重放的操作字典列表
+        """
+        with open(self.meta_path, 'r', encoding='utf-8') as f:
+            self.snapshot_seq = json.load(f)['seq']
+        users_path, edges_path = self._snapshot_paths(self.snapshot_seq)
+        with open(users_path, 'r', encoding='utf-8') as f:
+            users = json.load(f)
+        edges = np.load(edges_path)
+
+        ops = []
+        self.seq = self.snapshot_seq
+        if os.path.exists(self.log_path):
+            valid_size = 0
+            with open(self.log_path, 'rb') as f:
+                for line in f:
+                    try:
+                        op = json.loads(line)
+                    except ValueError:
+                        break  # 崩溃时写了一半的最后一行
+                    if not line.endswith(b'\n'):
+                        break
+                    valid_size += len(line)
+                    if op['seq'] > self.snapshot_seq:
+                        ops.append(op)
+                        self.seq = op['seq']
+            # 截掉不完整的尾部，之后追加的操作从新的一行开始
+            if valid_size < os.path.getsize(self.log_path):
+                with open(self.log_path, 'r+b') as f:
+                    f.truncate(valid_size)
+        return users, (edges[:, 0], edges[:, 1]), ops
+
+    def append(self, op):
+        """在日志末尾追加一次操作并落盘"""
+        if self._log_file is None:
+            os.makedirs(self.root, exist_ok=True)
+            self._log_file = open(self.log_path, 'a', encoding='utf-8')
+        self.seq += 1
+        self._log_file.write(json.dumps(dict(op, seq=self.seq), ensure_ascii=False) + '\n')
+        self._log_file.flush()
+        os.fsync(self._log_file.fileno())
+
+    def needs_compaction(self):
+        return self.seq - self.snapshot_seq >= self.compact_every
+
+    def write_snapshot(self, users, src, dst):
+        """
+        写入覆盖当前全部操作的快照，然后清空日志
+
+        参数:
+            users: [[user_id, name, age, [interests]], ...]
+            src, dst: 好友对的用户 ID
+        """
+        if self.exists() and self.seq == self.snapshot_seq:
+            return  # 快照已是最新
+        os.makedirs(self.root, exist_ok=True)
+        users_path, edges_path = self._snapshot_paths(self.seq)
+        with open(users_path, 'w', encoding='utf-8') as f:
+            json.dump(users, f, ensure_ascii=False, separators=(',', ':'))
+        with open(edges_path, 'wb') as f:
+            np.save(f, np.column_stack([np.asarray(src, dtype=np.int64), np.asarray(dst, dtype=np.int64)]).reshape(-1, 2))
+        with open(self.meta_path + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump({'seq': self.seq}, f)
+        os.replace(self.meta_path + '.tmp', self.meta_path)
+        old_paths = self._snapshot_paths(self.snapshot_seq) if self.snapshot_seq != self.seq else ()
+        self.snapshot_seq = self.seq
+
+        # 日志中的操作都已包含在快照里
+        if self._log_file is not None:
+            self._log_file.close()
+            self._log_file = None
+        open(self.log_path, 'w').close()
+        for path in old_paths:
+            if os.path.exists(path):
+                os.remove(path)
+
+    def close(self):
+        if self._log_file is not None:
+            self._log_file.close()
+            self._log_file = None
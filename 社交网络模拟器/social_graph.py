@@ -0,0 +1,317 @@
+"""
+社交网络的紧凑图存储与随机生成
+
+  - FriendGraph 用 CSR（indptr + 按行排序的 int32 邻居数组）保存好友关系，每条边只占两个 int32；
+    用户 ID 映射为连续的行号，增删边先记在少量的增量表里，积累到一定数量后再合并重建 CSR
+  - 连通分量用向量化的标签传播（挂接 + 指针跳跃）计算，共同好友推荐用 np.unique 计数，
+    不需要逐个集合遍历
+  - generate_community_edges 与原来逐对遍历的生成过程同分布：按相同的用户对顺序，好友概率为
+    base_probability / max(社区大小)^2，社区随成边合并；用几何跳跃只抽取候选对，
+    再按真实概率与上界之比接受，总耗时与边数成正比，而不是与用户数的平方成正比
+
+用法:
+    from social_graph import FriendGraph, generate_community_edges
+    src, dst = generate_community_edges(1000000, 0.99)
+    graph = FriendGraph.from_edges(user_ids, user_ids[src], user_ids[dst])
+    graph.neighbors(user_id)
+"""
+import math
+import random
+from array import array
+import numpy as np
+
+
+def generate_community_edges(num_users, base_probability, rng=None):
+    """
+    按社区大小平方衰减的概率生成好友关系
+
+    依次处理用户对 (i, j)，i < j：成为好友的概率为 base_probability / max(|C_i|, |C_j|)^2，
+    C 为当前所在社区（由已生成的好友关系连通而成）。第 i 行中 |C_i| 不变时，
+    base_probability / |C_i|^2 是所有 j 的概率上界，以它做几何跳跃得到候选 j，再以 (|C_i| / max)^2 接受
+
+    参数:
+        num_users: 用户数
+        base_probability: 基础好友关系建立概率
+        rng: random.Random 实例
+
+    返回: (src, dst) 行号数组 (int32)，src < dst
+    """
+    rng = random.Random() if rng is None else rng
+    parent = list(range(num_users))
+    size = [1] * num_users
+
+    def find(x):
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    src = array('i')
+    dst = array('i')
+    for i in range(num_users - 1):
+        j = i
+        while True:
+            root_i = find(i)
+            size_i = size[root_i]
+            bound = base_probability / (size_i * size_i)
+            if bound >= 1:
+                j += 1
+            else:
+                j += 1 + int(math.log(1.0 - rng.random()) / math.log(1.0 - bound))
+            if j >= num_users:
+                break
+            root_j = find(j)
+            size_j = size[root_j]
+            if size_j > size_i and rng.random() >= (size_i / size_j) ** 2:
+                continue
+            src.append(i)
+            dst.append(j)
+            if root_i != root_j:
+                if size_i < size_j:
+                    root_i, root_j = root_j, root_i
+                parent[root_j] = root_i
+                size[root_i] += size[root_j]
+    return np.frombuffer(src, dtype=np.int32).copy(), np.frombuffer(dst, dtype=np.int32).copy()
+
+
+def _build_csr(num_rows, src, dst):
+    """由无向边（每条边一次）建立对称的 CSR，每行邻居升序且去重"""
+    rows = np.concatenate([src, dst]).astype(np.int64)
+    cols = np.concatenate([dst, src]).astype(np.int64)
+    keep = rows != cols
+    keys = np.unique(rows[keep] * max(num_rows, 1) + cols[keep])
+    rows, cols = np.divmod(keys, max(num_rows, 1))
+    indptr = np.zeros(num_rows + 1, dtype=np.int64)
+    np.cumsum(np.bincount(rows, minlength=num_rows), out=indptr[1:])
+    return indptr, cols.astype(np.int32)
+
+
+class FriendGraph:
+    """以用户 ID 为节点的无向好友关系图"""
+
+    def __init__(self):
+        self.ids = []            # 行号 -> 用户 ID
+        self.index = {}          # 用户 ID -> 行号
+        self.alive = bytearray() # 行号是否仍是有效用户
+        self.indptr = np.zeros(1, dtype=np.int64)
+        self.indices = np.empty(0, dtype=np.int32)
+        self._added = {}         # 行号 -> CSR 之外新增的邻居行号集合
+        self._removed = {}       # 行号 -> CSR 中已删除的邻居行号集合
+        self._pending = 0        # 增量表中的条目数
+
+    @classmethod
+    def from_edges(cls, user_ids, src_ids, dst_ids):
+        """由用户列表和好友对（用户 ID）一次性建立"""
+        graph = cls()
+        for user_id in user_ids:
+            graph.add_node(user_id)
+        lookup = graph.index
+        src = np.fromiter((lookup[u] for u in src_ids), dtype=np.int64, count=len(src_ids))
+        dst = np.fromiter((lookup[u] for u in dst_ids), dtype=np.int64, count=len(dst_ids))
+        graph.indptr, graph.indices = _build_csr(len(graph.ids), src, dst)
+        return graph
+
+    def __len__(self):
+        return len(self.index)
+
+    def __contains__(self, user_id):
+        return user_id in self.index
+
+    # ---------- 节点 ----------
+    def add_node(self, user_id):
+        if user_id in self.index:
+            return False
+        self.index[user_id] = len(self.ids)
+        self.ids.append(user_id)
+        self.alive.append(1)
+        return True
+
+    def remove_node(self, user_id):
+        if user_id not in self.index:
+            return False
+        for friend_id in self.neighbors(user_id):
+            self.remove_edge(user_id, friend_id)
+        row = self.index.pop(user_id)
+        self.alive[row] = 0
+        return True
+
+    # ---------- 边 ----------
+    def _base_row(self, row):
+        if row + 1 < len(self.indptr):
+            return self.indices[self.indptr[row]:self.indptr[row + 1]]
+        return self.indices[:0]
+
+    def _in_base(self, row, other):
+        base = self._base_row(row)
+        position = np.searchsorted(base, other)
+        return position < len(base) and base[position] == other
+
+    def _has_edge_rows(self, a, b):
+        if b in self._added.get(a, ()):
+            return True
+        return self._in_base(a, b) and b not in self._removed.get(a, ())
+
+    def has_edge(self, user_id_1, user_id_2):
+        if user_id_1 not in self.index or user_id_2 not in self.index:
+            return False
+        return self._has_edge_rows(self.index[user_id_1], self.index[user_id_2])
+
+    def add_edge(self, user_id_1, user_id_2):
+        a, b = self.index[user_id_1], self.index[user_id_2]
+        if a == b or self._has_edge_rows(a, b):
+            return False
+        for x, y in ((a, b), (b, a)):
+            removed = self._removed.get(x)
+            if removed and y in removed:
+                removed.discard(y)
+            else:
+                self._added.setdefault(x, set()).add(y)
+            self._pending += 1
+        self._maybe_compact()
+        return True
+
+    def remove_edge(self, user_id_1, user_id_2):
+        a, b = self.index[user_id_1], self.index[user_id_2]
+        if not self._has_edge_rows(a, b):
+            return False
+        for x, y in ((a, b), (b, a)):
+            added = self._added.get(x)
+            if added and y in added:
+                added.discard(y)
+            else:
+                self._removed.setdefault(x, set()).add(y)
+            self._pending += 1
+        self._maybe_compact()
+        return True
+
+    def _neighbor_rows(self, row):
+        """某行的全部邻居行号 (int64 数组)"""
+        rows = self._base_row(row)
+        removed = self._removed.get(row)
+        if removed:
+            rows = rows[~np.isin(rows, np.fromiter(removed, dtype=np.int64, count=len(removed)))]
+        added = self._added.get(row)
+        if added:
+            rows = np.concatenate([rows, np.fromiter(added, dtype=np.int64, count=len(added))])
+        return rows.astype(np.int64, copy=False)
+
+    def neighbors(self, user_id):
+        """好友的用户 ID 列表"""
+        ids = self.ids
+        return [ids[row] for row in self._neighbor_rows(self.index[user_id])]
+
+    def degree(self, user_id):
+        row = self.index[user_id]
+        return len(self._base_row(row)) - len(self._removed.get(row, ())) + len(self._added.get(row, ()))
+
+    # ---------- 合并增量 ----------
+    def _maybe_compact(self):
+        if self._pending > 1024 + len(self.indices) // 8:
+            self.compact()
+
+    def compact(self):
+        """把增量表并入 CSR，并去掉已删除的用户，行号重新连续编号"""
+        src, dst = self._edge_rows()
+        alive_rows = np.flatnonzero(np.frombuffer(bytes(self.alive), dtype=np.uint8))
+        new_row = np.full(len(self.ids), -1, dtype=np.int64)
+        new_row[alive_rows] = np.arange(len(alive_rows))
+        self.ids = [self.ids[row] for row in alive_rows]
+        self.index = {user_id: row for row, user_id in enumerate(self.ids)}
+        self.alive = bytearray(b'\x01' * len(self.ids))
+        self.indptr, self.indices = _build_csr(len(self.ids), new_row[src], new_row[dst])
+        self._added = {}
+        self._removed = {}
+        self._pending = 0
+
+    def _edge_rows(self):
+        """全部边的行号 (src, dst)，每条边一次 (src < dst)"""
+        rows = np.repeat(np.arange(len(self.indptr) - 1, dtype=np.int64), np.diff(self.indptr))
+        cols = self.indices.astype(np.int64)
+        if self._removed:
+            removed = np.array([(x, y) for x, ys in self._removed.items() for y in ys], dtype=np.int64).reshape(-1, 2)
+            num_rows = max(len(self.ids), 1)
+            keep = ~np.isin(rows * num_rows + cols, removed[:, 0] * num_rows + removed[:, 1])
+            rows, cols = rows[keep], cols[keep]
+        if self._added:
+            added = np.array([(x, y) for x, ys in self._added.items() for y in ys], dtype=np.int64).reshape(-1, 2)
+            rows = np.concatenate([rows, added[:, 0]])
+            cols = np.concatenate([cols, added[:, 1]])
+        upper = rows < cols
+        return rows[upper], cols[upper]
+
+    # ---------- 查询 ----------
+    def edges(self):
+        """全部好友对的用户 ID (src, dst) 数组"""
+        src, dst = self._edge_rows()
+        ids = np.asarray(self.ids)
+        return ids[src], ids[dst]
+
+    def degrees(self):
+        """{用户 ID: 好友数}"""
+        counts = np.diff(self.indptr)
+        counts = np.concatenate([counts, np.zeros(len(self.ids) - len(counts), dtype=counts.dtype)])
+        for row, removed in self._removed.items():
+            counts[row] -= len(removed)
+        for row, added in self._added.items():
+            counts[row] += len(added)
+        return {user_id: int(counts[row]) for user_id, row in self.index.items()}
+
+    def connected_components(self):
+        """连通分量（用户 ID 列表的列表），按分量中最小行号排序"""
+        src, dst = self._edge_rows()
+        labels = np.arange(len(self.ids), dtype=np.int64)
+        while True:
+            # 挂接：每条边两端取较小的标签；再指针跳跃压缩到根
+            low = np.minimum(labels[src], labels[dst])
+            before = labels.copy()
+            np.minimum.at(labels, labels[src], low)
+            np.minimum.at(labels, labels[dst], low)
+            while True:
+                jumped = labels[labels]
+                if np.array_equal(jumped, labels):
+                    break
+                labels = jumped
+            if np.array_equal(labels, before):
+                break
+        alive_rows = np.flatnonzero(np.frombuffer(bytes(self.alive), dtype=np.uint8))
+        order = alive_rows[np.argsort(labels[alive_rows], kind='stable')]
+        sorted_labels = labels[order]
+        splits = np.flatnonzero(np.diff(sorted_labels)) + 1
+        ids = self.ids
+        return [[ids[row] for row in group] for group in np.split(order, splits)] if len(order) else []
+
+    def shortest_path(self, user_id_1, user_id_2):
+        """广度优先搜索最短路径（用户 ID 列表），不连通时返回空列表"""
+        start, goal = self.index[user_id_1], self.index[user_id_2]
+        parents = {start: -1}
+        frontier = [start]
+        while frontier and goal not in parents:
+            next_frontier = []
+            for row in frontier:
+                for neighbor in self._neighbor_rows(row).tolist():
+                    if neighbor not in parents:
+                        parents[neighbor] = row
+                        next_frontier.append(neighbor)
+            frontier = next_frontier
+        if goal not in parents:
+            return []
+        path = []
+        row = goal
+        while row != -1:
+            path.append(self.ids[row])
+            row = parents[row]
+        return path[::-1]
+
+    def mutual_friend_counts(self, user_id):
+        """非好友的二度好友及共同好友数 [(用户 ID, 数量)]，按数量降序、用户 ID 升序"""
+        row = self.index[user_id]
+        friends = self._neighbor_rows(row)
+        if not len(friends):
+            return []
+        candidates = np.concatenate([self._neighbor_rows(friend) for friend in friends.tolist()])
+        candidates = candidates[(candidates != row) & ~np.isin(candidates, friends)]
+        rows, counts = np.unique(candidates, return_counts=True)
+        ids = self.ids
+        result = [(ids[r], int(c)) for r, c in zip(rows.tolist(), counts.tolist())]
+        result.sort(key=lambda item: (-item[1], item[0]))
+        return result
@@ -10,6 +10,10 @@ import networkx as nx
 import matplotlib.pyplot as plt
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 
+# 好友关系图存储与随机生成、增量持久化
+from social_graph import FriendGraph, generate_community_edges
+from network_store import NetworkStore
+
 # ===========================
 # 初始生成用户数据的参数
 # ===========================
@@ -38,42 +42,36 @@ INTERESTS_POOL = [
 # ===========================
 # 用户类
 # ===========================
+# 好友关系只保存在 SocialNetwork.graph 中
 class User:
+    __slots__ = ('user_id', 'name', 'age', 'interests')
+
     def __init__(self, user_id, name, age, interests=None):
         self.user_id = user_id
         self.name = name
         self.age = age
-        self.friends = set()
         self.interests = interests if interests else set()
 
-    def add_friend(self, friend_id):
-        self.friends.add(friend_id)
-
-    def remove_friend(self, friend_id):
-        self.friends.discard(friend_id)
-
     def add_interest(self, interest):
         self.interests.add(interest)
 
-    def to_dict(self):
+    def to_dict(self, friends=()):
         return {
             'user_id': self.user_id,
             'name': self.name,
             'age': self.age,
-            'friends': list(self.friends),
+            'friends': list(friends),
             'interests': list(self.interests)
         }
 
     @staticmethod
     def from_dict(data):
-        user = User(
+        return User(
             user_id=data['user_id'],
             name=data['name'],
             age=data['age'],
             interests=set(data.get('interests', []))
         )
-        user.friends = set(data.get('friends', []))
-        return user
 
 # ===========================
 # 社交网络类
@@ -81,29 +79,63 @@ class User:
 class SocialNetwork:
     def __init__(self):
         self.users = {}
-        self.adj_list = {}
-        self.data_file = 'social_network_data.json'
+        self.graph = FriendGraph()
+        self.data_file = 'social_network_data.json'  # 旧版整体保存的 JSON，首次启动时导入
+        self.store = NetworkStore('social_network_data')
         self.load_data()
 
-    # 保存数据
+    # 保存数据：写入完整快照并清空操作日志
     def save_data(self):
-        data = {
-            'users': [user.to_dict() for user in self.users.values()]
-        }
-        with open(self.data_file, 'w') as f:
-            json.dump(data, f, indent=4)
+        users = [[user_id, user.name, user.age, sorted(user.interests)] for user_id, user in self.users.items()]
+        src, dst = self.graph.edges()
+        self.store.write_snapshot(users, src, dst)
         print("Data saved successfully.")
 
-    # 加载数据
+    # 记录一次修改：只在操作日志末尾追加一行，日志较长时再写快照
+    def record(self, op):
+        self.store.append(op)
+        if self.store.needs_compaction():
+            self.save_data()
+
+    # 重放一条日志中的修改
+    def apply_op(self, op):
+        kind = op['op']
+        if kind == 'add_user':
+            self.users[op['user_id']] = User(op['user_id'], op['name'], op['age'], set(op['interests']))
+            self.graph.add_node(op['user_id'])
+        elif kind == 'remove_user':
+            self.graph.remove_node(op['user_id'])
+            del self.users[op['user_id']]
+        elif kind == 'add_friendship':
+            self.graph.add_edge(op['user_id_1'], op['user_id_2'])
+        elif kind == 'remove_friendship':
+            self.graph.remove_edge(op['user_id_1'], op['user_id_2'])
+
+    # 加载数据：读取快照，只重放快照之后的操作日志
     def load_data(self):
-        if os.path.exists(self.data_file):
+        if self.store.exists():
+            users, (src, dst), ops = self.store.load()
+            for user_id, name, age, interests in users:
+                self.users[user_id] = User(user_id, name, age, set(interests))
+            self.graph = FriendGraph.from_edges(list(self.users), src.tolist(), dst.tolist())
+            for op in ops:
+                self.apply_op(op)
+            print(f"Data loaded successfully ({len(ops)} logged changes replayed).")
+        elif os.path.exists(self.data_file):
             with open(self.data_file, 'r') as f:
                 data = json.load(f)
+                src, dst = [], []
                 for user_data in data['users']:
                     user = User.from_dict(user_data)
                     self.users[user.user_id] = user
-                    self.adj_list[user.user_id] = user.friends
+                    for friend_id in user_data.get('friends', []):
+                        src.append(user.user_id)
+                        dst.append(friend_id)
+                # 忽略指向不存在用户的好友记录
+                pairs = [(a, b) for a, b in zip(src, dst) if b in self.users]
+                self.graph = FriendGraph.from_edges(list(self.users), [a for a, _ in pairs], [b for _, b in pairs])
             print("Data loaded successfully.")
+            self.save_data()
         else:
             print("No existing data found. Generating random initial data...")
             self.generate_random_data()
@@ -119,40 +151,12 @@ class SocialNetwork:
             interests = set(random.sample(INTERESTS_POOL, k=random.randint(1, 3)))
             user = User(user_id, name, age, interests)
             self.users[user_id] = user
-            self.adj_list[user_id] = set()
 
-        # 调整好友关系建立方式
+        # 好友关系：按用户对顺序、以社区大小平方衰减的概率建立，社区随好友关系合并；
+        # 只抽取候选用户对，耗时与好友关系数成正比
         user_ids = list(self.users.keys())
-
-        # 初始化每个用户的社区为自身
-        communities = {user_id: {user_id} for user_id in user_ids}
-
-        # 遍历所有可能的用户对
-        for i in range(len(user_ids)):
-            for j in range(i + 1, len(user_ids)):
-                user_id_1 = user_ids[i]
-                user_id_2 = user_ids[j]
-
-                # 获取两个用户所属的社区
-                community_1 = communities[user_id_1]
-                community_2 = communities[user_id_2]
-
-                # 计算两个社区的大小
-                size_1 = len(community_1)
-                size_2 = len(community_2)
-
-                # 计算好友关系建立概率，采用平方衰减
-                size_factor = 1 / (max(size_1, size_2) ** 2)
-                friendship_probability = BASE_FRIENDSHIP_PROBABILITY * size_factor
-
-                if random.random() < friendship_probability:
-                    self.add_friendship(user_id_1, user_id_2, save=False)
-
-                    # 合并社区
-                    if community_1 is not community_2:
-                        merged_community = community_1.union(community_2)
-                        for uid in merged_community:
-                            communities[uid] = merged_community
+        src, dst = generate_community_edges(len(user_ids), BASE_FRIENDSHIP_PROBABILITY, random)
+        self.graph = FriendGraph.from_edges(user_ids, [user_ids[i] for i in src.tolist()], [user_ids[j] for j in dst.tolist()])
 
     # 其他方法保持不变（略）
 
@@ -163,8 +167,8 @@ class SocialNetwork:
             return False
         user = User(user_id, name, age, interests)
         self.users[user_id] = user
-        self.adj_list[user_id] = set()
-        self.save_data()
+        self.graph.add_node(user_id)
+        self.record({'op': 'add_user', 'user_id': user_id, 'name': name, 'age': age, 'interests': sorted(user.interests)})
         return True
 
     # 删除用户
@@ -172,12 +176,9 @@ class SocialNetwork:
         if user_id not in self.users:
             messagebox.showerror("Error", f"User ID {user_id} does not exist.")
             return False
-        for friend_id in self.adj_list[user_id]:
-            self.adj_list[friend_id].remove(user_id)
-            self.users[friend_id].remove_friend(user_id)
+        self.graph.remove_node(user_id)
         del self.users[user_id]
-        del self.adj_list[user_id]
-        self.save_data()
+        self.record({'op': 'remove_user', 'user_id': user_id})
         return True
 
     # 建立朋友关系
@@ -186,26 +187,20 @@ class SocialNetwork:
             if save:
                 messagebox.showerror("Error", "One or both users do not exist.")
             return False
-        if user_id_2 in self.adj_list[user_id_1]:
+        if self.graph.has_edge(user_id_1, user_id_2):
             if save:
                 messagebox.showinfo("Info", "Friendship already exists.")
             return False
-        self.adj_list[user_id_1].add(user_id_2)
-        self.adj_list[user_id_2].add(user_id_1)
-        self.users[user_id_1].add_friend(user_id_2)
-        self.users[user_id_2].add_friend(user_id_1)
+        self.graph.add_edge(user_id_1, user_id_2)
         if save:
-            self.save_data()
+            self.record({'op': 'add_friendship', 'user_id_1': user_id_1, 'user_id_2': user_id_2})
         return True
 
     # 取消朋友关系
     def remove_friendship(self, user_id_1, user_id_2):
-        if user_id_1 in self.adj_list and user_id_2 in self.adj_list[user_id_1]:
-            self.adj_list[user_id_1].remove(user_id_2)
-            self.users[user_id_1].remove_friend(user_id_2)
-            self.adj_list[user_id_2].remove(user_id_1)
-            self.users[user_id_2].remove_friend(user_id_1)
-            self.save_data()
+        if self.graph.has_edge(user_id_1, user_id_2):
+            self.graph.remove_edge(user_id_1, user_id_2)
+            self.record({'op': 'remove_friendship', 'user_id_1': user_id_1, 'user_id_2': user_id_2})
             return True
         else:
             messagebox.showerror("Error", "Friendship does not exist.")
@@ -216,67 +211,27 @@ class SocialNetwork:
         if user_id not in self.users:
             messagebox.showerror("Error", f"User ID {user_id} does not exist.")
             return []
-        user_friends = self.adj_list[user_id]
-        recommendations = {}
-        for friend_id in user_friends:
-            friends_of_friend = self.adj_list[friend_id]
-            for potential_friend in friends_of_friend:
-                if potential_friend != user_id and potential_friend not in user_friends:
-                    recommendations[potential_friend] = recommendations.get(potential_friend, 0) + 1
-        if not recommendations:
-            return []
-        sorted_recommendations = sorted(recommendations.items(), key=lambda x: x[1], reverse=True)
-        return sorted_recommendations
+        return self.graph.mutual_friend_counts(user_id)
 
     # 使用 BFS 找到两个用户之间的最短路径
     def find_shortest_path(self, user_id_1, user_id_2):
-        from collections import deque
         if user_id_1 not in self.users or user_id_2 not in self.users:
             messagebox.showerror("Error", "One or both users do not exist.")
             return []
-        visited = set()
-        queue = deque()
-        queue.append((user_id_1, [user_id_1]))
-        visited.add(user_id_1)
-        while queue:
-            current_user, path = queue.popleft()
-            if current_user == user_id_2:
-                return path
-            for neighbor in self.adj_list[current_user]:
-                if neighbor not in visited:
-                    visited.add(neighbor)
-                    queue.append((neighbor, path + [neighbor]))
-        return []
+        return self.graph.shortest_path(user_id_1, user_id_2)
 
     # 找出网络中的关键用户，基于度中心性
     def find_influencers(self):
         if not self.users:
             return []
-        degree_centrality = {}
-        for user_id in self.users:
-            degree_centrality[user_id] = len(self.adj_list[user_id])
+        degree_centrality = self.graph.degrees()
         max_degree = max(degree_centrality.values())
         influencers = [user_id for user_id, degree in degree_centrality.items() if degree == max_degree]
         return influencers
 
-    # 使用 DFS 找到网络中的社区
+    # 找到网络中的社区（连通分量）
     def find_communities(self):
-        visited = set()
-        communities = []
-
-        def dfs(current_user, community):
-            visited.add(current_user)
-            community.append(current_user)
-            for neighbor in self.adj_list[current_user]:
-                if neighbor not in visited:
-                    dfs(neighbor, community)
-
-        for user_id in self.users:
-            if user_id not in visited:
-                community = []
-                dfs(user_id, community)
-                communities.append(community)
-        return communities
+        return self.graph.connected_components()
 
     # 基于兴趣推荐朋友
     def recommend_friends_by_interest(self, user_id):
@@ -284,9 +239,10 @@ class SocialNetwork:
             messagebox.showerror("Error", f"User ID {user_id} does not exist.")
             return []
         user = self.users[user_id]
+        friends = set(self.graph.neighbors(user_id))
         recommendations = {}
         for other_id, other_user in self.users.items():
-            if other_id != user_id and other_id not in user.friends:
+            if other_id != user_id and other_id not in friends:
                 common_interests = user.interests.intersection(other_user.interests)
                 if common_interests:
                     recommendations[other_id] = len(common_interests)
@@ -299,27 +255,14 @@ class SocialNetwork:
     def is_network_connected(self):
         if not self.users:
             return False
-        from collections import deque
-        visited = set()
-        start_user = next(iter(self.users))
-        queue = deque()
-        queue.append(start_user)
-        while queue:
-            current_user = queue.popleft()
-            if current_user not in visited:
-                visited.add(current_user)
-                queue.extend(self.adj_list[current_user] - visited)
-        return len(visited) == len(self.users)
+        return len(self.graph.connected_components()) == 1
 
     # 绘制网络图
     def draw_network(self, canvas_frame):
         G = nx.Graph()
         G.add_nodes_from(self.users.keys())
-        for user_id, friends in self.adj_list.items():
-            for friend_id in friends:
-                if G.has_edge(user_id, friend_id) or user_id == friend_id:
-                    continue
-                G.add_edge(user_id, friend_id)
+        src, dst = self.graph.edges()
+        G.add_edges_from(zip(src.tolist(), dst.tolist()))
 
         plt.clf()  # 清除之前的图像
         pos = nx.spring_layout(G)
@@ -518,7 +461,7 @@ class SocialNetworkApp:
             return
         msg = ""
         for user_id, user in self.network.users.items():
-            msg += f"User ID: {user_id}, Name: {user.name}, Age: {user.age}, Friends: {sorted(list(user.friends))}\n"
+            msg += f"User ID: {user_id}, Name: {user.name}, Age: {user.age}, Friends: {sorted(self.network.graph.neighbors(user_id))}\n"
         messagebox.showinfo("Users", msg)
 
     # 刷新网络图
@@ -0,0 +1,146 @@
+"""
+批量视频任务的并发调度，中断后可续跑
+
+  - 同时运行 n_workers 个任务（每个任务通常是一个 ffmpeg 子进程，用线程调度即可）；
+    按文件大小从大到小开始，减少最后只剩一个大文件在跑的情况
+  - 每个文件的状态 (pending/running/done/failed) 及其大小、修改时间保存在 JSON 状态文件中，
+    每次状态变化都原子替换写入；重新运行时跳过已完成且输入未变、输出仍有效的文件，
+    上次中断时 running 的任务和失败的任务重新执行
+  - plan_workers 按 CPU 核数决定并发数和每个编码进程的线程数：单个 libx264 进程线程多了扩展性差，
+    几个进程各用一部分核的总吞吐更高
+
+用法:
+    from job_scheduler import JobStore, run_jobs, plan_workers
+    n_workers, threads = plan_workers()
+    store = JobStore(os.path.join(directory, '.compress_jobs.json'))
+    results = run_jobs(video_files, lambda path: compress_video(path, threads=threads), store,
+                       n_workers=n_workers, is_done=is_valid_output)
+"""
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+
+def plan_workers(n_workers=None, cpu_count=None, threads_per_job=4, max_usage=1.0):
+    """
+    决定并发任务数和每个任务的线程数
+
+    参数:
+        n_workers: 指定并发数，None 时按 核数 / threads_per_job 计算
+        cpu_count: CPU 核数，None 时自动获取
+        threads_per_job: 默认每个编码进程使用的线程数
+        max_usage: 可使用的核数比例
+
+    返回: (n_workers, threads)
+    """
+    cpu_count = cpu_count or os.cpu_count() or 1
+    usable = max(1, int(cpu_count * max_usage))
+    if n_workers is None:
+        n_workers = max(1, usable // threads_per_job)
+    return n_workers, max(1, usable // n_workers)
+
+
+class JobStore:
+    """每个输入文件一条任务记录，保存在 JSON 文件中"""
+
+    def __init__(self, path):
+        self.path = path
+        self.jobs = {}
+        self._lock = threading.Lock()
+        if os.path.exists(path):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    self.jobs = json.load(f)
+            except (OSError, ValueError):
+                self.jobs = {}
+
+    @staticmethod
+    def _signature(path):
+        stat = os.stat(path)
+        return {'size': stat.st_size, 'mtime': stat.st_mtime}
+
+    def _key(self, path):
+        return os.path.abspath(path)
+
+    def is_done(self, path):
+        """任务已完成且输入文件在完成后没有改变"""
+        job = self.jobs.get(self._key(path))
+        if job is None or job.get('state') != 'done':
+            return False
+        signature = self._signature(path)
+        return job.get('size') == signature['size'] and job.get('mtime') == signature['mtime']
+
+    def update(self, path, state, **info):
+        """记录任务状态并立即写盘"""
+        with self._lock:
+            job = dict(self._signature(path), state=state, **info)
+            self.jobs[self._key(path)] = job
+            tmp_path = self.path + '.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self.jobs, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, self.path)
+
+
+def run_jobs(files, worker, store, n_workers=1, is_done=None, stop_on_first_failure=True, log=print):
+    """
+    并发执行一批任务
+
+    参数:
+        files: 输入文件路径列表
+        worker: worker(path) -> bool，成功返回 True
+        store: JobStore
+        n_workers: 并发数
+        is_done: is_done(path) -> bool，检查输出是否已存在且有效；提供时只有为 True 的文件不再处理，
+            未提供时按状态文件中的记录跳过
+        stop_on_first_failure: 先单独运行最小的一个任务，失败则不再继续（通常是编码器或参数的问题）
+        log: 输出函数
+
+    返回: {'done': [...], 'failed': [...], 'skipped': [...]}
+    """
+    results = {'done': [], 'failed': [], 'skipped': []}
+    pending = []
+    for path in files:
+        # 提供了输出检查时以输出为准：记录为完成但输出已被删除或损坏的文件重新处理
+        if is_done(path) if is_done is not None else store.is_done(path):
+            if not store.is_done(path):
+                store.update(path, 'done')
+            results['skipped'].append(path)
+        else:
+            pending.append(path)
+    if results['skipped']:
+        log(f"跳过 {len(results['skipped'])} 个已完成的文件")
+    if not pending:
+        return results
+
+    pending.sort(key=lambda path: os.path.getsize(path), reverse=True)
+    total = len(pending)
+    counter = {'finished': 0}
+    counter_lock = threading.Lock()
+
+    def run_one(path):
+        store.update(path, 'running')
+        try:
+            success = bool(worker(path))
+            error = None
+        except Exception as e:
+            success = False
+            error = str(e)
+        store.update(path, 'done' if success else 'failed', **({'error': error} if error else {}))
+        with counter_lock:
+            counter['finished'] += 1
+            log(f"[{counter['finished']}/{total}] {'完成' if success else '失败'}: {os.path.basename(path)}")
+        return success
+
+    if stop_on_first_failure:
+        first = pending.pop()
+        if not run_one(first):
+            results['failed'].append(first)
+            return results
+        results['done'].append(first)
+
+    with ThreadPoolExecutor(max_workers=max(1, n_workers)) as executor:
+        futures = {executor.submit(run_one, path): path for path in pending}
+        for future in as_completed(futures):
+            results['done' if future.result() else 'failed'].append(futures[future])
+    return results
@@ -0,0 +1,188 @@
+"""
+视频元数据读取：ffprobe JSON 输出 + 本地 SQLite 缓存
+
+  - 每个文件只调用一次 ffprobe -print_format json -show_format -show_streams，
+    结构化读取时长、码率、帧率、编解码器、分辨率，不再用正则解析 ffmpeg -i 的 stderr
+  - 帧率取 avg_frame_rate（总帧数 / 时长），可变帧率 (VFR) 文件也能得到正确的平均帧率；
+    r_frame_rate 与之不同时 vfr 为 True
+  - 结果按 (绝对路径, 大小, 修改时间) 缓存在 SQLite 中，文件未变时再次运行不调用 ffprobe；
+    缓存默认放在视频所在目录的 .media_probe.sqlite
+  - probe_many 用线程池并发探测一批文件中未缓存的部分
+
+用法:
+    from media_probe import probe, probe_many
+    info = probe('video.mp4', ffprobe=FFPROBE_PATH)
+    info['bitrate'], info['fps'], info['duration'], info['width'], info['has_audio']
+    infos = probe_many(video_files, ffprobe=FFPROBE_PATH, n_workers=8)
+"""
+import json
+import os
+import sqlite3
+import subprocess
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+CACHE_NAME = '.media_probe.sqlite'
+
+_lock = threading.Lock()
+
+
+def _parse_rate(rate):
+    """ffprobe 的帧率 '30000/1001' 转为浮点数，无效时返回 None"""
+    try:
+        numerator, _, denominator = rate.partition('/')
+        value = float(numerator) / float(denominator or 1)
+    except (AttributeError, ValueError, ZeroDivisionError):
+        return None
+    return value if value > 0 else None
+
+
+def _to_float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def parse_probe_output(data, file_size=None):
+    """
+    整理 ffprobe 的 JSON 输出
+
+    返回: {'duration': 秒, 'bitrate': 总码率 kb/s, 'fps': 平均帧率, 'r_fps': 基础帧率, 'vfr': bool,
+           'video_codec', 'audio_codec', 'width', 'height', 'video_bitrate': kb/s,
+           'has_video', 'has_audio', 'format'}；没有的项为 None
+    """
+    fmt = data.get('format', {})
+    streams = data.get('streams', [])
+    # 封面图片也是 video 流，带 attached_pic 标记，不算视频
+    video = next((s for s in streams if s.get('codec_type') == 'video'
+                  and not s.get('disposition', {}).get('attached_pic')), None)
+    audio = next((s for s in streams if s.get('codec_type') == 'audio'), None)
+
+    duration = _to_float(fmt.get('duration'))
+    if duration is None and video is not None:
+        duration = _to_float(video.get('duration'))
+    bit_rate = _to_float(fmt.get('bit_rate'))
+    if bit_rate is None and duration and file_size:
+        bit_rate = file_size * 8 / duration
+
+    info = {
+        'duration': duration,
+        'bitrate': int(bit_rate // 1000) if bit_rate else None,
+        'format': fmt.get('format_name'),
+        'has_video': video is not None,
+        'has_audio': audio is not None,
+        'audio_codec': audio.get('codec_name') if audio else None,
+        'video_codec': None, 'width': None, 'height': None, 'video_bitrate': None,
+        'fps': None, 'r_fps': None, 'vfr': False,
+    }
+    if video is not None:
+        avg_fps = _parse_rate(video.get('avg_frame_rate'))
+        r_fps = _parse_rate(video.get('r_frame_rate'))
+        video_bit_rate = _to_float(video.get('bit_rate'))
+        info.update({
+            'video_codec': video.get('codec_name'),
+            'width': video.get('width'),
+            'height': video.get('height'),
+            'video_bitrate': int(video_bit_rate // 1000) if video_bit_rate else None,
+            'fps': avg_fps or r_fps,
+            'r_fps': r_fps,
+            'vfr': bool(avg_fps and r_fps and abs(avg_fps - r_fps) > 0.01),
+        })
+    return info
+
+
+def run_ffprobe(path, ffprobe='ffprobe', timeout=60):
+    """调用 ffprobe 读取文件信息，失败返回 None"""
+    command = [ffprobe, '-v', 'error', '-print_format', 'json', '-show_format', '-show_streams', path]
+    try:
+        result = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                                text=True, encoding='utf-8', timeout=timeout)
+        data = json.loads(result.stdout or '{}')
+    except (subprocess.TimeoutExpired, OSError, ValueError):
+        return None
+    if result.returncode != 0 or not data.get('format'):
+        return None
+    return parse_probe_output(data, os.path.getsize(path))
+
+
+class ProbeCache:
+    """(绝对路径, 大小, 修改时间) -> 元数据 的 SQLite 缓存，可在多个线程间共用"""
+
+    def __init__(self, path):
+        self.path = path
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute('CREATE TABLE IF NOT EXISTS probes '
+                           '(path TEXT PRIMARY KEY, size INTEGER, mtime REAL, data TEXT)')
+        self._conn.commit()
+
+    def get(self, path, size, mtime):
+        with _lock:
+            row = self._conn.execute('SELECT size, mtime, data FROM probes WHERE path = ?', (path,)).fetchone()
+        if row is None or row[0] != size or row[1] != mtime:
+            return None
+        return json.loads(row[2])
+
+    def put(self, path, size, mtime, info):
+        with _lock:
+            self._conn.execute('INSERT OR REPLACE INTO probes VALUES (?, ?, ?, ?)',
+                               (path, size, mtime, json.dumps(info)))
+            self._conn.commit()
+
+    def close(self):
+        self._conn.close()
+
+
+_caches = {}
+
+
+def _get_cache(cache_path):
+    with _lock:
+        if cache_path not in _caches:
+            _caches[cache_path] = ProbeCache(cache_path)
+        return _caches[cache_path]
+
+
+def probe(path, ffprobe='ffprobe', cache_path=None, use_cache=True):
+    """
+    读取视频文件的元数据，优先使用缓存
+
+    参数:
+        path: 视频文件路径
+        ffprobe: ffprobe 可执行文件路径
+        cache_path: 缓存数据库路径，默认为视频所在目录下的 .media_probe.sqlite
+        use_cache: 为 False 时总是重新探测（结果仍写入缓存）
+
+    返回: parse_probe_output 的字典；文件不存在或 ffprobe 无法识别时返回 None（失败不缓存）
+    """
+    path = os.path.abspath(path)
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    if cache_path is None:
+        cache_path = os.path.join(os.path.dirname(path), CACHE_NAME)
+    try:
+        cache = _get_cache(cache_path)
+    except sqlite3.Error:
+        cache = None  # 目录不可写时不使用缓存
+
+    if cache is not None and use_cache:
+        info = cache.get(path, stat.st_size, stat.st_mtime)
+        if info is not None:
+            return info
+    info = run_ffprobe(path, ffprobe)
+    if info is not None and cache is not None:
+        try:
+            cache.put(path, stat.st_size, stat.st_mtime, info)
+        except sqlite3.Error:
+            pass
+    return info
+
+
+def probe_many(paths, ffprobe='ffprobe', cache_path=None, n_workers=8):
+    """并发读取一批文件的元数据，返回 {路径: 字典或 None}"""
+    paths = list(paths)
+    with ThreadPoolExecutor(max_workers=max(1, n_workers)) as executor:
+        infos = executor.map(lambda path: probe(path, ffprobe, cache_path), paths)
+        return dict(zip(paths, infos))
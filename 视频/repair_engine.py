@@ -0,0 +1,229 @@
+"""
+视频修复引擎：结构扫描 -> 选择最省的修复方法 -> 抽样校验
+
+  - scan_structure 只读取 MP4 顶层 atom 的头部（每个 8~16 字节），判断 moov/mdat 是否存在、
+    moov 是否在 mdat 之后、文件是否被截断，再结合 ffprobe 的流信息决定可行的修复方法
+  - 方法按代价从低到高排列，不可行的方法直接跳过：
+      copy          流复制重新封装（原方法1）
+      faststart     流复制并把 moov 移到文件头（原方法4），moov 在 mdat 之后时使用
+      remux_streams 重新生成时间戳、丢弃损坏的包，只保留第一路视频和音频后流复制（原方法2，一条命令完成）
+      untrunc       缺少 moov（录制中断）时用同设备录制的完好视频作参考重建索引
+      reencode      容错解码后重新编码（原方法3）
+  - 每种方法直接写到输出文件旁的临时文件，校验通过后改名，不再写 temp_repair 副本再复制
+  - 校验只解码开头、中间、结尾各几秒，不再完整解码整个输出文件
+  - 原文件本身结构完好且抽样解码正常时不做修复
+  - repair_directory 用线程池同时修复一个目录中的多个文件
+
+用法:
+    from repair_engine import repair_file, repair_directory
+    result = repair_file('video.mp4', 'video_fixed.mp4')
+    results = repair_directory('.', n_workers=4)
+"""
+import os
+import struct
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from media_probe import probe
+
+MP4_EXTENSIONS = ('.mp4', '.m4v', '.mov', '.3gp')
+TOP_LEVEL_ATOMS = {'ftyp', 'moov', 'mdat', 'free', 'skip', 'wide', 'uuid', 'pdin', 'moof', 'mfra', 'meta', 'styp', 'sidx'}
+
+
+def scan_structure(path):
+    """
+    扫描 MP4 顶层 atom
+
+    返回: {'atoms': [(类型, 偏移, 大小), ...], 'has_moov', 'has_mdat', 'moov_after_mdat',
+           'truncated': 最后一个 atom 超出文件末尾, 'corrupt': 遇到无法识别的 atom 头}
+    """
+    file_size = os.path.getsize(path)
+    atoms = []
+    truncated = corrupt = False
+    with open(path, 'rb') as f:
+        offset = 0
+        while offset + 8 <= file_size:
+            f.seek(offset)
+            size, kind = struct.unpack('>I4s', f.read(8))
+            header_size = 8
+            if size == 1:
+                extended = f.read(8)
+                if len(extended) < 8:
+                    truncated = True
+                    break
+                size = struct.unpack('>Q', extended)[0]
+                header_size = 16
+            elif size == 0:
+                size = file_size - offset  # 延伸到文件末尾
+            kind = kind.decode('latin-1')
+            if size < header_size or kind not in TOP_LEVEL_ATOMS:
+                corrupt = True
+                break
+            atoms.append((kind, offset, size))
+            if offset + size > file_size:
+                truncated = True
+            offset += size
+    kinds = [kind for kind, _, _ in atoms]
+    return {
+        'atoms': atoms,
+        'has_moov': 'moov' in kinds,
+        'has_mdat': 'mdat' in kinds,
+        'moov_after_mdat': 'moov' in kinds and 'mdat' in kinds and kinds.index('moov') > kinds.index('mdat'),
+        'truncated': truncated,
+        'corrupt': corrupt,
+    }
+
+
+def choose_methods(structure, info, reference_file=None, untrunc=None):
+    """
+    根据结构扫描和流信息给出可行的修复方法，按代价从低到高
+
+    参数:
+        structure: scan_structure 的结果，非 MP4 容器为 None
+        info: media_probe.probe 的结果，ffprobe 无法识别时为 None
+        reference_file, untrunc: 同设备录制的完好视频和 untrunc 可执行文件，都提供时才会尝试 untrunc
+    """
+    can_untrunc = bool(reference_file and untrunc and os.path.exists(untrunc))
+    if structure is not None and structure['has_mdat'] and not structure['has_moov']:
+        # 没有索引 ffmpeg 无法读取，流复制和重新编码都不可行
+        return ['untrunc'] if can_untrunc else []
+    if info is None:
+        # 容器头损坏，只有容错解码可能读出内容
+        return (['untrunc'] if can_untrunc and structure is not None else []) + ['reencode']
+    first = 'faststart' if structure is not None and structure['moov_after_mdat'] else 'copy'
+    return [first, 'remux_streams', 'reencode']
+
+
+def _method_command(method, input_file, output_file, ffmpeg):
+    if method == 'copy':
+        return [ffmpeg, '-v', 'error', '-i', input_file, '-map', '0', '-c', 'copy', '-y', output_file]
+    if method == 'faststart':
+        return [ffmpeg, '-v', 'error', '-i', input_file, '-map', '0', '-c', 'copy',
+                '-movflags', 'faststart', '-y', output_file]
+    if method == 'remux_streams':
+        return [ffmpeg, '-v', 'error', '-fflags', '+genpts+discardcorrupt', '-err_detect', 'ignore_err',
+                '-i', input_file, '-map', '0:v:0', '-map', '0:a:0?', '-c', 'copy', '-y', output_file]
+    if method == 'reencode':
+        return [ffmpeg, '-v', 'error', '-err_detect', 'ignore_err', '-i', input_file,
+                '-c:v', 'libx264', '-crf', '23', '-c:a', 'aac', '-q:a', '100', '-y', output_file]
+    raise ValueError(f"未知的修复方法: {method}")
+
+
+def _run_untrunc(untrunc, reference_file, input_file, output_file, timeout):
+    """untrunc 把结果写在损坏文件旁边，完成后移动到 output_file"""
+    subprocess.run([untrunc, reference_file, input_file], capture_output=True, timeout=timeout)
+    stem, ext = os.path.splitext(input_file)
+    for candidate in (input_file + '_fixed.mp4', f"{stem}_fixed{ext}", f"{stem}_fixed.mp4"):
+        if os.path.exists(candidate) and os.path.abspath(candidate) != os.path.abspath(input_file):
+            os.replace(candidate, output_file)
+            return True
+    return False
+
+
+def validate_sampled(path, ffmpeg='ffmpeg', ffprobe='ffprobe', samples=3, sample_seconds=2.0, timeout=300):
+    """
+    抽样校验：ffprobe 能读出视频流和时长，且开头、中间、结尾各 sample_seconds 秒能正常解码
+
+    返回: 校验通过时返回 True
+    """
+    info = probe(path, ffprobe=ffprobe, use_cache=False)
+    if not info or not info['has_video'] or not info['duration']:
+        return False
+    duration = info['duration']
+    if samples <= 1 or duration <= sample_seconds * samples:
+        starts = [0.0]
+        sample_seconds = duration
+    else:
+        last = duration - sample_seconds
+        starts = [last * i / (samples - 1) for i in range(samples)]
+    for start in starts:
+        try:
+            result = subprocess.run([ffmpeg, '-v', 'error', '-ss', f'{start:.3f}', '-i', path,
+                                     '-t', f'{sample_seconds:.3f}', '-f', 'null', '-'],
+                                    capture_output=True, text=True, timeout=timeout)
+        except subprocess.TimeoutExpired:
+            return False
+        if result.returncode != 0:
+            return False
+    return True
+
+
+def repair_file(input_file, output_file, ffmpeg='ffmpeg', ffprobe='ffprobe', reference_file=None, untrunc=None,
+                skip_healthy=True, timeout=7200, log=print):
+    """
+    修复一个视频文件
+
+    参数:
+        input_file, output_file: 输入和输出路径
+        reference_file, untrunc: 见 choose_methods
+        skip_healthy: 原文件结构完好且抽样解码正常时不修复
+        timeout: 每种方法的超时秒数
+        log: 输出函数
+
+    返回: {'file': input_file, 'status': 'healthy'/'fixed'/'failed', 'method': 成功的方法或 None,
+           'tried': [尝试过的方法]}
+    """
+    name = os.path.basename(input_file)
+    is_mp4 = os.path.splitext(input_file)[1].lower() in MP4_EXTENSIONS
+    structure = scan_structure(input_file) if is_mp4 else None
+    info = probe(input_file, ffprobe=ffprobe)
+    if structure is not None:
+        log(f"{name}: moov={'有' if structure['has_moov'] else '无'}, mdat={'有' if structure['has_mdat'] else '无'}"
+            f"{', moov在mdat之后' if structure['moov_after_mdat'] else ''}"
+            f"{', 文件被截断' if structure['truncated'] else ''}{', atom头损坏' if structure['corrupt'] else ''}")
+    result = {'file': input_file, 'status': 'failed', 'method': None, 'tried': []}
+
+    structure_ok = structure is None or not (structure['truncated'] or structure['corrupt'] or not structure['has_moov'])
+    if skip_healthy and info is not None and structure_ok and validate_sampled(input_file, ffmpeg, ffprobe):
+        log(f"{name}: 文件正常，无需修复")
+        result['status'] = 'healthy'
+        return result
+
+    filename, ext = os.path.splitext(output_file)
+    partial_file = f"{filename}.partial{ext}"
+    for method in choose_methods(structure, info, reference_file, untrunc):
+        log(f"{name}: 尝试 {method}")
+        result['tried'].append(method)
+        try:
+            if method == 'untrunc':
+                ok = _run_untrunc(untrunc, reference_file, input_file, partial_file, timeout)
+            else:
+                completed = subprocess.run(_method_command(method, input_file, partial_file, ffmpeg),
+                                           capture_output=True, text=True, timeout=timeout)
+                ok = completed.returncode == 0
+            ok = ok and validate_sampled(partial_file, ffmpeg, ffprobe)
+        except (subprocess.TimeoutExpired, OSError) as e:
+            log(f"{name}: {method} 出错: {e}")
+            ok = False
+        if ok:
+            os.replace(partial_file, output_file)
+            log(f"{name}: {method} 修复成功 -> {output_file}")
+            result.update(status='fixed', method=method)
+            return result
+
+    if os.path.exists(partial_file):
+        os.remove(partial_file)
+    log(f"{name}: 所有可行的修复方法都失败")
+    return result
+
+
+def repair_directory(directory, n_workers=4, suffix='_fixed', extensions=('.mp4', '.m4v', '.mov', '.mkv', '.avi', '.3gp'),
+                     **kwargs):
+    """
+    同时修复目录中的多个视频，输出为 <文件名><suffix><扩展名>
+
+    其余参数传给 repair_file；返回各文件 repair_file 的结果列表
+    """
+    files = []
+    for filename in sorted(os.listdir(directory)):
+        stem, ext = os.path.splitext(filename)
+        path = os.path.join(directory, filename)
+        if (os.path.isfile(path) and ext.lower() in extensions
+                and not stem.endswith((suffix, f'{suffix}.partial'))):
+            files.append(path)
+
+    def repair(path):
+        stem, ext = os.path.splitext(path)
+        return repair_file(path, f"{stem}{suffix}{ext}", **kwargs)
+
+    with ThreadPoolExecutor(max_workers=max(1, n_workers)) as executor:
+        return list(executor.map(repair, files))
@@ -0,0 +1,162 @@
+"""
+长视频分段并行编码：按关键帧切段 -> 多个 ffmpeg 同时编码 -> concat 无损拼接
+
+  - 先用 -f segment -c copy 按关键帧把视频流切成约 segment_seconds 秒的片段（不重新编码，几乎只有 I/O）
+  - 各片段用完全相同的编码参数同时编码，每个 ffmpeg 使用一部分线程，单个长视频也能用满全部核心
+  - concat demuxer 以流复制拼接编码后的视频片段，音频从原视频的第一路音频整段编码（与整段编码时一样使用
+    输出格式的默认音频编码器），避免分段编码音频在接缝处产生的间隙
+  - 最后用 ffprobe 检查总时长与原视频相差不超过 1 秒（与压缩脚本的 is_valid_output 相同）；
+    不一致时返回 False，由调用方改用整段编码
+  - 中间文件放在 <输出文件>.segments/ 目录，切段结果和已编码完成的片段在重新运行时复用，成功后删除；
+    目录中记录切段时长、编码参数和线程数，与本次不同时整个目录作废，避免拼接出参数不一致的片段
+
+用法:
+    from segment_encode import encode_segmented
+    ok = encode_segmented('lecture.mp4', 'lecture_Compressed.mp4',
+                          ['-b:v', '800k', '-vcodec', 'libx264'], n_workers=4, threads=4)
+"""
+import json
+import os
+import shutil
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from media_probe import probe
+
+
+def split_segments(input_file, work_dir, segment_seconds, ffmpeg='ffmpeg', timeout=3600):
+    """
+    按关键帧把视频流切段（流复制），已切过时直接返回上次的结果
+
+    返回: 片段路径列表（按时间顺序）
+    """
+    list_file = os.path.join(work_dir, 'source.txt')
+    if os.path.exists(list_file):
+        with open(list_file, 'r', encoding='utf-8') as f:
+            segments = [os.path.join(work_dir, line.strip()) for line in f if line.strip()]
+        if segments and all(os.path.exists(segment) for segment in segments):
+            return segments
+
+    os.makedirs(work_dir, exist_ok=True)
+    partial_list = list_file + '.partial'
+    subprocess.run([
+        ffmpeg, '-y', '-v', 'error',
+        '-i', input_file,
+        '-map', '0:v:0', '-an', '-sn', '-dn',
+        '-c', 'copy',
+        '-f', 'segment',
+        '-segment_time', str(segment_seconds),
+        '-segment_list', partial_list,
+        '-segment_list_type', 'flat',
+        '-reset_timestamps', '1',
+        os.path.join(work_dir, 'source_%05d.mkv'),
+    ], check=True, capture_output=True, timeout=timeout)
+    # 片段列表最后写入，存在即表示切段完整
+    os.replace(partial_list, list_file)
+    with open(list_file, 'r', encoding='utf-8') as f:
+        return [os.path.join(work_dir, line.strip()) for line in f if line.strip()]
+
+
+def encode_segment(segment, output, encode_args, ffmpeg='ffmpeg', threads=None, timeout=7200):
+    """用给定参数编码一个片段（只有视频流），已编码完成的片段跳过"""
+    if os.path.exists(output):
+        return output
+    command = [ffmpeg, '-y', '-v', 'error', '-i', segment, '-an', *encode_args]
+    if threads:
+        command.extend(['-threads', str(threads)])
+    partial = output + '.partial.mp4'
+    command.append(partial)
+    subprocess.run(command, check=True, capture_output=True, timeout=timeout)
+    os.replace(partial, output)
+    return output
+
+
+def concat_segments(encoded, input_file, output_file, work_dir, ffmpeg='ffmpeg', timeout=3600):
+    """concat demuxer 无损拼接编码后的片段，并以输出格式的默认音频编码器编码原视频的第一路音频"""
+    list_file = os.path.join(work_dir, 'encoded.txt')
+    with open(list_file, 'w', encoding='utf-8') as f:
+        for path in encoded:
+            escaped = os.path.abspath(path).replace("'", "'\\''")
+            f.write(f"file '{escaped}'\n")
+    subprocess.run([
+        ffmpeg, '-y', '-v', 'error',
+        '-f', 'concat', '-safe', '0', '-i', list_file,
+        '-i', input_file,
+        '-map', '0:v:0', '-map', '1:a:0?',
+        '-c:v', 'copy',
+        output_file,
+    ], check=True, capture_output=True, timeout=timeout)
+
+
+def _prepare_work_dir(work_dir, settings):
+    """上次中断留下的中间文件与本次设置不同时删除，返回时目录存在且记录了本次设置"""
+    settings_file = os.path.join(work_dir, 'settings.json')
+    if os.path.exists(work_dir):
+        try:
+            with open(settings_file, 'r', encoding='utf-8') as f:
+                reusable = json.load(f) == settings
+        except (OSError, ValueError):
+            reusable = False
+        if reusable:
+            return
+        shutil.rmtree(work_dir)
+    os.makedirs(work_dir)
+    with open(settings_file + '.partial', 'w', encoding='utf-8') as f:
+        json.dump(settings, f, ensure_ascii=False)
+    os.replace(settings_file + '.partial', settings_file)
+
+
+def encode_segmented(input_file, output_file, encode_args, ffmpeg='ffmpeg', ffprobe='ffprobe',
+                     segment_seconds=300, n_workers=None, threads=None, timeout=7200, keep_work_dir=False,
+                     tolerance=1.0):
+    """
+    分段并行编码一个视频
+
+    参数:
+        input_file: 输入视频
+        output_file: 输出视频
+        encode_args: 视频编码参数，如 ['-b:v', '800k', '-r', '25', '-vcodec', 'libx264']（不含输入输出和线程数）
+        ffmpeg, ffprobe: 可执行文件路径
+        segment_seconds: 每段的目标时长（实际在其后的第一个关键帧处切开）
+        n_workers: 同时编码的片段数，默认 CPU 核数 / 4
+        threads: 每个片段编码的线程数，默认 CPU 核数 / n_workers
+        timeout: 每个片段编码的超时秒数
+        tolerance: 输出与原视频总时长允许相差的秒数
+
+    返回: 成功且总时长校验通过时返回 True
+    """
+    cpu_count = os.cpu_count() or 1
+    n_workers = n_workers or max(1, cpu_count // 4)
+    threads = threads or max(1, cpu_count // n_workers)
+    work_dir = output_file + '.segments'
+    _prepare_work_dir(work_dir, {'input': os.path.abspath(input_file), 'segment_seconds': segment_seconds,
+                                 'encode_args': [str(arg) for arg in encode_args], 'threads': threads})
+
+    segments = split_segments(input_file, work_dir, segment_seconds, ffmpeg)
+    print(f"已切分为 {len(segments)} 段，{n_workers} 段同时编码，每段 {threads} 个线程")
+    outputs = [os.path.splitext(segment)[0].replace('source_', 'encoded_') + '.mp4' for segment in segments]
+    with ThreadPoolExecutor(max_workers=n_workers) as executor:
+        futures = [executor.submit(encode_segment, segment, output, encode_args, ffmpeg, threads, timeout)
+                   for segment, output in zip(segments, outputs)]
+        encoded = [future.result() for future in futures]
+
+    # 先写入临时文件，时长校验通过后再改名
+    filename, ext = os.path.splitext(output_file)
+    partial_file = f"{filename}.partial{ext}"
+    concat_segments(encoded, input_file, partial_file, work_dir, ffmpeg)
+
+    input_duration = (probe(input_file, ffprobe=ffprobe) or {}).get('duration')
+    output_duration = (probe(partial_file, ffprobe=ffprobe) or {}).get('duration')
+    if input_duration is None or output_duration is None:
+        print("无法读取时长，分段编码结果未通过校验")
+        os.remove(partial_file)
+        return False
+    if abs(output_duration - input_duration) > tolerance:
+        print(f"分段编码后时长 {output_duration:.2f}s 与原视频 {input_duration:.2f}s 不一致")
+        os.remove(partial_file)
+        shutil.rmtree(work_dir, ignore_errors=True)  # 切段可能有问题，不再复用
+        return False
+
+    os.replace(partial_file, output_file)
+    if not keep_work_dir:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    return True
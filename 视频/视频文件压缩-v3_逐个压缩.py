@@ -1,33 +1,19 @@
 import subprocess
-import re
 import os
 import psutil
 import platform
 import sys
+from job_scheduler import JobStore, run_jobs, plan_workers
+from media_probe import probe, probe_many
+from segment_encode import encode_segmented
 
 # 设置ffmpeg的完整路径
 FFMPEG_PATH = r"D:\SOFTWARES\ffmpeg\bin\ffmpeg.exe"
+FFPROBE_PATH = os.path.join(os.path.dirname(FFMPEG_PATH), "ffprobe" + os.path.splitext(FFMPEG_PATH)[1])
 
-def parse_ffmpeg_output(output):
-    """解析FFmpeg输出，提取比特率和帧率信息"""
-    bitrate_pattern = re.compile(r'bitrate:\s+(\d+)\s+kb/s')
-    fps_pattern = re.compile(r'(\d+(?:\.\d+)?)\s+fps')
-    
-    bitrate = None
-    frame_rate = None
-    
-    for line in output.splitlines():
-        if not bitrate:
-            bitrate_match = bitrate_pattern.search(line)
-            if bitrate_match:
-                bitrate = int(bitrate_match.group(1))
-        
-        if not frame_rate:
-            fps_match = fps_pattern.search(line)
-            if fps_match:
-                frame_rate = float(fps_match.group(1))
-    
-    return bitrate, frame_rate
+# 超过此时长（秒）的视频用CPU编码时分段并行压缩，每段约 SEGMENT_SECONDS 秒
+SEGMENT_MIN_DURATION = 1200
+SEGMENT_SECONDS = 300
 
 def test_gpu_encoding():
     """测试GPU编码是否可用"""
@@ -91,31 +77,37 @@ def is_gpu_available():
     except FileNotFoundError:
         return False
 
-def compress_video(input_file, compression_ratio=0.5, frame_rate=None, use_gpu=False, max_usage=0.8):
-    """压缩视频文件，支持GPU和CPU编码，自动降级"""
-    # 创建带有"_Compressed"后缀的输出文件名
+def get_output_file(input_file):
+    """带有"_Compressed"后缀的输出文件名"""
     filename, ext = os.path.splitext(input_file)
-    output_file = f"{filename}_Compressed{ext}"
+    return f"{filename}_Compressed{ext}"
+
+def is_valid_output(input_file, tolerance=1.0):
+    """压缩结果已存在且时长与原视频一致（相差不超过tolerance秒）"""
+    output_file = get_output_file(input_file)
+    if not os.path.exists(output_file) or os.path.getsize(output_file) == 0:
+        return False
+    output_duration = (probe(output_file, ffprobe=FFPROBE_PATH) or {}).get('duration')
+    input_duration = (probe(input_file, ffprobe=FFPROBE_PATH) or {}).get('duration')
+    return output_duration is not None and input_duration is not None and abs(output_duration - input_duration) <= tolerance
+
+def compress_video(input_file, compression_ratio=0.5, frame_rate=None, use_gpu=False, max_usage=0.8, threads=None, quiet=False,
+                   segment_workers=None):
+    """压缩视频文件，支持GPU和CPU编码，自动降级
+
+    threads: CPU编码线程数，默认按 max_usage 使用全部核心；并发压缩时由调度器分配
+    quiet: 只输出错误信息，多个ffmpeg同时运行时避免进度输出交错
+    segment_workers: 大于1时，超过 SEGMENT_MIN_DURATION 的视频切段后由这么多个ffmpeg同时编码（每个 threads 线程），
+        拼接后时长校验失败则改为整段编码
+    """
+    output_file = get_output_file(input_file)
+    # 先写入临时文件，完成后再改名，中断时不会留下看似完整的输出
+    filename, ext = os.path.splitext(output_file)
+    partial_file = f"{filename}.partial{ext}"
     
     # 获取输入视频信息
-    probe_command = [FFMPEG_PATH, '-i', input_file, '-hide_banner']
-    try:
-        result = subprocess.run(
-            probe_command, 
-            stdout=subprocess.PIPE, 
-            stderr=subprocess.PIPE, 
-            text=True, 
-            encoding='utf-8',
-            timeout=60
-        )
-    except subprocess.TimeoutExpired:
-        print(f"分析视频超时：{input_file}，跳过此文件")
-        return False
-    except Exception as e:
-        print(f"分析视频出错：{input_file}，错误: {e}")
-        return False
-        
-    bitrate, original_frame_rate = parse_ffmpeg_output(result.stderr)
+    info = probe(input_file, ffprobe=FFPROBE_PATH) or {}
+    bitrate, original_frame_rate = info.get('bitrate'), info.get('fps')
     
     if bitrate is None or original_frame_rate is None:
         print(f"无法获取视频信息：{input_file}，跳过此文件")
@@ -127,45 +119,63 @@ def compress_video(input_file, compression_ratio=0.5, frame_rate=None, use_gpu=F
     # 检查GPU可用性和用户设置
     gpu_enabled = use_gpu and is_gpu_available() and GPU_ENCODING_AVAILABLE
     
-    # 构建基本命令
-    ffmpeg_command = [
-        FFMPEG_PATH,
-        '-i', input_file,
-        '-b:v', f'{target_bitrate}k',
-    ]
+    # 视频编码参数，整段编码和分段编码共用
+    encode_args = ['-b:v', f'{target_bitrate}k']
 
     # 调整帧率
     if frame_rate and original_frame_rate > frame_rate:
-        ffmpeg_command.extend(['-r', str(frame_rate)])
+        encode_args.extend(['-r', str(frame_rate)])
 
     # 添加编码器选项
     if gpu_enabled:
         print(f"使用GPU (NVENC) 编码: {input_file}")
-        ffmpeg_command.extend(['-vcodec', 'h264_nvenc'])
+        encode_args.extend(['-vcodec', 'h264_nvenc'])
     else:
         print(f"使用CPU (libx264) 编码: {input_file}")
-        ffmpeg_command.extend(['-vcodec', 'libx264'])
+        encode_args.extend(['-vcodec', 'libx264'])
         # 如果使用CPU编码，设置CPU线程数
-        cpu_count = psutil.cpu_count()
-        cpu_threads = max(1, int(cpu_count * max_usage))
-        ffmpeg_command.extend(['-threads', str(cpu_threads)])
+        if threads is None:
+            cpu_count = psutil.cpu_count()
+            threads = max(1, int(cpu_count * max_usage))
+
+        # 长视频分段并行编码
+        if segment_workers and segment_workers > 1 and (info.get('duration') or 0) > SEGMENT_MIN_DURATION:
+            print(f"分段并行压缩视频: {input_file}")
+            try:
+                if encode_segmented(input_file, output_file, encode_args, ffmpeg=FFMPEG_PATH, ffprobe=FFPROBE_PATH,
+                                    segment_seconds=SEGMENT_SECONDS, n_workers=segment_workers, threads=threads):
+                    print(f"视频压缩成功：{output_file}")
+                    return True
+            except (subprocess.CalledProcessError, subprocess.TimeoutExpired, OSError) as e:
+                print(f"分段压缩出错 {input_file}: {e}")
+            print("改为整段压缩")
+
+    # 构建基本命令
+    ffmpeg_command = [FFMPEG_PATH, '-y']
+    if quiet:
+        ffmpeg_command.extend(['-hide_banner', '-loglevel', 'error', '-nostats'])
+    ffmpeg_command.extend(['-i', input_file, *encode_args])
+    if not gpu_enabled:
+        ffmpeg_command.extend(['-threads', str(threads)])
     
-    ffmpeg_command.append(output_file)
+    ffmpeg_command.append(partial_file)
 
     try:
         print(f"开始压缩视频: {input_file}")
         subprocess.run(ffmpeg_command, check=True, timeout=7200)  # 设置超时为2小时
+        os.replace(partial_file, output_file)
         print(f"视频压缩成功：{output_file}")
         return True
     except subprocess.CalledProcessError as e:
         print(f"压缩视频时出错 {input_file}: {e}")
-        return False
     except subprocess.TimeoutExpired:
         print(f"压缩视频超时 {input_file}，可能视频太大或编码太慢")
-        return False
     except Exception as e:
         print(f"压缩视频异常 {input_file}: {e}")
-        return False
+    # 失败时删除未完成的临时文件，避免占用磁盘
+    if os.path.exists(partial_file):
+        os.remove(partial_file)
+    return False
 
 def is_video_file(filename):
     """检查文件是否为视频文件"""
@@ -173,8 +183,12 @@ def is_video_file(filename):
     _, ext = os.path.splitext(filename)
     return ext.lower() in video_extensions
 
-def process_videos(directory, compression_ratio=0.1, frame_rate=None, use_gpu=False, max_usage=0.6):
-    """处理指定目录中的所有视频文件，失败时停止，成功时继续处理全部"""
+def process_videos(directory, compression_ratio=0.1, frame_rate=None, use_gpu=False, max_usage=0.6, n_workers=None):
+    """处理指定目录中的所有视频文件，先压缩一个视频测试，失败时停止，成功时并发压缩其余视频
+
+    n_workers: 同时压缩的视频数，默认按CPU核数分配（GPU编码时为1，消费级显卡的NVENC并发会话数有限）
+    任务状态保存在目录下的 .compress_jobs.json，中断后重新运行会跳过已完成的视频
+    """
     # 检查GPU编码支持
     if use_gpu and not GPU_ENCODING_AVAILABLE:
         print("警告: GPU编码不可用，自动降级到CPU编码")
@@ -184,7 +198,8 @@ def process_videos(directory, compression_ratio=0.1, frame_rate=None, use_gpu=Fa
     video_files = []
     for filename in os.listdir(directory):
         filepath = os.path.join(directory, filename)
-        if os.path.isfile(filepath) and is_video_file(filename) and not filename.endswith('_Compressed.mp4'):
+        name = os.path.splitext(filename)[0]
+        if os.path.isfile(filepath) and is_video_file(filename) and not name.endswith(('_Compressed', '_Compressed.partial')):
             video_files.append(filepath)
     
     if not video_files:
@@ -193,15 +208,43 @@ def process_videos(directory, compression_ratio=0.1, frame_rate=None, use_gpu=Fa
     
     total_files = len(video_files)
     print(f"找到 {total_files} 个视频文件需要处理")
-    
-    # 尝试处理第一个视频文件作为测试
-    first_file = video_files[0]
-    first_filename = os.path.basename(first_file)
-    print(f"\n正在处理第一个视频(测试): {first_filename}")
-    
-    first_success = compress_video(first_file, compression_ratio, frame_rate, use_gpu, max_usage)
-    
-    if not first_success:
+
+    if use_gpu and n_workers is None:
+        n_workers = 1
+    n_workers, threads = plan_workers(n_workers, psutil.cpu_count(), max_usage=max_usage)
+    print(f"同时压缩 {n_workers} 个视频，每个使用 {threads} 个线程")
+
+    # 并发读取全部视频及已有压缩结果的信息，之后检查和压缩时直接使用缓存
+    existing_outputs = [get_output_file(f) for f in video_files if os.path.exists(get_output_file(f))]
+    infos = probe_many(video_files + existing_outputs, ffprobe=FFPROBE_PATH, n_workers=max(4, n_workers))
+
+    # CPU编码时长视频放在最后逐个压缩，每个视频切段后用全部 n_workers 个编码进程，
+    # 避免批次末尾只剩一个长视频用少量线程编码
+    long_files = []
+    if not use_gpu and n_workers > 1:
+        long_files = [f for f in video_files if ((infos.get(f) or {}).get('duration') or 0) > SEGMENT_MIN_DURATION]
+    short_files = [f for f in video_files if f not in long_files]
+
+    def worker(video_file):
+        return compress_video(video_file, compression_ratio, frame_rate, use_gpu, max_usage,
+                              threads=threads, quiet=n_workers > 1)
+
+    def long_worker(video_file):
+        return compress_video(video_file, compression_ratio, frame_rate, use_gpu, max_usage,
+                              threads=threads, quiet=True, segment_workers=n_workers)
+
+    store = JobStore(os.path.join(directory, '.compress_jobs.json'))
+    results = run_jobs(short_files, worker, store, n_workers=n_workers, is_done=is_valid_output)
+    stopped = results['failed'] and not results['done'] and len(short_files) - len(results['skipped']) > 1
+    if long_files and not stopped:
+        print(f"\n分段压缩 {len(long_files)} 个长视频...")
+        long_results = run_jobs(long_files, long_worker, store, n_workers=1, is_done=is_valid_output,
+                                stop_on_first_failure=not results['done'])
+        for key in results:
+            results[key].extend(long_results[key])
+
+    # 测试视频失败时其余视频不会开始
+    if results['failed'] and not results['done'] and total_files - len(results['skipped']) > 1:
         print("\n第一个视频压缩失败，停止所有后续处理！")
         print("请解决问题后再尝试。可能的原因包括:")
         print("- NVIDIA驱动版本过低(需要551.76或更新)")
@@ -209,36 +252,14 @@ def process_videos(directory, compression_ratio=0.1, frame_rate=None, use_gpu=Fa
         print("- 磁盘空间不足")
         print("- FFmpeg配置问题")
         return
-    
-    print(f"\n第一个视频处理成功: {first_filename}")
-    
-    # 第一个视频成功，继续处理剩余视频
-    if len(video_files) > 1:
-        print(f"继续处理剩余 {len(video_files) - 1} 个视频文件...")
-        
-        processed = 1
-        failed = 0
-        
-        # 处理剩余视频文件
-        for i, video_file in enumerate(video_files[1:], start=2):
-            filename = os.path.basename(video_file)
-            print(f"\n[{i}/{total_files}] 正在处理视频: {filename}")
-            
-            success = compress_video(video_file, compression_ratio, frame_rate, use_gpu, max_usage)
-            
-            if success:
-                processed += 1
-                print(f"视频压缩成功: {filename}")
-            else:
-                failed += 1
-                print(f"视频压缩失败: {filename} - 继续处理下一个视频")
-        
-        # 汇总处理结果
-        print(f"\n处理完成! 总计: {total_files} 个视频")
-        print(f"成功: {processed} 个")
-        print(f"失败: {failed} 个")
-    else:
-        print("\n目录中只有一个视频文件，且已处理完成。")
+
+    # 汇总处理结果
+    print(f"\n处理完成! 总计: {total_files} 个视频")
+    print(f"成功: {len(results['done'])} 个")
+    print(f"跳过(已压缩): {len(results['skipped'])} 个")
+    print(f"失败: {len(results['failed'])} 个")
+    for video_file in results['failed']:
+        print(f"  - {os.path.basename(video_file)}")
 
     print("如需修改更多压缩参数，请编辑脚本中的相关设置。")
 
@@ -258,9 +279,10 @@ if __name__ == "__main__":
         frame_rate = 25  # 目标帧率
         use_gpu = True  # 如果GPU可用，则使用GPU
         max_usage = 0.6  # CPU或GPU的最大使用率
+        n_workers = None  # 同时压缩的视频数，None为按CPU核数自动分配
         
         # 开始处理视频
-        process_videos(directory, compression_ratio, frame_rate, use_gpu, max_usage)
+        process_videos(directory, compression_ratio, frame_rate, use_gpu, max_usage, n_workers)
         
     except KeyboardInterrupt:
         print("\n程序被用户中断")
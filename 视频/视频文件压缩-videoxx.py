@@ -3,26 +3,7 @@ import re
 import os
 import psutil
 import platform
-
-def parse_ffmpeg_output(output):
-    bitrate_pattern = re.compile(r'bitrate:\s+(\d+)\s+kb/s')
-    fps_pattern = re.compile(r'(\d+(?:\.\d+)?)\s+fps')
-    
-    bitrate = None
-    frame_rate = None
-    
-    for line in output.splitlines():
-        if not bitrate:
-            bitrate_match = bitrate_pattern.search(line)
-            if bitrate_match:
-                bitrate = int(bitrate_match.group(1))
-        
-        if not frame_rate:
-            fps_match = fps_pattern.search(line)
-            if fps_match:
-                frame_rate = float(fps_match.group(1))
-    
-    return bitrate, frame_rate
+from media_probe import probe
 
 def is_gpu_available():
     try:
@@ -44,9 +25,8 @@ def compress_video(input_file, compression_ratio=0.5, frame_rate=None, use_gpu=F
     output_file = input_file.replace('.mp4', '_compressed.mp4')
     
     # Get input video information
-    probe_command = ['ffmpeg', '-i', input_file, '-hide_banner']
-    result = subprocess.run(probe_command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, encoding='utf-8')
-    bitrate, original_frame_rate = parse_ffmpeg_output(result.stderr)
+    info = probe(input_file) or {}
+    bitrate, original_frame_rate = info.get('bitrate'), info.get('fps')
     
     if bitrate is None or original_frame_rate is None:
         print(f"Failed to retrieve video information for {input_file}.")
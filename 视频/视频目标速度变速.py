@@ -1,12 +1,13 @@
 from moviepy.editor import VideoFileClip
 from moviepy.video.fx.speedx import speedx
+from media_probe import probe
 
 def change_video_speed(input_path, output_path, expected_seconds):
     # 加载视频文件
     clip = VideoFileClip(input_path)
     
-    # 获取原始视频的时长
-    original_duration = clip.duration
+    # 获取原始视频的时长（优先使用 ffprobe 缓存的容器时长）
+    original_duration = (probe(input_path) or {}).get('duration') or clip.duration
     
     # 计算需要的速度变化比率
     speed_change_factor = original_duration / expected_seconds
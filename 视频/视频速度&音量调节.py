@@ -1,4 +1,6 @@
+import re
 import subprocess
+from media_probe import probe
 
 def modify_video_speed_and_volume(input_path, output_path, speed_factor=1.0, volume_factor=1.0):
     """
@@ -18,11 +20,21 @@ def modify_video_speed_and_volume(input_path, output_path, speed_factor=1.0, vol
         # Handling speed_factor for audio tempo adjustment, ensuring it's within the valid range
         tempo_filter = f"atempo={speed_factor}" if 0.5 <= speed_factor <= 2.0 else f"atempo={speed_factor/2},atempo=2.0" if speed_factor > 2.0 else f"atempo=0.5,atempo={speed_factor*2}"
 
+        # Cached ffprobe metadata: files without an audio stream get a video-only filter graph,
+        # and the expected output duration turns ffmpeg's time= into a percentage
+        info = probe(input_path) or {}
+        filter_graph = f"[0:v]setpts={1/speed_factor}*PTS[v]"
+        maps = ['-map', '[v]']
+        if info.get('has_audio', True):
+            filter_graph += f";[0:a]volume={volume_factor},{tempo_filter}[a]"
+            maps += ['-map', '[a]']
+        output_duration = info['duration'] / speed_factor if info.get('duration') else None
+
         command = [
             'ffmpeg',
             '-i', input_path,  # Input file
-            '-filter_complex', f"[0:v]setpts={1/speed_factor}*PTS[v];[0:a]volume={volume_factor},{tempo_filter}[a]",  # Filters for video and audio
-            '-map', '[v]', '-map', '[a]',  # Mapping the filtered video and audio
+            '-filter_complex', filter_graph,  # Filters for video and audio
+            *maps,  # Mapping the filtered video and audio
             '-c:v', 'libx264',  # Video codec
             '-preset', 'fast',  # Preset for the balance between compression speed and quality
             output_path  # Output file
@@ -32,7 +44,13 @@ def modify_video_speed_and_volume(input_path, output_path, speed_factor=1.0, vol
         process = subprocess.Popen(command, stderr=subprocess.PIPE, text=True)
         for line in process.stderr:
             if "time=" in line:
-                print(line.strip())
+                match = re.search(r'time=(\d+):(\d+):(\d+(?:\.\d+)?)', line)
+                if match and output_duration:
+                    hours, minutes, seconds = match.groups()
+                    elapsed = int(hours) * 3600 + int(minutes) * 60 + float(seconds)
+                    print(f"{min(100.0, elapsed / output_duration * 100):5.1f}%  {line.strip()}")
+                else:
+                    print(line.strip())
         
         process.wait()  # Wait for process to finish
 
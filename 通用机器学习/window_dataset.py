@@ -0,0 +1,113 @@
+"""
+时间序列滑动窗口数据集构建（LSTM 等序列模型通用）
+
+  - 基于 numpy.lib.stride_tricks.sliding_window_view，窗口是原数组上的零拷贝视图
+  - 多条序列（如每只股票一行）可以长度不一；可按行去掉缺失值后再切窗口
+  - build_dataset 一次性分配并填充 (X, y)；window_batches / make_tf_dataset 按批生成，
+    整个窗口张量不需要一次性放进内存
+
+窗口 i 为 series[i : i + window_size]，目标为 series[i + window_size - 1 + horizon]：
+horizon=1 预测窗口之后的下一个值，horizon=0 以窗口最后一个值为目标。
+
+用法:
+    from window_dataset import build_dataset, make_tf_dataset
+    X, y = build_dataset(rows, window_size=40)
+    dataset = make_tf_dataset(rows, window_size=40, batch_size=64, shuffle=True)
+"""
+import numpy as np
+
+
+def sliding_windows(series, window_size, horizon=1):
+    """
+    单条序列的全部窗口和目标，均为零拷贝视图
+
+    参数:
+        series: (时间步,) 或 (时间步, 特征数)
+    返回:
+        X: (窗口数, window_size) 或 (窗口数, window_size, 特征数)
+        y: (窗口数,) 或 (窗口数, 特征数)
+    """
+    series = np.asarray(series)
+    num_windows = max(len(series) - window_size - horizon + 1, 0)
+    X = np.lib.stride_tricks.sliding_window_view(series, window_size, axis=0)[:num_windows]
+    if series.ndim > 1:
+        X = np.moveaxis(X, -1, 1)  # (窗口数, 特征数, window_size) -> (窗口数, window_size, 特征数)
+    y = series[window_size - 1 + horizon:window_size - 1 + horizon + num_windows]
+    return X, y
+
+
+def _flatten_rows(rows, window_size, horizon, dropna, dtype):
+    """把多条序列首尾相接成一维数组，并给出每个合法窗口在其中的起始位置（窗口不跨序列）"""
+    if isinstance(rows, np.ndarray) and rows.ndim == 2:
+        rows = list(rows)
+    series_list = []
+    for row in rows:
+        row = np.asarray(row, dtype=dtype)
+        if dropna:
+            row = row[~np.isnan(row)]
+        series_list.append(row)
+    lengths = np.array([len(row) for row in series_list], dtype=np.int64)
+    flat = np.concatenate(series_list) if series_list else np.empty(0, dtype=dtype)
+
+    row_starts = np.concatenate([[0], np.cumsum(lengths)[:-1]])
+    counts = np.maximum(lengths - window_size - horizon + 1, 0)
+    # 各序列内的窗口起点：row_start + 0..count-1
+    offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    positions = np.repeat(row_starts, counts) + offsets
+    return flat, positions
+
+
+def build_dataset(rows, window_size, horizon=1, dropna=True, dtype=float):
+    """
+    多条序列的滑动窗口数据集，顺序为逐条序列、序列内按时间先后
+
+    参数:
+        rows: 二维数组（每行一条序列，可用 NaN 补齐长度）或一维数组的列表
+        window_size: 窗口长度
+        horizon: 目标相对窗口最后一个值的步数
+        dropna: 是否先去掉每条序列中的缺失值（与 row.dropna() 相同，剩余数据前移）
+        dtype: 输出的数据类型，数据量很大时可用 np.float32
+
+    返回: X (窗口数, window_size), y (窗口数,)
+    """
+    flat, positions = _flatten_rows(rows, window_size, horizon, dropna, dtype)
+    if not len(positions):
+        return np.empty((0, window_size), dtype=dtype), np.empty(0, dtype=dtype)
+    views = np.lib.stride_tricks.sliding_window_view(flat, window_size)
+    return views[positions], flat[positions + window_size - 1 + horizon]
+
+
+def window_batches(rows, window_size, batch_size, horizon=1, dropna=True, dtype=np.float32,
+                   shuffle=False, seed=None):
+    """按批生成 (X, y)，每次只复制一个批次的窗口；shuffle 时打乱全部窗口的顺序"""
+    flat, positions = _flatten_rows(rows, window_size, horizon, dropna, dtype)
+    views = np.lib.stride_tricks.sliding_window_view(flat, window_size) if len(flat) >= window_size else None
+    if shuffle:
+        positions = np.random.default_rng(seed).permutation(positions)
+    for start in range(0, len(positions), batch_size):
+        batch = positions[start:start + batch_size]
+        yield views[batch], flat[batch + window_size - 1 + horizon]
+
+
+def make_tf_dataset(rows, window_size, batch_size, horizon=1, dropna=True, shuffle=False, seed=None):
+    """
+    tf.data 数据集，元素为 ((批量, window_size, 1), (批量,)) 的 float32 张量，可直接传给 model.fit
+    每个 epoch 重新遍历生成器（shuffle 时每次顺序不同）
+    """
+    import tensorflow as tf
+
+    flat, positions = _flatten_rows(rows, window_size, horizon, dropna, np.float32)
+    epoch = [0]
+
+    def generator():
+        epoch_seed = None if seed is None else seed + epoch[0]
+        epoch[0] += 1
+        views = np.lib.stride_tricks.sliding_window_view(flat, window_size)
+        order = np.random.default_rng(epoch_seed).permutation(positions) if shuffle else positions
+        for start in range(0, len(order), batch_size):
+            batch = order[start:start + batch_size]
+            yield views[batch][..., None], flat[batch + window_size - 1 + horizon]
+
+    signature = (tf.TensorSpec(shape=(None, window_size, 1), dtype=tf.float32),
+                 tf.TensorSpec(shape=(None,), dtype=tf.float32))
+    return tf.data.Dataset.from_generator(generator, output_signature=signature).prefetch(tf.data.AUTOTUNE)
@@ -1,17 +1,22 @@
 import numpy as np
 import matplotlib.pyplot as plt
 import pandas as pd
+import os
+import sys
+
+# 共用的有效边界求解器和 Excel 缓存读取位于上级目录 金融/
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')))
+from efficient_frontier import tangency_portfolio, min_variance_portfolio, efficient_frontier, portfolio_performance
+from excel_cache import read_excel
 
 # Load the Excel file into a pandas DataFrame
-data = pd.read_excel("Data_Assignment_finm2003_2023s2.xlsx")
+data = read_excel("Data_Assignment_finm2003_2023s2.xlsx")
 
 # Given risk-free rate
 risk_free_rate = 0.003
 
-# Number of portfolio simulations
-num_portfolios = 100000
-results = np.zeros((3, num_portfolios))
-weights_record = []
+# Number of points solved on the efficient frontier
+num_frontier_points = 500
 
 # Calculate the average returns and standard deviation for both stocks
 sibvq_avg_return = data['Returns'].mean()
@@ -23,33 +28,20 @@ bac_std_dev = data['Returns.1'].std()
 correlation = data['Correlation'].iloc[0]
 covariance = correlation * sibvq_std_dev * bac_std_dev
 
-for i in range(num_portfolios):
-    # Randomly assign weights
-    weights = np.random.random(2)
-    weights /= np.sum(weights)
-    weights_record.append(weights)
-    
-    # Expected portfolio return
-    portfolio_return = weights[0] * sibvq_avg_return + weights[1] * bac_avg_return
-    # Expected portfolio volatility
-    portfolio_stddev = np.sqrt(weights[0]**2 * sibvq_std_dev**2 + weights[1]**2 * bac_std_dev**2 + 2 * weights[0] * weights[1] * covariance)
-    # Portfolio Sharpe ratio
-    sharpe_ratio = (portfolio_return - risk_free_rate) / portfolio_stddev
-    
-    results[0,i] = portfolio_return
-    results[1,i] = portfolio_stddev
-    results[2,i] = sharpe_ratio
-
-# Extract the portfolios with maximum Sharpe ratio & minimum Standard deviation
-return_sharpe_max = results[0,results[2].argmax()]
-risk_sharpe_max = results[1,results[2].argmax()]
-
-return_std_min = results[0,results[1].argmin()]
-risk_std_min = results[1,results[1].argmin()]
-
-# Weights for the two portfolios
-weights_sharpe_max = weights_record[results[2].argmax()]
-weights_std_min = weights_record[results[1].argmin()]
+mean_returns = np.array([sibvq_avg_return, bac_avg_return])
+cov_matrix = np.array([[sibvq_std_dev**2, covariance],
+                       [covariance, bac_std_dev**2]])
+
+# Exact portfolios with maximum Sharpe ratio & minimum Standard deviation
+weights_sharpe_max = tangency_portfolio(mean_returns, cov_matrix, risk_free_rate)
+return_sharpe_max, risk_sharpe_max, _ = portfolio_performance(weights_sharpe_max, mean_returns, cov_matrix, risk_free_rate)
+
+weights_std_min = min_variance_portfolio(mean_returns, cov_matrix)
+return_std_min, risk_std_min, _ = portfolio_performance(weights_std_min, mean_returns, cov_matrix, risk_free_rate)
+
+# Portfolios on the efficient frontier: [return, std, sharpe]
+frontier = efficient_frontier(mean_returns, cov_matrix, num_points=num_frontier_points, risk_free_rate=risk_free_rate)
+results = np.vstack([frontier['returns'], frontier['stds'], frontier['sharpes']])
 
 # Define the range for x and y axis to zoom in on the desired part of the efficient frontier
 x_limit = [0.065, 0.125]  # Define the range for x-axis (Portfolio Risk)
@@ -1,6 +1,11 @@
 import numpy as np
 import matplotlib.pyplot as plt
 import os
+import sys
+
+# 共用的退火优化器位于上级目录 金融/
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')))
+from annealing_optimizer import anneal_portfolios
 
 # Hard-coded parameters
 asset_classes = np.array(["AE", "WE,U", "WE,H", "EM", "WLP", "ALP", "ADP", "COM", "GD", "HF", "PE", "AFI", "ILB", "WFI", "AC"])
@@ -66,47 +71,25 @@ num_portfolios = num_iterations * num_portfolios_per_iteration
 initial_temp = 1.0
 cooling_rate = 0.9999
 
-# Simulate random portfolios
-results = np.zeros((3, num_portfolios))
-weights_record = []
-
-current_weights = np.random.random(len(asset_classes))
-current_weights /= np.sum(current_weights)
-
-for i in range(num_iterations):
-    temp = initial_temp * (cooling_rate ** i)
-    
-    for j in range(num_portfolios_per_iteration):
-        new_weights = np.abs(current_weights + np.random.normal(0, temp, size=len(asset_classes))) 
-        new_weights /= np.sum(new_weights)
-        weights_record.append(new_weights)
-        
-        portfolio_return = np.dot(new_weights, mean_returns)
-        portfolio_std = np.sqrt(np.dot(new_weights.T, np.dot(cov_matrix, new_weights)))
-        sharpe_ratio = (portfolio_return - risk_free_rate) / portfolio_std
-        
-        results[0, i*num_portfolios_per_iteration+j] = portfolio_return
-        results[1, i*num_portfolios_per_iteration+j] = portfolio_std
-        results[2, i*num_portfolios_per_iteration+j] = sharpe_ratio
-        
-        if sharpe_ratio > results[2, :-1].max():
-            current_weights = new_weights
-            
-    # 输出当前迭代的进度
-    progress = (i + 1) / num_iterations * 100
-    print(f"Progress: {progress:.2f}%")
-    
-# Find the portfolio with highest Sharpe ratio and minimum variance
-highest_sharpe_idx = results[2].argmax()
-min_variance_idx = results[1].argmin()
-
-max_sharpe_return = results[0, highest_sharpe_idx]
-max_sharpe_std = results[1, highest_sharpe_idx] 
-max_sharpe_weights = weights_record[highest_sharpe_idx]
-
-min_variance_return = results[0, min_variance_idx]
-min_variance_std = results[1, min_variance_idx]
-min_variance_weights = weights_record[min_variance_idx]
+# 批量退火：每个温度一次评估整批组合，只保留有效边界与抽样组合
+anneal = anneal_portfolios(mean_returns, cov_matrix, risk_free_rate,
+                           num_iterations=num_iterations,
+                           batch_size=num_portfolios_per_iteration,
+                           initial_temp=initial_temp,
+                           cooling_rate=cooling_rate,
+                           progress_every=1)
+frontier = anneal['frontier']
+# 用于画图的组合：抽样组合 + 有效边界点
+results = np.hstack([anneal['results'], np.vstack([frontier['returns'], frontier['stds'], frontier['sharpes']])])
+
+# Portfolio with highest Sharpe ratio and minimum variance
+max_sharpe_return = anneal['max_sharpe']['return']
+max_sharpe_std = anneal['max_sharpe']['std']
+max_sharpe_weights = anneal['max_sharpe']['weights']
+
+min_variance_return = anneal['min_variance']['return']
+min_variance_std = anneal['min_variance']['std']
+min_variance_weights = anneal['min_variance']['weights']
 
 # Print optimal portfolio information
 print("Optimal Sharpe Portfolio")
@@ -13,6 +13,15 @@ from keras.layers import LSTM, Dense, Dropout
 from keras.optimizers import Adam
 from keras.callbacks import ReduceLROnPlateau, EarlyStopping
 from tqdm import tqdm  # 用于显示进度条
+import sys
+
+# 共用的滑动窗口数据集构建位于目录 通用机器学习/
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '../../通用机器学习')))
+from window_dataset import build_dataset
+
+# 共用的 Excel 缓存读取位于上级目录 金融/
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')))
+from excel_cache import read_excel
 
 # 配置部分：模型参数和训练超参数
 CONFIG = {
@@ -39,7 +48,7 @@ def clean_data(file_path):
     :return: 清洗后的DataFrame
     """
     print("读取数据...")
-    data = pd.read_excel(file_path)
+    data = read_excel(file_path)
     print("数据预览：")
     print(data.head())  # 显示前几行数据以检查格式
 
@@ -58,24 +67,8 @@ def preprocess_data(data_cleaned, window_size=30):
     :param window_size: 滚动窗口大小
     :return: 训练集和测试集
     """
-    X, y = [], []
-    
-    # 遍历每只股票的行数据
-    for i in range(len(data_cleaned)):
-        stock_data = data_cleaned.iloc[i, 2:].values  # 使用iloc获取时间序列数据，从第三列开始
-        
-        # 创建滚动窗口数据
-        stock_X, stock_y = [], []
-        for j in range(len(stock_data) - window_size):
-            stock_X.append(stock_data[j:j + window_size])
-            stock_y.append(stock_data[j + window_size])
-        
-        # 合并该股票的数据
-        X.extend(stock_X)
-        y.extend(stock_y)
-    
-    X = np.array(X)
-    y = np.array(y)
+    # 每只股票的时间序列从第三列开始，用滑动窗口视图一次性生成全部股票的窗口
+    X, y = build_dataset(data_cleaned.iloc[:, 2:].values, window_size, dropna=False)
     
     # 划分训练集和测试集
     train_size = int(len(X) * 0.8)
@@ -1,3 +1,7 @@
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
 import numpy as np
 import pandas as pd
 import torch
@@ -34,6 +38,63 @@ class NeuralSDE(nn.Module):
         diffusion = self.diffusion_net(x)
         return drift, diffusion
 
+# 把CSV中需要的列逐块转成 float32 的 .npy 缓存；CSV的路径、大小、修改时间或列的选择变化时重新生成
+def build_npy_cache(csv_path, cache_path, columns, chunksize=500000):
+    stat = os.stat(csv_path)
+    source = {"csv": os.path.abspath(csv_path), "size": stat.st_size, "mtime": stat.st_mtime, "columns": list(columns)}
+    meta_path = cache_path + ".json"
+    if os.path.exists(cache_path) and os.path.exists(meta_path):
+        with open(meta_path, "r", encoding="utf-8") as f:
+            cached = json.load(f)
+        if cached == source and np.load(cache_path, mmap_mode="r").shape[1:] == (len(columns),):
+            return cache_path
+    num_rows = sum(len(chunk) for chunk in pd.read_csv(csv_path, usecols=columns, chunksize=chunksize))
+    temp_path = cache_path + ".tmp.npy"
+    cache = np.lib.format.open_memmap(temp_path, mode="w+", dtype=np.float32, shape=(num_rows, len(columns)))
+    row = 0
+    for chunk in pd.read_csv(csv_path, usecols=columns, chunksize=chunksize):
+        cache[row:row + len(chunk)] = chunk[columns].values.astype(np.float32)
+        row += len(chunk)
+    cache.flush()
+    del cache
+    os.replace(temp_path, cache_path)
+    # 元数据最后写入，缓存写到一半中断时不会被当作有效缓存
+    with open(meta_path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(source, f, ensure_ascii=False)
+    os.replace(meta_path + ".tmp", meta_path)
+    return cache_path
+
+# 以内存映射方式读取 .npy 缓存，一次取一整个批次（每个 worker 各自打开映射，不复制数据）
+class MemmapBatchDataset(torch.utils.data.Dataset):
+    def __init__(self, cache_path):
+        self.cache_path = cache_path
+        self.data = None
+        self.num_rows = np.load(cache_path, mmap_mode="r").shape[0]
+
+    def __len__(self):
+        return self.num_rows
+
+    def __getitem__(self, indices):
+        if self.data is None:
+            self.data = np.load(self.cache_path, mmap_mode="r")
+        batch = torch.from_numpy(self.data[np.sort(indices)])
+        return batch[:, :-1], batch[:, -1]
+
+def make_dataloader(cache_path, batch_size, num_workers):
+    dataset = MemmapBatchDataset(cache_path)
+    sampler = torch.utils.data.BatchSampler(torch.utils.data.RandomSampler(dataset), batch_size, drop_last=False)
+    worker_options = {"num_workers": num_workers, "persistent_workers": True, "prefetch_factor": 4} if num_workers > 0 else {}
+    return torch.utils.data.DataLoader(dataset, sampler=sampler, batch_size=None,
+                                       pin_memory=torch.cuda.is_available(), **worker_options)
+
+# 后台线程保存检查点：先复制参数，再写临时文件并原子替换
+def save_checkpoint_async(executor, model, path):
+    state = {k: v.detach().to("cpu", copy=True) for k, v in model.state_dict().items()}
+    def save():
+        torch.save(state, path + ".tmp")
+        os.replace(path + ".tmp", path)
+    return executor.submit(save)
+
 # train model
 def train_model(model, dataloader, num_epochs, learning_rate, patience):
     criterion = nn.MSELoss()
@@ -41,54 +102,66 @@ def train_model(model, dataloader, num_epochs, learning_rate, patience):
     
     best_loss = float('inf')
     epochs_without_improvement = 0
+    checkpoint_executor = ThreadPoolExecutor(max_workers=1)
+    pending_checkpoint = None
     
     for epoch in range(num_epochs):
         epoch_loss = 0.0
-        for batch in dataloader:
+        num_samples = 0
+        start_time = time.time()
+        for x_batch, y_batch in dataloader:
             optimizer.zero_grad()
-            x_batch = batch[:, :-1].float()
-            y_batch = batch[:, -1].float()
             drift, diffusion = model(x_batch)
             loss = criterion(drift, y_batch.unsqueeze(1))
             loss.backward()
             optimizer.step()
-            epoch_loss += loss.item()
+            epoch_loss += loss.item() * len(x_batch)
+            num_samples += len(x_batch)
         
-        epoch_loss /= len(dataloader)
-        print(f"Epoch [{epoch+1}/{num_epochs}], Loss: {epoch_loss:.4f}")
+        epoch_loss /= num_samples
+        samples_per_second = num_samples / (time.time() - start_time)
+        print(f"Epoch [{epoch+1}/{num_epochs}], Loss: {epoch_loss:.4f}, Samples/s: {samples_per_second:.0f}")
         
         if epoch_loss < best_loss:
             best_loss = epoch_loss
             epochs_without_improvement = 0
-            torch.save(model.state_dict(), "best_model.pth")
+            if pending_checkpoint is not None:
+                pending_checkpoint.result()
+            pending_checkpoint = save_checkpoint_async(checkpoint_executor, model, "best_model.pth")
         else:
             epochs_without_improvement += 1
             if epochs_without_improvement >= patience:
                 print(f"Early stopping at epoch {epoch+1}")
                 break
     
+    if pending_checkpoint is not None:
+        pending_checkpoint.result()
+    checkpoint_executor.shutdown()
     model.load_state_dict(torch.load("best_model.pth"))
     return model
 
-# 准备数据
-file_path = "CallOptionData_apple_2021-2023_with_BSM.csv"
-df = pd.read_csv(file_path)
-features = ["YearToMaturity", "StockPrice", "StrikePrice", "ImpliedVolatility"]
-target = "CallOptionPrice"
-dataset = df[features + [target]].values.astype(np.float32)
-dataset = torch.tensor(dataset, dtype=torch.float32)
-dataloader = torch.utils.data.DataLoader(dataset, batch_size=64, shuffle=True)
+# 多进程加载数据时子进程会重新导入本文件，训练流程必须放在 main 中
+if __name__ == "__main__":
+    # 准备数据
+    file_path = "CallOptionData_apple_2021-2023_with_BSM.csv"
+    cache_path = "CallOptionData_apple_2021-2023_with_BSM.npy"
+    features = ["YearToMaturity", "StockPrice", "StrikePrice", "ImpliedVolatility"]
+    target = "CallOptionPrice"
+    batch_size = 1024
+    num_workers = min(4, max((os.cpu_count() or 1) - 1, 0))
+    build_npy_cache(file_path, cache_path, features + [target])
+    dataloader = make_dataloader(cache_path, batch_size, num_workers)
 
-# 训练模型
-input_dim = len(features)
-hidden_dim = 128
-num_layers = 3
-num_epochs = 100
-learning_rate = 0.001
-patience = 10
+    # 训练模型
+    input_dim = len(features)
+    hidden_dim = 128
+    num_layers = 3
+    num_epochs = 100
+    learning_rate = 0.001
+    patience = 10
 
-model = NeuralSDE(input_dim, hidden_dim, num_layers)
-trained_model = train_model(model, dataloader, num_epochs, learning_rate, patience)
+    model = NeuralSDE(input_dim, hidden_dim, num_layers)
+    trained_model = train_model(model, dataloader, num_epochs, learning_rate, patience)
 
-# 保存模型
-torch.save(trained_model.state_dict(), "trained_neural_sde.pth")
\ No newline at end of file
+    # 保存模型
+    torch.save(trained_model.state_dict(), "trained_neural_sde.pth")
@@ -1,3 +1,7 @@
+import json
+import os
+import time
+import numpy as np
 import torch
 import torch.nn as nn
 import pandas as pd
@@ -32,39 +36,102 @@ class NeuralSDE(nn.Module):
         diffusion = self.diffusion_net(x)
         return drift, diffusion
 
-# predict with model
-def predict_price(model, option_params):
-    option_params = torch.tensor(option_params, dtype=torch.float32)
-    with torch.no_grad():
-        drift, diffusion = model(option_params)
-    return drift.item()
+# 批量预测：整块数据一次前向计算，不再逐行构造张量和调用 .item()
+def predict_prices(model, option_data, batch_size=65536):
+    option_data = torch.from_numpy(np.ascontiguousarray(option_data, dtype=np.float32))
+    predictions = np.empty(len(option_data), dtype=np.float32)
+    with torch.inference_mode():
+        for start in range(0, len(option_data), batch_size):
+            drift, diffusion = model(option_data[start:start + batch_size])
+            predictions[start:start + batch_size] = drift[:, 0].numpy()
+    return predictions
 
-# 加载模型
+# ONNX Runtime 会话包装成与模型相同的调用方式
+class OnnxModel:
+    def __init__(self, onnx_path):
+        import onnxruntime as ort
+        self.session = ort.InferenceSession(onnx_path, providers=["CPUExecutionProvider"])
+        self.input_name = self.session.get_inputs()[0].name
+
+    def __call__(self, x):
+        drift, diffusion = self.session.run(None, {self.input_name: x.numpy()})
+        return torch.from_numpy(drift), torch.from_numpy(diffusion)
+
+# 权重文件的大小和修改时间，记录在导出模型旁的 .source.json 中，重新训练后据此重新导出
+def weights_signature():
+    stat = os.stat(weights_path)
+    return {"weights": os.path.abspath(weights_path), "size": stat.st_size, "mtime": stat.st_mtime}
+
+def is_export_current(export_path):
+    meta_path = export_path + ".source.json"
+    if not (os.path.exists(export_path) and os.path.exists(meta_path)):
+        return False
+    with open(meta_path, "r", encoding="utf-8") as f:
+        return json.load(f) == weights_signature()
+
+def record_export_source(export_path, signature):
+    with open(export_path + ".source.json.tmp", "w", encoding="utf-8") as f:
+        json.dump(signature, f, ensure_ascii=False)
+    os.replace(export_path + ".source.json.tmp", export_path + ".source.json")
+
+# 加载模型：优先使用由当前权重文件导出的 TorchScript / ONNX 模型（启动更快），没有或已过期时从权重文件构建并重新导出
+def load_model(model_format=None):
+    if model_format == "onnx" and is_export_current(onnx_model_path):
+        return OnnxModel(onnx_model_path)
+    if model_format == "torchscript" and is_export_current(torchscript_model_path):
+        return torch.jit.load(torchscript_model_path)
+
+    signature = weights_signature()
+    model = NeuralSDE(input_dim, hidden_dim, num_layers)
+    model.load_state_dict(torch.load(weights_path))
+    model.eval()
+
+    example = torch.zeros(1, input_dim)
+    if model_format == "torchscript":
+        scripted = torch.jit.freeze(torch.jit.trace(model, example))
+        scripted.save(torchscript_model_path)
+        record_export_source(torchscript_model_path, signature)
+        return scripted
+    if model_format == "onnx":
+        torch.onnx.export(model, example, onnx_model_path,
+                          input_names=["option_params"], output_names=["drift", "diffusion"],
+                          dynamic_axes={"option_params": {0: "batch"}, "drift": {0: "batch"}, "diffusion": {0: "batch"}})
+        record_export_source(onnx_model_path, signature)
+        return OnnxModel(onnx_model_path)
+    return model
+
+# 模型参数
 input_dim = 4
 hidden_dim = 128
 num_layers = 3
 
-loaded_model = NeuralSDE(input_dim, hidden_dim, num_layers)
-loaded_model.load_state_dict(torch.load("trained_neural_sde.pth"))
+# 批量参数
+chunk_size = 500000       # 每次从CSV读入的行数，内存占用与它成正比
+batch_size = 65536        # 每次前向计算的行数
+model_format = None       # None: 直接用 .pth 权重; "torchscript" 或 "onnx": 首次运行时导出，之后直接加载
+weights_path = "trained_neural_sde.pth"
+torchscript_model_path = "trained_neural_sde.pt"
+onnx_model_path = "trained_neural_sde.onnx"
 
-# 读取完整的CSV文件
+feature_columns = ['YearToMaturity', 'StockPrice', 'StrikePrice', 'ImpliedVolatility']
 file_path = "CallOptionData_apple_2021-2023_with_BSM.csv"
-df = pd.read_csv(file_path)
-
-# 提取所需的列
-option_data = df[['YearToMaturity', 'StockPrice', 'StrikePrice', 'ImpliedVolatility']].values
-
-# 对每行数据进行预测
-predictions = []
-for params in option_data:
-    predicted_price = predict_price(loaded_model, params)
-    predictions.append(predicted_price)
+output_file_path = "CallOptionData_apple_2021-2023_with_BSM&NSDE.csv"
 
-# 将预测结果添加到DataFrame的新列中
-df['NeuralSDE_Pricing'] = predictions
+loaded_model = load_model(model_format)
 
-# 保存更新后的DataFrame到新的CSV文件
-output_file_path = "CallOptionData_apple_2021-2023_with_BSM&NSDE.csv"
-df.to_csv(output_file_path, index=False)
+# 分块读取CSV、批量预测并逐块写出，先写临时文件，全部完成后再替换，避免中断时留下不完整的结果
+temp_file_path = output_file_path + ".tmp"
+start_time = time.time()
+total_rows = 0
+# 先写表头，输入CSV没有数据行时也会得到只有表头的结果文件
+header = pd.read_csv(file_path, nrows=0)
+header['NeuralSDE_Pricing'] = []
+header.to_csv(temp_file_path, index=False)
+for chunk in pd.read_csv(file_path, chunksize=chunk_size):
+    chunk['NeuralSDE_Pricing'] = predict_prices(loaded_model, chunk[feature_columns].values, batch_size)
+    chunk.to_csv(temp_file_path, mode='a', header=False, index=False)
+    total_rows += len(chunk)
+    print(f"已处理 {total_rows} 行, {total_rows / (time.time() - start_time):.0f} 行/秒")
+os.replace(temp_file_path, output_file_path)
 
-print("预测完成,结果已保存到文件:", output_file_path)
\ No newline at end of file
+print("预测完成,结果已保存到文件:", output_file_path)
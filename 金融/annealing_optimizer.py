@@ -0,0 +1,152 @@
+"""
+均值-方差投资组合的模拟退火优化器（批量向量化版）
+
+每个温度一次性生成一整批候选权重，用矩阵乘法同时计算收益率、标准差和夏普比率；
+运行中的最优组合以 O(1) 方式更新，不再每步对全部历史结果求最大值。
+不保存全部候选权重，只在预分配数组中保留：
+  - 按收益率分桶的有效边界点（每个收益率区间中标准差最小的组合）
+  - 固定数量的抽样组合（用于画散点图）
+
+用法:
+    from annealing_optimizer import anneal_portfolios
+    result = anneal_portfolios(mean_returns, cov_matrix, risk_free_rate,
+                               num_iterations=10000, batch_size=300)
+    result['max_sharpe']['weights']
+"""
+import numpy as np
+
+
+def portfolio_stats(weights, mean_returns, cov_matrix, risk_free_rate):
+    """批量计算组合收益率、标准差和夏普比率，weights 形状为 (批量, 资产数)"""
+    returns = weights @ mean_returns
+    stds = np.sqrt(np.einsum('ij,jk,ik->i', weights, cov_matrix, weights))
+    sharpes = (returns - risk_free_rate) / stds
+    return returns, stds, sharpes
+
+
+def anneal_portfolios(mean_returns, cov_matrix, risk_free_rate,
+                      num_iterations=10000, batch_size=300,
+                      initial_temp=1.0, cooling_rate=0.9999,
+                      min_required_return=None,
+                      frontier_bins=500, sample_size=20000,
+                      seed=None, progress_every=100):
+    """
+    模拟退火搜索最大夏普比率组合（只做多，权重和为1）
+
+    参数:
+        mean_returns: 各资产期望收益率 (n,)
+        cov_matrix: 协方差矩阵 (n, n)
+        risk_free_rate: 无风险利率（与收益率同频率）
+        num_iterations: 温度步数
+        batch_size: 每个温度生成的候选组合数
+        initial_temp, cooling_rate: 第 i 步的扰动标准差为 initial_temp * cooling_rate ** i
+        min_required_return: 最低收益率约束，只影响最终挑选的组合，不影响退火路径
+        frontier_bins: 有效边界按收益率分桶的数量
+        sample_size: 保留用于画图的抽样组合数量
+        seed: 随机种子
+        progress_every: 每多少个温度步输出一次进度，为 0 时不输出
+
+    返回: dict
+        'max_sharpe' / 'min_variance': {'return', 'std', 'sharpe', 'weights'}，无满足约束的组合时为 None
+        'frontier': 有效边界点 {'returns', 'stds', 'sharpes', 'weights'}，按收益率升序
+        'results': 抽样组合的 [收益率, 标准差, 夏普比率]，形状 (3, k)
+        'weights': 抽样组合的权重，形状 (k, n)
+        'num_portfolios': 实际评估的组合总数
+    """
+    rng = np.random.default_rng(seed)
+    mean_returns = np.asarray(mean_returns, dtype=float)
+    cov_matrix = np.asarray(cov_matrix, dtype=float)
+    n_assets = len(mean_returns)
+
+    # 只做多时组合收益率必然落在单个资产收益率的最小值和最大值之间，据此预先划分收益率桶
+    ret_low, ret_high = mean_returns.min(), mean_returns.max()
+    bin_width = (ret_high - ret_low) / frontier_bins if ret_high > ret_low else 1.0
+    frontier_ret = np.full(frontier_bins, np.nan)
+    frontier_std = np.full(frontier_bins, np.inf)
+    frontier_sharpe = np.full(frontier_bins, np.nan)
+    frontier_weights = np.zeros((frontier_bins, n_assets))
+
+    # 抽样缓冲区：总数不超过 sample_size，均匀分配到各温度步，第 i 步取前 offsets[i+1] - offsets[i] 个候选
+    total_samples = min(sample_size, batch_size * num_iterations)
+    offsets = np.arange(num_iterations + 1) * total_samples // num_iterations
+    sample_results = np.empty((3, total_samples))
+    sample_weights = np.empty((total_samples, n_assets))
+
+    # 运行中的最优值（O(1) 更新）
+    best_sharpe = -np.inf  # 退火接受准则：不考虑收益率约束
+    best = {'max_sharpe': None, 'min_variance': None}
+    best_feasible_sharpe = -np.inf
+    best_feasible_std = np.inf
+
+    current_weights = rng.random(n_assets)
+    current_weights /= current_weights.sum()
+
+    for i in range(num_iterations):
+        temp = initial_temp * (cooling_rate ** i)
+
+        # 一次生成整批候选并向量化评估
+        candidates = np.abs(current_weights + rng.normal(0, temp, size=(batch_size, n_assets)))
+        candidates /= candidates.sum(axis=1, keepdims=True)
+        returns, stds, sharpes = portfolio_stats(candidates, mean_returns, cov_matrix, risk_free_rate)
+
+        # 退火：批内最优优于历史最优时移动当前点
+        batch_best = np.argmax(sharpes)
+        if sharpes[batch_best] > best_sharpe:
+            best_sharpe = sharpes[batch_best]
+            current_weights = candidates[batch_best]
+
+        # 满足收益率约束的最优夏普与最小方差组合
+        if min_required_return is None:
+            feasible = np.arange(batch_size)
+        else:
+            feasible = np.flatnonzero(returns >= min_required_return)
+        if len(feasible):
+            k = feasible[np.argmax(sharpes[feasible])]
+            if sharpes[k] > best_feasible_sharpe:
+                best_feasible_sharpe = sharpes[k]
+                best['max_sharpe'] = _portfolio(returns[k], stds[k], sharpes[k], candidates[k])
+            k = feasible[np.argmin(stds[feasible])]
+            if stds[k] < best_feasible_std:
+                best_feasible_std = stds[k]
+                best['min_variance'] = _portfolio(returns[k], stds[k], sharpes[k], candidates[k])
+
+        # 有效边界：每个收益率桶保留标准差最小的组合
+        bins = np.clip(((returns - ret_low) / bin_width).astype(int), 0, frontier_bins - 1)
+        order = np.lexsort((stds, bins))
+        unique_bins, first = np.unique(bins[order], return_index=True)
+        winners = order[first]
+        improved = stds[winners] < frontier_std[unique_bins]
+        target, winners = unique_bins[improved], winners[improved]
+        frontier_ret[target] = returns[winners]
+        frontier_std[target] = stds[winners]
+        frontier_sharpe[target] = sharpes[winners]
+        frontier_weights[target] = candidates[winners]
+
+        # 抽样保存
+        start, count = offsets[i], offsets[i + 1] - offsets[i]
+        sample_results[0, start:start + count] = returns[:count]
+        sample_results[1, start:start + count] = stds[:count]
+        sample_results[2, start:start + count] = sharpes[:count]
+        sample_weights[start:start + count] = candidates[:count]
+
+        if progress_every and (i + 1) % progress_every == 0:
+            print(f"Progress: {(i + 1) / num_iterations * 100 :.2f}%")
+
+    filled = np.isfinite(frontier_std)
+    return {
+        'max_sharpe': best['max_sharpe'],
+        'min_variance': best['min_variance'],
+        'frontier': {
+            'returns': frontier_ret[filled],
+            'stds': frontier_std[filled],
+            'sharpes': frontier_sharpe[filled],
+            'weights': frontier_weights[filled],
+        },
+        'results': sample_results,
+        'weights': sample_weights,
+        'num_portfolios': num_iterations * batch_size,
+    }
+
+
+def _portfolio(ret, std, sharpe, weights):
+    return {'return': ret, 'std': std, 'sharpe': sharpe, 'weights': weights.copy()}
@@ -0,0 +1,193 @@
+"""
+只做多（权重非负、和为1）的均值-方差有效边界精确求解
+
+用有效集（active-set）二次规划代替随机抽样：
+  - 最小方差组合（可加最低收益率约束）
+  - 切点组合 / 最大夏普比率组合（可加最低收益率约束）
+  - 有效边界：按目标收益率逐点求解，每个点以上一个点的解作为热启动
+
+只依赖 numpy。只做多的解通常只有少数资产权重非零，每次迭代只在非零资产上解一个小线性方程组，
+因此资产数上千时也能在毫秒到秒级完成，而随机抽样在资产数增大时几乎采不到边界附近的组合。
+
+用法:
+    from efficient_frontier import tangency_portfolio, min_variance_portfolio, efficient_frontier
+    w_orp = tangency_portfolio(mean_returns, cov_matrix, risk_free_rate)
+    w_mvp = min_variance_portfolio(mean_returns, cov_matrix)
+    frontier = efficient_frontier(mean_returns, cov_matrix, num_points=200, risk_free_rate=risk_free_rate)
+"""
+import numpy as np
+
+
+def portfolio_performance(weights, mean_returns, cov_matrix, risk_free_rate=0.0):
+    """组合的期望收益率、标准差和夏普比率"""
+    weights = np.asarray(weights, dtype=float)
+    portfolio_return = float(weights @ mean_returns)
+    portfolio_std = float(np.sqrt(weights @ cov_matrix @ weights))
+    sharpe_ratio = (portfolio_return - risk_free_rate) / portfolio_std if portfolio_std > 0 else np.nan
+    return portfolio_return, portfolio_std, sharpe_ratio
+
+
+def _solve_eqp(Q, A, b, F):
+    """只在自由变量 F 上求解等式约束二次规划的KKT方程，返回 (F上的解, 等式约束乘子)"""
+    k, m = len(F), len(b)
+    K = np.zeros((k + m, k + m))
+    K[:k, :k] = Q[np.ix_(F, F)]
+    K[:k, k:] = A[:, F].T
+    K[k:, :k] = A[:, F]
+    rhs = np.concatenate([np.zeros(k), b])
+    try:
+        sol = np.linalg.solve(K, rhs)
+    except np.linalg.LinAlgError:
+        sol = np.linalg.lstsq(K, rhs, rcond=None)[0]
+    return sol[:k], sol[k:]
+
+
+def solve_long_only_qp(Q, A, b, x0, max_iter=None):
+    """
+    有效集法求解  min 1/2 x'Qx  s.t.  Ax = b, x >= 0
+
+    参数:
+        Q: 半正定矩阵 (n, n)
+        A, b: 等式约束 (m, n), (m,)，m 很小（1~2）
+        x0: 满足约束的初始点，其非零分量作为初始的自由变量集合（热启动）
+    """
+    Q = np.asarray(Q, dtype=float)
+    A = np.atleast_2d(np.asarray(A, dtype=float))
+    b = np.atleast_1d(np.asarray(b, dtype=float))
+    n = len(x0)
+    x = np.maximum(np.asarray(x0, dtype=float), 0.0)
+    free = x > 0
+    scale = max(np.abs(np.diag(Q)).max(), 1e-300)
+    grad_tol = 1e-12 * scale
+    max_iter = max_iter or 10 * n + 100
+
+    for _ in range(max_iter):
+        F = np.flatnonzero(free)
+        # 在自由变量上解等式约束二次规划的KKT方程
+        z, multipliers = _solve_eqp(Q, A, b, F)
+
+        if np.all(z >= 0):
+            x[:] = 0.0
+            x[F] = z
+            # 检查被固定在0的变量的乘子，全部非负即最优
+            grad = Q[:, F] @ z + A.T @ multipliers
+            grad[free] = np.inf
+            j = np.argmin(grad)
+            if grad[j] >= -grad_tol:
+                break
+            free[j] = True
+        else:
+            # 沿 x -> z 前进到第一个变量碰到0的位置，并把它固定
+            xF = x[F]
+            blocking = z < 0
+            alpha = np.min(xF[blocking] / (xF[blocking] - z[blocking]))
+            xF = xF + alpha * (z - xF)
+            hit = xF <= 1e-15
+            hit[np.argmin(np.where(blocking, xF, np.inf))] = True
+            xF[hit] = 0.0
+            x[F] = xF
+            free[F[hit]] = False
+
+    return np.maximum(x, 0.0)
+
+
+def _mix_to_target(weights, mean_returns, target_return):
+    """把可行组合与收益率最高（或最低）的单个资产混合，得到收益率恰为目标值的可行初始点"""
+    current = weights @ mean_returns
+    k = np.argmax(mean_returns) if target_return > current else np.argmin(mean_returns)
+    if mean_returns[k] == current:
+        return weights.copy()
+    beta = np.clip((target_return - current) / (mean_returns[k] - current), 0.0, 1.0)
+    mixed = (1 - beta) * weights
+    mixed[k] += beta
+    return mixed
+
+
+def _normalize(weights):
+    weights = np.maximum(weights, 0.0)
+    return weights / weights.sum()
+
+
+def frontier_portfolio(mean_returns, cov_matrix, target_return, x0=None):
+    """给定目标收益率的最小方差组合；x0 为热启动的可行组合（权重和为1）"""
+    mean_returns = np.asarray(mean_returns, dtype=float)
+    n = len(mean_returns)
+    if not mean_returns.min() <= target_return <= mean_returns.max():
+        raise ValueError("目标收益率超出只做多组合可达到的范围")
+    A = np.vstack([np.ones(n), mean_returns])
+    b = np.array([1.0, target_return])
+    if x0 is None:
+        x0 = np.full(n, 1.0 / n)
+    x0 = np.asarray(x0, dtype=float)
+
+    # 热启动：相邻目标收益率的最优解通常有相同的非零资产集合，先直接在该集合上求解
+    F = np.flatnonzero(x0 > 0)
+    z, _ = _solve_eqp(cov_matrix, A, b, F)
+    if np.all(z >= 0) and np.allclose(A[:, F] @ z, b):
+        start = np.zeros(n)
+        start[F] = z
+    else:
+        start = _mix_to_target(x0, mean_returns, target_return)
+    return _normalize(solve_long_only_qp(cov_matrix, A, b, start))
+
+
+def min_variance_portfolio(mean_returns, cov_matrix, min_return=None):
+    """最小方差组合；给定 min_return 时求收益率不低于该值的最小方差组合"""
+    mean_returns = np.asarray(mean_returns, dtype=float)
+    cov_matrix = np.asarray(cov_matrix, dtype=float)
+    n = len(mean_returns)
+    # 从方差最小的单个资产出发，逐个加入资产
+    start = np.zeros(n)
+    start[np.argmin(np.diag(cov_matrix))] = 1.0
+    weights = _normalize(solve_long_only_qp(cov_matrix, np.ones((1, n)), [1.0], start))
+    if min_return is not None and weights @ mean_returns < min_return:
+        weights = frontier_portfolio(mean_returns, cov_matrix, min_return, x0=weights)
+    return weights
+
+
+def tangency_portfolio(mean_returns, cov_matrix, risk_free_rate, min_return=None):
+    """
+    切点组合（最大夏普比率）；给定 min_return 时求收益率不低于该值的最大夏普比率组合
+
+    转化为  min y'Σy  s.t.  (μ - rf)'y = 1, y >= 0，再令 w = y / sum(y)
+    """
+    mean_returns = np.asarray(mean_returns, dtype=float)
+    cov_matrix = np.asarray(cov_matrix, dtype=float)
+    excess = mean_returns - risk_free_rate
+    if excess.max() <= 0:
+        raise ValueError("所有资产的期望收益率都不高于无风险利率，不存在切点组合")
+    k = np.argmax(excess)
+    start = np.zeros(len(excess))
+    start[k] = 1.0 / excess[k]
+    weights = _normalize(solve_long_only_qp(cov_matrix, excess[None, :], [1.0], start))
+    # 有效边界上夏普比率随收益率先升后降，约束起作用时最优点就在 min_return 处
+    if min_return is not None and weights @ mean_returns < min_return:
+        weights = frontier_portfolio(mean_returns, cov_matrix, min_return, x0=weights)
+    return weights
+
+
+def efficient_frontier(mean_returns, cov_matrix, num_points=100, risk_free_rate=None, min_return=None):
+    """
+    从最小方差组合到最高收益资产之间等距取 num_points 个目标收益率，逐点热启动求解
+
+    返回: dict {'returns', 'stds', 'sharpes'(给定无风险利率时), 'weights' (num_points, n)}
+    """
+    mean_returns = np.asarray(mean_returns, dtype=float)
+    cov_matrix = np.asarray(cov_matrix, dtype=float)
+    weights = min_variance_portfolio(mean_returns, cov_matrix)
+    low = weights @ mean_returns
+    if min_return is not None:
+        low = max(low, min_return)
+    targets = np.linspace(low, mean_returns.max(), num_points)
+
+    all_weights = np.empty((num_points, len(mean_returns)))
+    for i, target in enumerate(targets):
+        weights = frontier_portfolio(mean_returns, cov_matrix, target, x0=weights)
+        all_weights[i] = weights
+
+    returns = all_weights @ mean_returns
+    stds = np.sqrt(np.sum((all_weights @ cov_matrix) * all_weights, axis=1))
+    frontier = {'returns': returns, 'stds': stds, 'weights': all_weights}
+    if risk_free_rate is not None:
+        frontier['sharpes'] = (returns - risk_free_rate) / stds
+    return frontier
@@ -0,0 +1,148 @@
+"""
+Excel 工作表的列式二进制缓存
+
+  - read_excel 与 pd.read_excel 用法相同：第一次读取某个工作表时照常解析 Excel，并把结果按列保存为 .npy，
+    之后源文件不变时直接从缓存读取，不再解析 Excel
+  - 缓存以源文件的大小、修改时间和内容哈希为准：修改时间变化但内容不变（如复制、重新下载）时仍使用缓存
+  - 每列单独一个文件，usecols 只读取需要的列；同一工作表不同 usecols 的读取共用一份缓存
+  - 同时指定 index_col 和 usecols 时，usecols 的列位置是相对去掉索引列之前的工作表而言的，
+    而 index_col 又是相对 usecols 选出的列而言的，这种读取直接交给 pd.read_excel，不使用缓存
+  - 缓存保存在源文件所在目录的 .excel_cache/ 下，可随时删除
+
+用法:
+    from excel_cache import read_excel
+    data = read_excel("风险投资组合分析.xlsx")
+    df = read_excel(file_path, header=None, skiprows=2, usecols=[0, 1])
+"""
+import hashlib
+import json
+import os
+import pickle
+import shutil
+import numpy as np
+import pandas as pd
+
+
+def _file_hash(path):
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _column_letters_to_positions(spec):
+    """Excel 列字母范围（如 "A,C,E:F"）转为列位置"""
+    def to_position(letters):
+        position = 0
+        for letter in letters.strip().upper():
+            position = position * 26 + ord(letter) - ord('A') + 1
+        return position - 1
+
+    positions = []
+    for part in spec.split(','):
+        if ':' in part:
+            first, last = part.split(':')
+            positions.extend(range(to_position(first), to_position(last) + 1))
+        else:
+            positions.append(to_position(part))
+    return positions
+
+
+def _select_positions(columns, usecols):
+    """按 pd.read_excel 的 usecols 规则选出列位置，结果按工作表中的顺序排列"""
+    if usecols is None:
+        return list(range(len(columns)))
+    if callable(usecols):
+        return [i for i, name in enumerate(columns) if usecols(name)]
+    if isinstance(usecols, str):
+        wanted = set(_column_letters_to_positions(usecols))
+        return [i for i in range(len(columns)) if i in wanted]
+    usecols = list(usecols)
+    if all(isinstance(item, (int, np.integer)) for item in usecols):
+        wanted = set(int(item) for item in usecols)
+        return [i for i in range(len(columns)) if i in wanted]
+    missing = [item for item in usecols if item not in set(columns)]
+    if missing:
+        raise ValueError(f"usecols 中的列不存在: {missing}")
+    wanted = set(usecols)
+    return [i for i, name in enumerate(columns) if name in wanted]
+
+
+def _build_cache(path, sheet_name, kwargs, entry_dir, source):
+    """解析工作表并按列写入缓存，元数据最后写入，中途失败时不会留下看似有效的缓存"""
+    df = pd.read_excel(path, sheet_name=sheet_name, **kwargs)
+    if os.path.exists(entry_dir):
+        shutil.rmtree(entry_dir)
+    os.makedirs(entry_dir)
+    for i in range(df.shape[1]):
+        values = df.iloc[:, i].to_numpy()
+        np.save(os.path.join(entry_dir, f'c{i}.npy'), values, allow_pickle=values.dtype == object)
+    with open(os.path.join(entry_dir, 'frame.pkl'), 'wb') as f:
+        pickle.dump({'columns': df.columns, 'index': df.index, 'dtypes': list(df.dtypes)}, f)
+
+    meta_path = os.path.join(entry_dir, 'meta.json')
+    with open(meta_path + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(source, f)
+    os.replace(meta_path + '.tmp', meta_path)
+
+
+def _cached_entry(path, sheet_name, kwargs, cache_dir):
+    """返回与源文件一致的缓存目录，必要时（重新）建立"""
+    stat = os.stat(path)
+    if cache_dir is None:
+        cache_dir = os.path.join(os.path.dirname(os.path.abspath(path)), '.excel_cache')
+    key = hashlib.sha1(repr((sheet_name, sorted(kwargs.items()))).encode('utf-8')).hexdigest()[:12]
+    entry_dir = os.path.join(cache_dir, f"{os.path.basename(path)}-{key}")
+    meta_path = os.path.join(entry_dir, 'meta.json')
+
+    cached = None
+    if os.path.exists(meta_path):
+        with open(meta_path, 'r', encoding='utf-8') as f:
+            cached = json.load(f)
+        if cached['size'] == stat.st_size and cached['mtime'] == stat.st_mtime:
+            return entry_dir
+
+    source = {'size': stat.st_size, 'mtime': stat.st_mtime, 'sha1': _file_hash(path)}
+    if cached is not None and cached['sha1'] == source['sha1']:
+        # 内容未变，只更新修改时间
+        with open(meta_path + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump(source, f)
+        os.replace(meta_path + '.tmp', meta_path)
+        return entry_dir
+
+    _build_cache(path, sheet_name, kwargs, entry_dir, source)
+    return entry_dir
+
+
+def read_excel(path, sheet_name=0, usecols=None, cache_dir=None, **kwargs):
+    """
+    与 pd.read_excel 相同，但从列式缓存读取
+
+    参数:
+        path: Excel 文件路径
+        sheet_name: 工作表名称或序号；为 None 或列表（读取多个工作表）时直接交给 pd.read_excel
+        usecols: 与 pd.read_excel 相同（列位置列表、列名列表、"A:C" 形式的字符串或函数），只读取对应列的缓存
+        cache_dir: 缓存目录，默认为源文件所在目录下的 .excel_cache/
+        其余参数（header、skiprows 等）原样用于解析，不同参数各自缓存；同时指定 index_col 和 usecols 时不使用缓存
+
+    返回: DataFrame
+    """
+    if (sheet_name is None or isinstance(sheet_name, list) or any(callable(value) for value in kwargs.values())
+            or (usecols is not None and kwargs.get('index_col') is not None)):
+        return pd.read_excel(path, sheet_name=sheet_name, usecols=usecols, **kwargs)
+
+    entry_dir = _cached_entry(path, sheet_name, kwargs, cache_dir)
+    with open(os.path.join(entry_dir, 'frame.pkl'), 'rb') as f:
+        frame = pickle.load(f)
+    positions = _select_positions(frame['columns'], usecols)
+
+    data = {}
+    for i in positions:
+        values = np.load(os.path.join(entry_dir, f'c{i}.npy'), allow_pickle=True)
+        dtype = frame['dtypes'][i]
+        data[i] = values if isinstance(dtype, np.dtype) else pd.array(values, dtype=dtype)
+    df = pd.DataFrame(data, index=frame['index'])
+    # 列名重新推断类型，与 pd.read_excel 只解析这些列时相同
+    df.columns = pd.Index(list(frame['columns'][positions]))
+    return df
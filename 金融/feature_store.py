@@ -0,0 +1,140 @@
+"""
+个股日度数据的增量特征库
+
+按 (股票代码, 交易日) 保存历史数据，每天只追加新的交易日：
+  - values.f64: 按交易日顺序存放的原始矩阵 (交易日数, 股票数)，追加一天就是在文件末尾追加一行
+  - day_stats.f64: 每个交易日在全部股票上的最小值和最大值（即按列 MinMaxScaler 的统计量），同样逐日追加
+  - meta.json: 股票代码、交易日标签和版本号；股票列表变化时整体重建并递增版本号，
+    依赖特征库的缓存（如 pattern_index）据此判断是否需要重建
+
+读取时以内存映射方式打开，窗口、归一化后的数据都是在映射上的视图或按需分块计算，不复制整个矩阵。
+
+用法:
+    from feature_store import FeatureStore
+    store = FeatureStore('feature_store')
+    store.update(codes, dates, values)        # values: (股票数, 交易日数)，从旧到新
+    matrix = store.matrix()                   # (股票数, 交易日数) 视图
+    windows = store.windows(40)               # (股票数, 起始日数, 40) 视图
+"""
+import json
+import os
+import numpy as np
+
+
+def write_at(path, data, offset):
+    """
+    把 data 写在文件第 offset 字节处并截断其后的内容，offset 为 0 时新建文件
+
+    追加前先截断到元数据记录的长度，上次写入中途失败留下的多余数据不会错位到新数据之前
+    """
+    with open(path, 'r+b' if offset else 'wb') as f:
+        f.truncate(offset)
+        f.seek(offset)
+        np.ascontiguousarray(data).tofile(f)
+
+
+class FeatureStore:
+    def __init__(self, root):
+        self.root = root
+        self.meta_path = os.path.join(root, 'meta.json')
+        self.values_path = os.path.join(root, 'values.f64')
+        self.stats_path = os.path.join(root, 'day_stats.f64')
+        if os.path.exists(self.meta_path):
+            with open(self.meta_path, 'r', encoding='utf-8') as f:
+                self.meta = json.load(f)
+        else:
+            self.meta = {'codes': [], 'dates': [], 'generation': 0}
+
+    @property
+    def codes(self):
+        return self.meta['codes']
+
+    @property
+    def dates(self):
+        return self.meta['dates']
+
+    @property
+    def generation(self):
+        return self.meta['generation']
+
+    @property
+    def num_days(self):
+        return len(self.meta['dates'])
+
+    @property
+    def num_stocks(self):
+        return len(self.meta['codes'])
+
+    def update(self, codes, dates, values, rebuild=False):
+        """
+        写入最新的数据表，只追加特征库中还没有的交易日
+
+        参数:
+            codes: 股票代码 (股票数,)
+            dates: 交易日标签 (交易日数,)，从旧到新
+            values: 数据 (股票数, 交易日数)，从旧到新，缺失为 NaN
+            rebuild: 为 True 时不按交易日标签追加，整体重建（标签不可靠时使用）
+
+        返回: 新追加的交易日数（整体重建时为全部交易日数）
+        """
+        codes = [str(code) for code in codes]
+        dates = [str(date) for date in dates]
+        values = np.asarray(values, dtype=float)
+        if len(set(dates)) != len(dates):
+            raise ValueError("交易日标签有重复，无法按交易日增量更新")
+
+        if not rebuild and self.num_days and codes == self.codes and self.dates[-1] in dates:
+            start = dates.index(self.dates[-1]) + 1
+            kept_days = self.num_days
+            self.meta['dates'] = self.dates + dates[start:]
+        else:
+            # 首次写入或股票列表变化：整体重建
+            start = 0
+            kept_days = 0
+            os.makedirs(self.root, exist_ok=True)
+            self.meta = {'codes': codes, 'dates': dates, 'generation': self.generation + 1}
+
+        new_rows = np.ascontiguousarray(values[:, start:].T)
+        # 全为缺失值的交易日统计量为 NaN
+        stats = np.column_stack([np.nanmin(new_rows, axis=1, initial=np.inf), np.nanmax(new_rows, axis=1, initial=-np.inf)])
+        stats[~np.isfinite(stats)] = np.nan
+        write_at(self.values_path, new_rows, kept_days * len(codes) * new_rows.itemsize)
+        write_at(self.stats_path, stats, kept_days * 2 * stats.itemsize)
+        # 数据写完后再更新元数据，中途失败时旧的元数据仍与文件前部一致
+        temp_path = self.meta_path + '.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.meta, f, ensure_ascii=False)
+        os.replace(temp_path, self.meta_path)
+        return len(new_rows)
+
+    def values(self):
+        """原始数据的内存映射 (交易日数, 股票数)"""
+        if not self.num_days:
+            return np.empty((0, self.num_stocks))
+        return np.memmap(self.values_path, dtype=np.float64, mode='r', shape=(self.num_days, self.num_stocks))
+
+    def matrix(self):
+        """原始数据 (股票数, 交易日数)，为 values() 的转置视图"""
+        return self.values().T
+
+    def day_stats(self):
+        """每个交易日在全部股票上的 (最小值, 最大值)，形状 (交易日数, 2)"""
+        if not self.num_days:
+            return np.empty((0, 2))
+        return np.memmap(self.stats_path, dtype=np.float64, mode='r', shape=(self.num_days, 2))
+
+    def scaled(self, start=0, stop=None):
+        """
+        第 start 到 stop 个交易日按列 (0, 1) 归一化后的数据 (交易日数, 股票数)，与对整表做
+        MinMaxScaler().fit_transform 的结果一致（极差为0时不缩放）
+        """
+        stop = self.num_days if stop is None else stop
+        block = np.asarray(self.values()[start:stop])
+        stats = np.asarray(self.day_stats()[start:stop])
+        data_range = stats[:, 1] - stats[:, 0]
+        data_range[~(data_range > 0)] = 1.0
+        return (block - stats[:, :1]) / data_range[:, None]
+
+    def windows(self, window_size):
+        """全部滑动窗口 (股票数, 起始日数, window_size)，是原始数据上的零拷贝视图"""
+        return np.lib.stride_tricks.sliding_window_view(self.matrix(), window_size, axis=1)
@@ -0,0 +1,212 @@
+"""
+可断点续跑的并行贝叶斯超参数搜索（替代 BayesSearchCV）
+
+  - 数据只读一次：训练数组保存为 .npy，源文件不变时直接复用；各工作进程以内存映射方式打开，
+    不再为每个任务序列化整个 DataFrame
+  - 每完成一个试验就追加写入 JSONL 结果文件，中断后重新运行会先把已完成的试验告诉优化器，接着搜索；
+    每条记录带有数据缓存、参数空间和折数的签名，数据或搜索设置变化后旧记录不再恢复，也不参与剪枝
+  - 剪枝：每个试验先跑第一折，其指标明显差于已完成试验中的最好值时不再跑剩余折
+    （XGBoost 可用其验证集评估历史 xgb_eval_mse 作为该指标）；被剪枝的试验告诉优化器的值不低于
+    已完成试验中最差的得分，也不参与最好值和提前停止的计数
+  - 每轮向 skopt.Optimizer 要 n_jobs 个参数组合，用 joblib 并行评估
+
+用法:
+    from hyperparam_search import cache_arrays, run_search
+    paths = cache_arrays('search_cache', 'data.xlsx', build_arrays)
+    best_params, trials = run_search(make_estimator, param_space, paths, 'trials.jsonl', n_iter=100, cv=3)
+"""
+import hashlib
+import json
+import os
+import time
+import numpy as np
+from joblib import Parallel, delayed, effective_n_jobs
+from sklearn.metrics import mean_squared_error
+from sklearn.model_selection import KFold
+from skopt import Optimizer
+from skopt.utils import dimensions_aslist
+
+
+def cache_arrays(cache_dir, source_path, build_arrays):
+    """
+    把 build_arrays() 返回的 {名称: 数组} 保存为 .npy；source_path 的大小和修改时间不变时直接返回已有缓存
+
+    返回: {名称: .npy 路径}
+    """
+    stat = os.stat(source_path)
+    source = {'path': os.path.abspath(source_path), 'size': stat.st_size, 'mtime': stat.st_mtime}
+    meta_path = os.path.join(cache_dir, 'meta.json')
+    if os.path.exists(meta_path):
+        with open(meta_path, 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        if meta['source'] == source:
+            return meta['arrays']
+
+    os.makedirs(cache_dir, exist_ok=True)
+    paths = {}
+    for name, array in build_arrays().items():
+        paths[name] = os.path.abspath(os.path.join(cache_dir, f'{name}.npy'))
+        np.save(paths[name], np.ascontiguousarray(array, dtype=float))
+    with open(meta_path, 'w', encoding='utf-8') as f:
+        json.dump({'source': source, 'arrays': paths}, f, ensure_ascii=False)
+    return paths
+
+
+_loaded_arrays = {}
+
+
+def load_arrays(paths):
+    """以内存映射方式打开缓存数组，每个进程只打开一次"""
+    return {name: _loaded_arrays.setdefault(path, np.load(path, mmap_mode='r')) for name, path in paths.items()}
+
+
+def xgb_eval_mse(model):
+    """XGBoost 在 eval_set 上评估历史中的最好 RMSE 的平方（需 eval_metric='rmse'）"""
+    history = model.evals_result()
+    return min(next(iter(history.values()))['rmse']) ** 2
+
+
+def search_key(paths, param_space, cv):
+    """数据缓存（各数组文件的大小和修改时间）、参数空间和折数的签名，用于区分不同搜索的试验记录"""
+    arrays = {}
+    for name, path in sorted(paths.items()):
+        stat = os.stat(path)
+        arrays[name] = [os.path.abspath(path), stat.st_size, stat.st_mtime]
+    space = {name: repr(param_space[name]) for name in sorted(param_space)}
+    text = json.dumps({'arrays': arrays, 'space': space, 'cv': cv}, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+
+class TrialStore:
+    """JSONL 格式的试验记录，每行一个已完成（或被剪枝）的试验；给定 key 时只读取并写入该搜索的记录"""
+
+    def __init__(self, path, key=None):
+        self.path = path
+        self.key = key
+        self.trials = []
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                self.trials = [json.loads(line) for line in f if line.strip()]
+            if key is not None:
+                self.trials = [t for t in self.trials if t.get('key') == key]
+
+    def append(self, trial):
+        if self.key is not None:
+            trial = dict(trial, key=self.key)
+        self.trials.append(trial)
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(trial, ensure_ascii=False) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+
+    def best(self):
+        complete = [t for t in self.trials if t['status'] == 'complete']
+        return min(complete, key=lambda t: t['score']) if complete else None
+
+
+def _to_python(value):
+    return value.item() if isinstance(value, np.generic) else value
+
+
+def _told_score(trial, worst_complete):
+    """告诉优化器的目标值：被剪枝的试验只跑了一折，取其得分与已完成试验最差得分中的较大者"""
+    if trial['status'] == 'complete' or worst_complete is None:
+        return trial['score']
+    return max(trial['score'], worst_complete)
+
+
+def _evaluate(make_estimator, params, paths, cv, fit_params, prune_metric, prune_threshold):
+    """在工作进程中做一次 K 折交叉验证，返回试验记录"""
+    start = time.time()
+    arrays = load_arrays(paths)
+    X, y = arrays['X'], arrays['y']
+    extra_fit_params = fit_params(arrays) if fit_params else {}
+
+    fold_scores = []
+    first_metric = None
+    status = 'complete'
+    for fold, (train_index, test_index) in enumerate(KFold(n_splits=cv).split(X)):
+        model = make_estimator(**params)
+        model.fit(X[train_index], y[train_index], **extra_fit_params)
+        fold_scores.append(float(mean_squared_error(y[test_index], model.predict(X[test_index]))))
+        if fold == 0:
+            first_metric = float(prune_metric(model)) if prune_metric else fold_scores[0]
+            if prune_threshold is not None and first_metric > prune_threshold and cv > 1:
+                status = 'pruned'
+                break
+
+    return {'params': params, 'score': float(np.mean(fold_scores)), 'fold_scores': fold_scores,
+            'first_metric': first_metric, 'status': status, 'seconds': time.time() - start}
+
+
+def run_search(make_estimator, param_space, paths, store_path, n_iter=100, cv=3, n_jobs=-1,
+               fit_params=None, prune_metric=None, prune_ratio=1.2, no_improvement_stop=None,
+               random_state=42, verbose=True):
+    """
+    贝叶斯优化最小化交叉验证均方误差
+
+    参数:
+        make_estimator: 以超参数为关键字参数构造模型的可调用对象
+        param_space: 与 BayesSearchCV 相同格式的参数空间
+        paths: cache_arrays 返回的数组路径，必须包含 'X' 和 'y'
+        store_path: 试验记录文件，已存在时从中恢复数据、参数空间和 cv 都相同的试验
+        n_iter: 试验总数（包括恢复的试验）
+        fit_params: 以数组字典为参数、返回 fit 关键字参数的函数（如 eval_set）
+        prune_metric: 由第一折模型计算剪枝指标的函数，默认用第一折的均方误差
+        prune_ratio: 第一折指标超过已完成试验最好值的多少倍时剪枝，None 表示不剪枝
+        no_improvement_stop: 连续多少个试验没有改进时停止搜索，None 表示不提前停止
+
+    返回: (最佳参数, TrialStore)
+    """
+    names = sorted(param_space)
+    optimizer = Optimizer(dimensions_aslist(param_space), random_state=random_state)
+    store = TrialStore(store_path, search_key(paths, param_space, cv))
+    resumed = [t for t in store.trials if sorted(t['params']) == names]
+    complete_scores = [t['score'] for t in resumed if t['status'] == 'complete']
+    worst_complete = max(complete_scores, default=None)
+    if resumed:
+        optimizer.tell([[t['params'][name] for name in names] for t in resumed],
+                       [_told_score(t, worst_complete) for t in resumed])
+        if verbose:
+            print(f"已从 {store_path} 恢复 {len(resumed)} 个试验")
+
+    best_score = min(complete_scores, default=None)
+    no_improvement = 0
+    remaining = n_iter - len(resumed)
+    workers = effective_n_jobs(n_jobs)
+    with Parallel(n_jobs=n_jobs) as parallel:
+        while remaining > 0:
+            points = optimizer.ask(n_points=min(workers, remaining))
+            best_trial = store.best()
+            prune_threshold = None
+            if prune_ratio is not None and best_trial is not None:
+                prune_threshold = prune_ratio * best_trial['first_metric']
+            params_list = [{name: _to_python(value) for name, value in zip(names, point)} for point in points]
+            results = parallel(delayed(_evaluate)(make_estimator, params, paths, cv, fit_params, prune_metric, prune_threshold)
+                               for params in params_list)
+
+            stop = False
+            for point, trial in zip(points, results):
+                store.append(trial)
+                if trial['status'] == 'complete':
+                    worst_complete = max(worst_complete, trial['score']) if worst_complete is not None else trial['score']
+                optimizer.tell(point, _told_score(trial, worst_complete))
+                remaining -= 1
+                if verbose:
+                    print(f"试验 {len(store.trials)}/{n_iter}: MSE={trial['score']:.6f} ({trial['status']}, {trial['seconds']:.1f}s) {trial['params']}")
+                if trial['status'] != 'complete':
+                    continue
+                if best_score is None or trial['score'] < best_score:
+                    best_score = trial['score']
+                    no_improvement = 0
+                else:
+                    no_improvement += 1
+                if no_improvement_stop and no_improvement >= no_improvement_stop:
+                    stop = True
+            if stop:
+                if verbose:
+                    print("No improvement for {} iterations, stopping search.".format(no_improvement_stop))
+                break
+
+    best_trial = store.best()
+    return (best_trial['params'] if best_trial else None), store
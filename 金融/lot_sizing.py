@@ -0,0 +1,161 @@
+"""
+A股整手（每手100股）下单数量优化
+
+给定目标权重、收盘价和资金预算，求每只股票买入的整数手数，使实际持仓权重尽量贴近目标权重：
+  - 持仓权重按 “持仓市值 / 预算” 计算，闲置现金视为偏离（目标权重之和为1）
+  - 默认目标函数为权重偏差平方和；给定协方差矩阵时为跟踪误差方差 (x - w)'Σ(x - w)
+  - 总花费不超过预算
+
+算法（贪心 + 修复）：
+  1. 先按目标金额向下取整得到初始手数（一定不超预算）
+  2. 贪心加仓：每次在买得起的股票中加一手目标函数下降最多的，直到无法改进
+  3. 交换修复：反复尝试“某只减一手、另一只加一手”的最优组合，直到无法改进
+  4. 连锁修复：对每只股票强制加一手，再卖出代价最小的若干手使资金够用，然后重新贪心加仓，
+     比原方案好就接受（一换一腾不出足够资金买一手高价股时靠这一步）
+
+每一步都是对全部股票的向量化计算，几百只股票也能在1秒内完成。
+
+用法:
+    from lot_sizing import optimize_lots
+    result = optimize_lots(weights, closing_prices, budget=550000)
+    result['hands']
+"""
+import numpy as np
+
+
+def optimize_lots(target_weights, prices, budget, shares_per_hand=100, cov_matrix=None, max_rounds=50):
+    """
+    参数:
+        target_weights: 目标权重 (n,)，一般和为1
+        prices: 每股价格 (n,)
+        budget: 资金预算
+        shares_per_hand: 每手股数
+        cov_matrix: 收益率协方差矩阵 (n, n)，为 None 时按权重偏差平方和优化
+        max_rounds: 修复阶段的最大轮数
+
+    返回: dict
+        'hands': 每只股票的手数（整数数组）
+        'invested': 总花费
+        'cash_left': 剩余现金
+        'weights': 实际持仓权重（相对预算）
+        'tracking_error': 目标函数值的平方根
+    """
+    w = np.asarray(target_weights, dtype=float)
+    prices = np.asarray(prices, dtype=float)
+    lot_cost = prices * shares_per_hand
+    valid = lot_cost > 0
+    step = np.where(valid, lot_cost / budget, 0.0)  # 每加一手带来的权重变化
+    sigma = None if cov_matrix is None else np.asarray(cov_matrix, dtype=float)
+
+    # 1. 向下取整的初始解
+    hands = np.zeros(len(w), dtype=np.int64)
+    hands[valid] = np.floor(w[valid] * budget / lot_cost[valid]).astype(np.int64)
+    state = _LotState(hands, w, lot_cost, step, budget, sigma)
+
+    # 2. 贪心加仓
+    state.fill(valid)
+
+    # 3. 修复：先做一换一交换，再做“强制加一手、卖出若干手腾出资金”的连锁调整
+    for _ in range(max_rounds):
+        improved = False
+        while state.best_swap(valid):
+            improved = True
+        for i in np.flatnonzero(valid):
+            trial = state.copy()
+            trial.apply(i, +1)
+            while trial.cash < -1e-9:
+                delta = trial.remove_delta()
+                delta[i] = np.inf
+                j = np.argmin(delta)
+                if not np.isfinite(delta[j]):
+                    break
+                trial.apply(j, -1)
+            if trial.cash < -1e-9:
+                continue
+            trial.fill(valid)
+            if trial.objective() < state.objective() - 1e-15:
+                state = trial
+                improved = True
+        if not improved:
+            break
+
+    invested = float(state.hands @ lot_cost)
+    return {
+        'hands': state.hands,
+        'invested': invested,
+        'cash_left': budget - invested,
+        'weights': state.hands * lot_cost / budget,
+        'tracking_error': float(np.sqrt(max(state.objective(), 0.0))),
+    }
+
+
+class _LotState:
+    """当前手数及其权重偏差 d、Σd 和剩余现金，加减一手时增量更新"""
+
+    def __init__(self, hands, w, lot_cost, step, budget, sigma):
+        self.hands = hands
+        self.lot_cost = lot_cost
+        self.step = step
+        self.sigma = sigma
+        self.sigma_diag = np.ones(len(w)) if sigma is None else np.diag(sigma).copy()
+        self.cash = budget - hands @ lot_cost
+        self.d = hands * step - w  # 权重偏差
+        self.g = self.d.copy() if sigma is None else sigma @ self.d
+
+    def copy(self):
+        other = object.__new__(_LotState)
+        other.__dict__.update(self.__dict__)
+        other.hands = self.hands.copy()
+        other.d = self.d.copy()
+        other.g = self.g.copy()
+        return other
+
+    def objective(self):
+        return self.d @ self.g
+
+    def add_delta(self):
+        """每只股票加一手的目标函数变化量（负数为改进）"""
+        return 2 * self.step * self.g + self.step ** 2 * self.sigma_diag
+
+    def remove_delta(self):
+        """每只股票减一手的目标函数变化量，没有持仓的为 inf"""
+        delta = -2 * self.step * self.g + self.step ** 2 * self.sigma_diag
+        return np.where(self.hands > 0, delta, np.inf)
+
+    def apply(self, i, sign):
+        self.hands[i] += sign
+        self.cash -= sign * self.lot_cost[i]
+        self.d[i] += sign * self.step[i]
+        if self.sigma is None:
+            self.g[i] += sign * self.step[i]
+        else:
+            self.g += sign * self.step[i] * self.sigma[:, i]
+
+    def fill(self, valid):
+        """在买得起的股票中反复加一手改进最大的，直到无法改进"""
+        while True:
+            affordable = valid & (self.lot_cost <= self.cash + 1e-9)
+            if not affordable.any():
+                return
+            delta = np.where(affordable, self.add_delta(), np.inf)
+            i = np.argmin(delta)
+            if delta[i] >= 0:
+                return
+            self.apply(i, +1)
+
+    def best_swap(self, valid):
+        """执行改进最大的一换一（卖出 j 一手、买入 i 一手），没有可改进的交换时返回 False"""
+        pair = self.remove_delta()[:, None] + self.add_delta()[None, :]
+        if self.sigma is not None:
+            pair -= 2 * np.outer(self.step, self.step) * self.sigma
+        # 只允许交换后仍不超预算的组合
+        pair[~(self.lot_cost[None, :] - self.lot_cost[:, None] <= self.cash + 1e-9)] = np.inf
+        pair[:, ~valid] = np.inf
+        np.fill_diagonal(pair, np.inf)
+        j, i = np.unravel_index(np.argmin(pair), pair.shape)
+        if not pair[j, i] < -1e-15:
+            return False
+        self.apply(j, -1)
+        self.apply(i, +1)
+        self.fill(valid)
+        return True
@@ -0,0 +1,222 @@
+"""
+历史走势片段索引：给定最近 N 天的走势，找出历史上最接近的 k 段片段及其之后的区间收益率
+
+  - 用滑动窗口视图一次性生成全部 (股票, 起始日) 片段，不再逐行逐段拼 Python 列表
+  - 片段矩阵以 float32 的 .npy 保存在磁盘上，之后以内存映射方式打开，源CSV不变时无需重建；
+    也可以由 feature_store 建立，每个新交易日只追加新增的片段
+  - 查询按批进行：对索引分块做一次 float64 矩阵乘法得到距离，用 argpartition 只保留每个查询的少量候选，
+    最后精确重算候选距离并排序；展开式的舍入误差上界不足以区分第 k 个和落选的候选时（走势很平、
+    价格水平很高的片段），该查询改为对全部片段精确计算，结果与对已保存片段逐个算距离再 argsort 完全一致
+
+用法:
+    from pattern_index import PatternIndex
+    index = PatternIndex.from_csv('train_cleaned_stock_data.csv', window_size=30, horizon=7)
+    distances, indices = index.query(latest_windows, k=10)
+    forward_returns = index.returns[indices]
+"""
+import json
+import os
+import numpy as np
+import pandas as pd
+from feature_store import write_at
+
+
+def build_windows(history, window_size, horizon):
+    """
+    生成全部历史片段及其后 horizon 天的区间收益率，顺序与逐行、逐起始日遍历相同
+
+    参数:
+        history: 历史数据 (股票数, 天数)
+        window_size: 片段长度
+        horizon: 片段之后用于计算收益率的天数
+
+    返回: (windows (片段数, window_size) float32, returns (片段数,) float64)
+        收益率为 (第 horizon 天 - 第 1 天) / 第 1 天，第 1 天为 0 时为 NaN
+    """
+    history = np.asarray(history, dtype=float)
+    num_starts = history.shape[1] - window_size - horizon + 1
+    if num_starts <= 0:
+        return np.empty((0, window_size), dtype=np.float32), np.empty(0)
+    views = np.lib.stride_tricks.sliding_window_view(history, window_size, axis=1)[:, :num_starts]
+    windows = views.reshape(-1, window_size).astype(np.float32)
+
+    first = history[:, window_size:window_size + num_starts]
+    last = history[:, window_size + horizon - 1:window_size + horizon - 1 + num_starts]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        returns = np.where(first != 0, (last - first) / first, np.nan).reshape(-1)
+    return windows, returns
+
+
+class PatternIndex:
+    """历史片段矩阵及其区间收益率，支持批量 top-k 最近邻查询"""
+
+    def __init__(self, windows, returns):
+        self.windows = windows
+        self.returns = returns
+        # 分块计算各片段的平方范数，避免把内存映射的整个矩阵读入内存；含缺失值的片段不参与匹配
+        self.norms = np.empty(len(windows))
+        for start in range(0, len(windows), 1 << 20):
+            block = np.asarray(windows[start:start + (1 << 20)], dtype=float)
+            norms = np.einsum('ij,ij->i', block, block)
+            self.norms[start:start + len(block)] = np.where(np.isfinite(norms), norms, np.inf)
+        finite = self.norms[np.isfinite(self.norms)]
+        self.max_norm = float(finite.max()) if len(finite) else 0.0
+
+    def __len__(self):
+        return len(self.windows)
+
+    @classmethod
+    def from_csv(cls, csv_path, window_size, horizon, cache_dir=None):
+        """读取历史CSV建立索引；cache_dir 下已有与CSV大小、修改时间和参数都一致的缓存时直接内存映射"""
+        if cache_dir is None:
+            cache_dir = f"{os.path.splitext(csv_path)[0]}_pattern_w{window_size}_h{horizon}"
+        stat = os.stat(csv_path)
+        meta = {'source_size': stat.st_size, 'source_mtime': stat.st_mtime,
+                'window_size': window_size, 'horizon': horizon}
+        meta_path = os.path.join(cache_dir, 'meta.json')
+        if os.path.exists(meta_path):
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                if json.load(f) == meta:
+                    return cls.load(cache_dir)
+
+        history = pd.read_csv(csv_path, header=None).values
+        windows, returns = build_windows(history, window_size, horizon)
+        index = cls(windows, returns)
+        index.save(cache_dir)
+        with open(meta_path, 'w', encoding='utf-8') as f:
+            json.dump(meta, f)
+        return cls.load(cache_dir)
+
+    @classmethod
+    def from_store(cls, store, window_size, horizon):
+        """
+        由 feature_store.FeatureStore 建立索引，使用按交易日归一化后的数据（与 train_cleaned_stock_data.csv 相同）
+
+        片段按 (起始日, 股票) 顺序保存在特征库目录下，每个新交易日只追加新增的片段和区间收益率；
+        特征库整体重建（版本号变化）时索引也重建
+        """
+        cache_dir = os.path.join(store.root, f"pattern_w{window_size}_h{horizon}")
+        meta_path = os.path.join(cache_dir, 'meta.json')
+        windows_path = os.path.join(cache_dir, 'windows.f32')
+        returns_path = os.path.join(cache_dir, 'returns.f64')
+        meta = {'generation': store.generation, 'num_starts': 0}
+        if os.path.exists(meta_path):
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                cached = json.load(f)
+            if cached['generation'] == store.generation:
+                meta = cached
+
+        total_starts = max(store.num_days - window_size - horizon + 1, 0)
+        if meta['num_starts'] < total_starts:
+            first = meta['num_starts']
+            block = store.scaled(first, total_starts + window_size + horizon - 1)
+            windows, returns = build_windows(block.T, window_size, horizon)
+            # build_windows 按 (股票, 起始日) 排列，转成 (起始日, 股票) 以便逐日追加
+            num_new = total_starts - first
+            windows = windows.reshape(store.num_stocks, num_new, window_size).transpose(1, 0, 2)
+            returns = returns.reshape(store.num_stocks, num_new).T
+            os.makedirs(cache_dir, exist_ok=True)
+            # 截断到元数据记录的片段数后追加，数据写完再原子替换元数据
+            write_at(windows_path, windows.astype(np.float32), first * store.num_stocks * window_size * 4)
+            write_at(returns_path, returns.astype(np.float64), first * store.num_stocks * 8)
+            meta['num_starts'] = total_starts
+            temp_path = meta_path + '.tmp'
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump(meta, f)
+            os.replace(temp_path, meta_path)
+
+        num_windows = total_starts * store.num_stocks
+        if not num_windows:
+            return cls(np.empty((0, window_size), dtype=np.float32), np.empty(0))
+        windows = np.memmap(windows_path, dtype=np.float32, mode='r', shape=(num_windows, window_size))
+        returns = np.fromfile(returns_path, dtype=np.float64, count=num_windows)
+        return cls(windows, returns)
+
+    def save(self, cache_dir):
+        os.makedirs(cache_dir, exist_ok=True)
+        np.save(os.path.join(cache_dir, 'windows.npy'), np.asarray(self.windows, dtype=np.float32))
+        np.save(os.path.join(cache_dir, 'returns.npy'), np.asarray(self.returns, dtype=float))
+
+    @classmethod
+    def load(cls, cache_dir):
+        windows = np.load(os.path.join(cache_dir, 'windows.npy'), mmap_mode='r')
+        returns = np.load(os.path.join(cache_dir, 'returns.npy'))
+        return cls(windows, returns)
+
+    def query(self, queries, k=10, query_batch=256, block_size=65536):
+        """
+        批量查询每个走势最接近的 k 段历史片段
+
+        参数:
+            queries: 查询走势 (查询数, window_size)，单条走势也可直接传入一维数组
+            k: 每个查询返回的片段数
+            query_batch, block_size: 每次距离矩阵计算的查询数和片段数，决定峰值内存
+
+        返回: (distances (查询数, k), indices (查询数, k))，按距离升序，距离相同时按片段序号
+        """
+        queries = np.atleast_2d(np.asarray(queries, dtype=float))
+        k = min(k, len(self))
+        # 先用展开式 |q|^2 - 2 q·w + |w|^2 粗算，多留一些候选，再用逐元素差精确重排
+        num_candidates = min(len(self), max(2 * k, k + 20))
+        distances = np.empty((len(queries), k))
+        indices = np.empty((len(queries), k), dtype=np.int64)
+        if k == 0:
+            return distances, indices
+
+        for q_start in range(0, len(queries), query_batch):
+            q = queries[q_start:q_start + query_batch]
+            q_norms = np.einsum('ij,ij->i', q, q)[:, None]
+            best_dist = np.full((len(q), 0), np.inf)
+            best_idx = np.empty((len(q), 0), dtype=np.int64)
+
+            for b_start in range(0, len(self), block_size):
+                block = np.asarray(self.windows[b_start:b_start + block_size], dtype=float)
+                block_dist = q_norms - 2 * (q @ block.T) + self.norms[None, b_start:b_start + len(block)]
+                block_dist[np.isnan(block_dist)] = np.inf
+                keep = min(num_candidates, block_dist.shape[1])
+                part = np.argpartition(block_dist, keep - 1, axis=1)[:, :keep]
+                merged_dist = np.concatenate([best_dist, np.take_along_axis(block_dist, part, axis=1)], axis=1)
+                merged_idx = np.concatenate([best_idx, part + b_start], axis=1)
+                if merged_dist.shape[1] > num_candidates:
+                    sel = np.argpartition(merged_dist, num_candidates - 1, axis=1)[:, :num_candidates]
+                    merged_dist = np.take_along_axis(merged_dist, sel, axis=1)
+                    merged_idx = np.take_along_axis(merged_idx, sel, axis=1)
+                best_dist, best_idx = merged_dist, merged_idx
+
+            # 候选距离精确重算，按 (距离, 片段序号) 排序
+            candidates = np.asarray(self.windows[best_idx.ravel()], dtype=float).reshape(len(q), -1, q.shape[1])
+            exact = np.sqrt(np.sum((candidates - q[:, None, :]) ** 2, axis=2))
+            exact[~np.isfinite(exact)] = np.inf
+            rank = np.lexsort((best_idx, exact))[:, :k]
+            batch_distances = np.take_along_axis(exact, rank, axis=1)
+            batch_indices = np.take_along_axis(best_idx, rank, axis=1)
+
+            # 落选片段的真实距离不小于 (保留的最大粗算距离 - 误差上界)；它不能保证大于第 k 个精确距离时，
+            # 该查询改为精确计算全部片段。点积误差上界 n*eps*|q||w| <= n*eps*(|q|^2 + |w|^2)/2，展开式共三项取宽
+            if num_candidates < len(self):
+                bound = (q.shape[1] + 4) * np.finfo(float).eps * (q_norms[:, 0] + self.max_norm) * 2
+                cutoff = best_dist.max(axis=1)
+                kth = batch_distances[:, -1] ** 2
+                unsafe = np.isfinite(kth) & (cutoff - bound <= kth * (1 + 1e-12))
+                for row in np.flatnonzero(unsafe):
+                    batch_distances[row], batch_indices[row] = self._exact_query(q[row], k, block_size)
+
+            distances[q_start:q_start + len(q)] = batch_distances
+            indices[q_start:q_start + len(q)] = batch_indices
+
+        return distances, indices
+
+
+    def _exact_query(self, query, k, block_size=65536):
+        """对全部片段逐元素计算距离的单条查询，返回 (distances (k,), indices (k,))"""
+        best_dist = np.empty(0)
+        best_idx = np.empty(0, dtype=np.int64)
+        for b_start in range(0, len(self), block_size):
+            block = np.asarray(self.windows[b_start:b_start + block_size], dtype=float)
+            block_dist = np.sqrt(np.sum((block - query) ** 2, axis=1))
+            block_dist[~np.isfinite(block_dist)] = np.inf
+            merged_dist = np.concatenate([best_dist, block_dist])
+            merged_idx = np.concatenate([best_idx, np.arange(b_start, b_start + len(block))])
+            order = np.lexsort((merged_idx, merged_dist))[:k]
+            best_dist, best_idx = merged_dist[order], merged_idx[order]
+        return best_dist, best_idx
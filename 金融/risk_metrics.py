@@ -0,0 +1,221 @@
+"""
+向量化的风险指标：回撤、追踪误差、beta、窗口标准差
+
+  - 所有函数沿时间轴 (axis=0) 计算，输入 (期数,) 或 (期数, 序列数)，上千个组合一次算完
+  - rolling_* 为滚动窗口指标，输出与输入等长，前 window-1 期为 NaN（与 pandas rolling 相同）；
+    滚动和用累积和相减得到，不逐窗口循环
+  - StreamingRiskMetrics 保存上一批末尾的窗口和累计状态，每期追加新数据时只计算新增的各期，
+    结果与对整段数据调用 risk_report 相同
+  - 输入不应含缺失值
+
+用法:
+    from risk_metrics import max_drawdown, beta, risk_report, StreamingRiskMetrics
+    betas = beta(asset_returns, market_returns)          # (资产数,)
+    report = risk_report(returns, benchmark, window=52)    # 每项 (期数, 组合数)
+    stream = StreamingRiskMetrics(window=52)
+    latest = stream.update(new_returns, new_benchmark)
+"""
+import numpy as np
+
+
+def _align(returns, benchmark):
+    """benchmark 为一维而 returns 为二维时，按列广播"""
+    returns = np.asarray(returns, dtype=float)
+    benchmark = np.asarray(benchmark, dtype=float)
+    if returns.ndim == 2 and benchmark.ndim == 1:
+        benchmark = benchmark[:, None]
+    return returns, benchmark
+
+
+def _rolling_sum(x, window):
+    """沿 axis=0 的滚动和，前 window-1 期为 NaN"""
+    cumsum = np.cumsum(x, axis=0)
+    result = np.full(x.shape, np.nan)
+    if len(x) >= window:
+        result[window - 1:] = cumsum[window - 1:]
+        result[window:] -= cumsum[:-window]
+    return result
+
+
+def drawdown(prices):
+    """各期相对此前最高点的回撤 (peak - price) / peak"""
+    prices = np.asarray(prices, dtype=float)
+    peak = np.maximum.accumulate(prices, axis=0)
+    return (peak - prices) / peak
+
+
+def max_drawdown(prices):
+    """截至各期的最大回撤（扩展窗口），最后一期即整段序列的最大回撤"""
+    return np.maximum.accumulate(drawdown(prices), axis=0)
+
+
+def rolling_max_drawdown(prices, window, max_elements=1 << 24):
+    """
+    每期之前 window 期（含当期）内的最大回撤
+
+    参数:
+        max_elements: 每块 (期数, 序列数, window) 中间数组的元素上限，决定峰值内存
+    """
+    prices = np.asarray(prices, dtype=float)
+    result = np.full(prices.shape, np.nan)
+    if len(prices) < window:
+        return result
+    views = np.lib.stride_tricks.sliding_window_view(prices, window, axis=0)  # (窗口数, ..., window)
+    per_row = max(1, views[0].size)
+    step = max(1, max_elements // per_row)
+    for start in range(0, len(views), step):
+        block = views[start:start + step]
+        peak = np.maximum.accumulate(block, axis=-1)
+        result[window - 1 + start:window - 1 + start + len(block)] = ((peak - block) / peak).max(axis=-1)
+    return result
+
+
+def tracking_error(returns, benchmark):
+    """追踪误差：超额收益的均方根 sqrt(mean((r - b)^2))"""
+    returns, benchmark = _align(returns, benchmark)
+    return np.sqrt(np.mean((returns - benchmark) ** 2, axis=0))
+
+
+def rolling_tracking_error(returns, benchmark, window):
+    """滚动窗口的追踪误差"""
+    returns, benchmark = _align(returns, benchmark)
+    return np.sqrt(_rolling_sum((returns - benchmark) ** 2, window) / window)
+
+
+def beta(returns, market, ddof=1):
+    """各序列对市场收益率的 beta：cov(r, m) / var(m)，协方差和方差使用相同的 ddof"""
+    returns, market = _align(returns, market)
+    returns_centered = returns - returns.mean(axis=0)
+    market_centered = market - market.mean(axis=0)
+    covariance = (returns_centered * market_centered).sum(axis=0) / (len(returns) - ddof)
+    return covariance / ((market_centered ** 2).sum(axis=0) / (len(market) - ddof))
+
+
+def rolling_beta(returns, market, window):
+    """滚动窗口的 beta（数据先整体中心化，减小累积和相减的舍入误差）"""
+    returns, market = _align(returns, market)
+    x = market - market.mean(axis=0)
+    y = returns - returns.mean(axis=0)
+    sum_x = _rolling_sum(x, window)
+    sum_y = _rolling_sum(y, window)
+    covariance = _rolling_sum(x * y, window) - sum_x * sum_y / window
+    variance = _rolling_sum(x * x, window) - sum_x * sum_x / window
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return covariance / variance
+
+
+def rolling_std(x, window, ddof=1):
+    """滚动窗口标准差"""
+    x = np.asarray(x, dtype=float)
+    x = x - x.mean(axis=0)
+    sums = _rolling_sum(x, window)
+    variance = (_rolling_sum(x * x, window) - sums * sums / window) / (window - ddof)
+    return np.sqrt(np.maximum(variance, 0.0))
+
+
+def block_mean_std(x, block_size, ddof=0):
+    """
+    长期平滑标准差：按 block_size 期不重叠分组（最后一组可以不满），各组均值的标准差
+
+    返回: 标量或 (序列数,)
+    """
+    x = np.asarray(x, dtype=float)
+    starts = np.arange(0, len(x), block_size)
+    valid = ~np.isnan(x)
+    # 与 pandas 的 mean 一样忽略缺失值
+    sums = np.add.reduceat(np.where(valid, x, 0.0), starts, axis=0)
+    counts = np.add.reduceat(valid, starts, axis=0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        means = sums / counts
+    return np.std(means, axis=0, ddof=ddof)
+
+
+def risk_report(returns, benchmark, window):
+    """
+    一组收益率序列的全部风险指标
+
+    参数:
+        returns: 组合收益率 (期数, 组合数)
+        benchmark: 基准（市场）收益率 (期数,) 或 (期数, 组合数)，用于追踪误差和 beta
+        window: 滚动窗口长度
+
+    返回: {指标名: (期数, 组合数)}；净值由收益率连乘得到，回撤基于净值
+    """
+    returns, benchmark = _align(returns, benchmark)
+    wealth = np.cumprod(1 + returns, axis=0)
+    return {
+        'wealth': wealth,
+        'drawdown': drawdown(wealth),
+        'max_drawdown': max_drawdown(wealth),
+        'rolling_max_drawdown': rolling_max_drawdown(wealth, window),
+        'tracking_error': rolling_tracking_error(returns, benchmark, window),
+        'beta': rolling_beta(returns, benchmark, window),
+        'std': rolling_std(returns, window),
+    }
+
+
+class StreamingRiskMetrics:
+    """
+    按期追加数据的风险指标
+
+    只保存最近 window-1 期的数据以及净值、最高点、最大回撤等累计状态；每次 update 只计算新增各期的指标，
+    与对全部历史调用 risk_report 的结果相同（滚动 beta 和标准差在浮点舍入范围内相同）
+    """
+
+    def __init__(self, window):
+        self.window = window
+        self.returns = None
+        self.benchmark = None
+        self.wealth = None
+        self.last_wealth = None
+        self.peak = None
+        self.max_drawdown = None
+
+    def update(self, returns, benchmark):
+        """
+        追加新的若干期
+
+        参数:
+            returns: (新期数, 组合数)
+            benchmark: (新期数,) 或 (新期数, 组合数)
+
+        返回: 与 risk_report 相同的字典，只包含新增的各期
+        """
+        returns, benchmark = _align(returns, benchmark)
+        new = len(returns)
+        if self.returns is None:
+            self.returns = returns[:0]
+            self.benchmark = benchmark[:0]
+            self.wealth = returns[:0]
+            self.last_wealth = np.ones(returns.shape[1:])
+            self.peak = np.full(returns.shape[1:], -np.inf)
+            self.max_drawdown = np.zeros(returns.shape[1:])
+
+        wealth = np.cumprod(np.concatenate([self.last_wealth[None], 1 + returns]), axis=0)[1:]
+        peak = np.maximum.accumulate(np.concatenate([self.peak[None], wealth]), axis=0)[1:]
+        current_drawdown = (peak - wealth) / peak
+        running_max = np.maximum.accumulate(np.concatenate([self.max_drawdown[None], current_drawdown]), axis=0)[1:]
+
+        # 滚动指标：接上保存的最近 window-1 期一起计算，只取新增部分（历史不足时前几期与整段计算一样为 NaN）
+        history_returns = np.concatenate([self.returns, returns])
+        history_benchmark = np.concatenate([self.benchmark, benchmark])
+        history_wealth = np.concatenate([self.wealth, wealth])
+        report = {
+            'wealth': wealth,
+            'drawdown': current_drawdown,
+            'max_drawdown': running_max,
+            'rolling_max_drawdown': rolling_max_drawdown(history_wealth, self.window)[-new:],
+            'tracking_error': rolling_tracking_error(history_returns, history_benchmark, self.window)[-new:],
+            'beta': rolling_beta(history_returns, history_benchmark, self.window)[-new:],
+            'std': rolling_std(history_returns, self.window)[-new:],
+        }
+
+        # 历史不足 window-1 期时全部保留
+        keep = self.window - 1
+        self.returns = history_returns[max(0, len(history_returns) - keep):] if keep else history_returns[:0]
+        self.benchmark = history_benchmark[max(0, len(history_benchmark) - keep):] if keep else history_benchmark[:0]
+        self.wealth = history_wealth[max(0, len(history_wealth) - keep):] if keep else history_wealth[:0]
+        self.last_wealth = wealth[-1]
+        self.peak = peak[-1]
+        self.max_drawdown = running_max[-1]
+        return report
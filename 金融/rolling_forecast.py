@@ -0,0 +1,53 @@
+"""
+LSTM 多步滚动预测（全部股票批量）
+
+所有股票的窗口一起向前滚动：每个预测日只对 (股票数, time_step, 1) 的整批数据调用一次 predict_on_batch，
+预测值写回各自窗口末尾，再进行下一日。逐只股票、逐日调用 model.predict 的次数从
+股票数 × 天数 × 重复次数 降到 天数。
+
+model.predict / predict_on_batch 以推理模式运行（Dropout 不生效），重复预测的结果完全相同，
+因此默认 deterministic=True 时只算一遍；模型含推理时仍有随机性的层时可设为 False，
+此时各次重复拼成一个更大的批次一起计算。
+
+用法:
+    from rolling_forecast import repeated_rolling_predictions
+    predictions = repeated_rolling_predictions(windows, model, feature_scaler, target_scaler, time_step=40)
+"""
+import numpy as np
+
+
+def repeated_rolling_predictions(data, model, feature_scaler, target_scaler, time_step,
+                                 days=7, repeats=3, deterministic=True, batch_size=8192):
+    """
+    参数:
+        data: 各股票的历史数据 (股票数, 天数)，天数不少于 time_step，只使用最后 time_step 天
+        model: Keras 模型，输入 (批量, time_step, 1)，输出 (批量, 1)
+        feature_scaler, target_scaler: 训练时的输入、输出归一化对象
+        days: 向前滚动预测的天数
+        repeats: 重复预测次数，结果取平均
+        deterministic: 为 True 时跳过（结果相同的）重复预测
+        batch_size: 每次调用模型的最大样本数
+
+    返回: 每只股票 days 天预测值的平均 (股票数,)
+    """
+    windows = np.asarray(data, dtype=float)[:, -time_step:]
+    if not deterministic and repeats > 1:
+        windows = np.tile(windows, (repeats, 1))
+    windows = windows.copy()
+
+    predictions = np.empty((len(windows), days))
+    for day in range(days):
+        scaled = feature_scaler.transform(windows).reshape(-1, time_step, 1)
+        predicted = np.concatenate([np.asarray(model.predict_on_batch(scaled[start:start + batch_size])).reshape(-1, 1)
+                                    for start in range(0, len(scaled), batch_size)])
+        predicted = target_scaler.inverse_transform(predicted).ravel()
+        predictions[:, day] = predicted
+
+        # 窗口左移一天，末尾写入预测值
+        windows[:, :-1] = windows[:, 1:]
+        windows[:, -1] = predicted
+
+    avg_predictions = predictions.mean(axis=1)
+    if not deterministic and repeats > 1:
+        avg_predictions = avg_predictions.reshape(repeats, -1).mean(axis=0)
+    return avg_predictions
@@ -1,9 +1,10 @@
 import pandas as pd
 import numpy as np
 import statsmodels.api as sm
+from excel_cache import read_excel
 
 # 读取数据文件
-data = pd.read_excel('FINM3008 - Assignment Analysis S1 2024.xlsx', sheet_name='Fundamental Factor Data')
+data = read_excel('FINM3008 - Assignment Analysis S1 2024.xlsx', sheet_name='Fundamental Factor Data')
 
 # 提取因子数据和资产收益率数据
 factors = data.iloc[:, 1:10]  # B-J列的因子数据
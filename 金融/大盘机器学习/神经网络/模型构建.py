@@ -7,9 +7,15 @@ from tensorflow.keras.layers import Dense, LSTM
 from tensorflow.keras.optimizers import Adam
 from tensorflow.keras.losses import MeanSquaredError
 from tensorflow.keras.callbacks import EarlyStopping
+import os
+import sys
+
+# 共用的 Excel 缓存读取位于目录 金融/
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '../..')))
+from excel_cache import read_excel
 
 # 读取Excel文件
-df = pd.read_excel('market_price.xlsx')
+df = read_excel('market_price.xlsx')
 
 # 从第3行和第4列开始读取加权平均指数
 weighted_average_index = df.iloc[2:, 3]
@@ -4,9 +4,15 @@ from sklearn.model_selection import train_test_split
 from sklearn.ensemble import RandomForestRegressor
 from sklearn.metrics import mean_squared_error
 from joblib import dump
+import os
+import sys
+
+# 共用的 Excel 缓存读取位于目录 金融/
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '../..')))
+from excel_cache import read_excel
 
 # 读取Excel文件
-df = pd.read_excel('market_price.xlsx')
+df = read_excel('market_price.xlsx')
 
 # 从第3行和第4列开始读取加权平均指数
 weighted_average_index = df.iloc[2:, 3]
@@ -1,12 +1,18 @@
 import pandas as pd
 import numpy as np
 from joblib import load
+import os
+import sys
+
+# 共用的 Excel 缓存读取位于目录 金融/
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '../..')))
+from excel_cache import read_excel
 
 # 加载训练好的模型
 model = load('market_price_model.joblib')
 
 # 读取新的Excel文件
-new_df = pd.read_excel('predict_price.xlsx')
+new_df = read_excel('predict_price.xlsx')
 
 # 从第3行和第4列开始读取加权平均指数
 new_weighted_average_index = new_df.iloc[2:, 3]
@@ -1,9 +1,17 @@
 import numpy as np
 import matplotlib.pyplot as plt
 import pandas as pd
+import os
+import sys
+
+# 共用的有效边界求解器、整手优化器和 Excel 缓存读取位于上级目录 金融/
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')))
+from efficient_frontier import tangency_portfolio, min_variance_portfolio, portfolio_performance
+from lot_sizing import optimize_lots
+from excel_cache import read_excel
 
 # Load the Excel file into a pandas DataFrame
-data = pd.read_excel("风险投资组合分析.xlsx")
+data = read_excel("风险投资组合分析.xlsx")
 
 # Extract the risk-free rate and convert it to daily rate
 annual_risk_free_rate = float(data.columns[1])
@@ -15,19 +23,15 @@ returns_data.columns = data.iloc[0, 4:]
 # Remove columns where all rows have zero values
 returns_data = returns_data.loc[:, (returns_data != 0).any(axis=0)]
 
-# Number of stocks and portfolio simulations
+# Number of stocks
 num_stocks = returns_data.shape[1]
-num_portfolios = 999999
-results = np.zeros((3, num_portfolios))
-weights_record = []
 
 def calculate_test_hands(weights, closing_prices, budget=550000, shares_per_hand=100):
     """
     Calculate the number of hands to buy for each stock given a budget.
+    Whole hands are chosen to track the target weights as closely as possible without exceeding the budget.
     """
-    total_investment = weights * budget
-    test_hands = total_investment / (closing_prices * shares_per_hand)
-    return np.floor(test_hands)  # Using floor to get whole number of hands
+    return optimize_lots(weights, closing_prices.astype(float), budget, shares_per_hand)
 
 # Calculate the average returns and standard deviation for all stocks
 avg_returns = returns_data.mean()
@@ -36,31 +40,15 @@ std_devs = returns_data.std()
 # Calculate the covariance matrix
 cov_matrix = returns_data.astype(float).cov()
 
-for i in range(num_portfolios):
-    # Randomly assign weights
-    weights = np.random.random(num_stocks)
-    weights /= np.sum(weights)
-    weights_record.append(weights)
-    
-    # Expected portfolio return
-    portfolio_return = np.dot(weights, avg_returns)
-    # Expected portfolio volatility
-    portfolio_stddev = np.sqrt(np.dot(weights.T, np.dot(cov_matrix, weights)))
-    # Portfolio Sharpe ratio
-    sharpe_ratio = (portfolio_return - daily_risk_free_rate) / portfolio_stddev
-    
-    results[0,i] = portfolio_return
-    results[1,i] = portfolio_stddev
-    results[2,i] = sharpe_ratio
-
-# Extract the portfolios with maximum Sharpe ratio and minimum Standard deviation
-return_sharpe_max = results[0,results[2].argmax()]
-risk_sharpe_max = results[1,results[2].argmax()]
-weights_sharpe_max = weights_record[results[2].argmax()]
-
-return_std_min = results[0,results[1].argmin()]
-risk_std_min = results[1,results[1].argmin()]
-weights_std_min = weights_record[results[1].argmin()]
+# Exact portfolios with maximum Sharpe ratio and minimum Standard deviation (long-only QP)
+mean_returns = avg_returns.to_numpy(dtype=float)
+cov_values = cov_matrix.to_numpy(dtype=float)
+
+weights_sharpe_max = tangency_portfolio(mean_returns, cov_values, daily_risk_free_rate)
+return_sharpe_max, risk_sharpe_max, _ = portfolio_performance(weights_sharpe_max, mean_returns, cov_values, daily_risk_free_rate)
+
+weights_std_min = min_variance_portfolio(mean_returns, cov_values)
+return_std_min, risk_std_min, _ = portfolio_performance(weights_std_min, mean_returns, cov_values, daily_risk_free_rate)
 
 # Extract stock names and codes from the Excel file
 stock_names_codes = returns_data.columns.values
@@ -107,8 +95,10 @@ adjustment_multiplier_mvp = 1 / hands_mvp.min()
 adjusted_hands_mvp = hands_mvp * adjustment_multiplier_mvp
 
 # Calculate test hands for ORP and MVP
-test_hands_orp = calculate_test_hands(selected_weights_sharpe_max, selected_closing_prices_orp)
-test_hands_mvp = calculate_test_hands(selected_weights_std_min, selected_closing_prices_mvp)
+lots_orp = calculate_test_hands(selected_weights_sharpe_max, selected_closing_prices_orp)
+lots_mvp = calculate_test_hands(selected_weights_std_min, selected_closing_prices_mvp)
+test_hands_orp = lots_orp['hands']
+test_hands_mvp = lots_mvp['hands']
 
 # Append the test hand information to the TXT file
 with open("筛选投资组合手数.txt", "w") as file:
@@ -117,9 +107,11 @@ with open("筛选投资组合手数.txt", "w") as file:
         file.write(f"{name_code}: Weight={weight*100:.2f}%, Closing Price={closing_price:.2f}, Adjusted Hands={adjusted_hands:.2f}, Test Hands={test_hand}\n")
     file.write(f"ORP Expected Return: {return_sharpe_max*100:.2f}%\n")
     file.write(f"ORP Risk (Standard Deviation): {risk_sharpe_max*100:.2f}%\n")
+    file.write(f"ORP Invested: {lots_orp['invested']:.2f}, Cash Left: {lots_orp['cash_left']:.2f}, Weight Tracking Error: {lots_orp['tracking_error']*100:.2f}%\n")
 
     file.write("\nMinimum Variance Portfolio (MVP):\n")
     for name_code, weight, closing_price, adjusted_hands, test_hand in zip(selected_stock_names_codes_mvp, selected_weights_std_min, selected_closing_prices_mvp, adjusted_hands_mvp, test_hands_mvp):
         file.write(f"{name_code}: Weight={weight*100:.2f}%, Closing Price={closing_price:.2f}, Adjusted Hands={adjusted_hands:.2f}, Test Hands={test_hand}\n")
     file.write(f"MVP Expected Return: {return_std_min*100:.2f}%\n")
-    file.write(f"MVP Risk (Standard Deviation): {risk_std_min*100:.2f}%\n")
\ No newline at end of file
+    file.write(f"MVP Risk (Standard Deviation): {risk_std_min*100:.2f}%\n")
+    file.write(f"MVP Invested: {lots_mvp['invested']:.2f}, Cash Left: {lots_mvp['cash_left']:.2f}, Weight Tracking Error: {lots_mvp['tracking_error']*100:.2f}%\n")
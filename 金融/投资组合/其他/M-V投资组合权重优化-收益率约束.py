@@ -1,6 +1,11 @@
 import numpy as np
 import matplotlib.pyplot as plt
 import os
+import sys
+
+# 共用的有效边界求解器位于上级目录 金融/
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '../..')))
+from efficient_frontier import tangency_portfolio, min_variance_portfolio, efficient_frontier, portfolio_performance
 
 # Hard-coded parameters
 asset_classes = np.array(["AE", "WE,U", "WE,H", "EM", "WLP", "ALP", "ADP", "COM", "GD", "HF", "PE", "AFI", "ILB", "WFI", "AC"])
@@ -59,48 +64,19 @@ cov_matrix = np.array([
 ])
 
 risk_free_rate = 0.0075  # Quarterly risk-free rate
-num_portfolios = 5000000
+num_frontier_points = 200  # 有效边界上求解的点数
 min_required_return = (1.08 ** 0.25) - 1  # Minimum required return
 
-# Simulate random portfolios
-results = np.zeros((3, num_portfolios))
-weights_record = []
-
-# Simulate random portfolios and record progress
-for i in range(num_portfolios):
-    weights = np.random.random(len(asset_classes))
-    weights /= np.sum(weights)
-    weights_record.append(weights)
-
-    portfolio_return = np.dot(weights, mean_returns)
-    portfolio_std = np.sqrt(np.dot(weights.T, np.dot(cov_matrix, weights)))
-    sharpe_ratio = (portfolio_return - risk_free_rate) / portfolio_std
-
-    results[0, i] = portfolio_return
-    results[1, i] = portfolio_std
-    results[2, i] = sharpe_ratio
-
-    # Display progress at the specified interval
-    if (i + 1) % (num_portfolios/100) == 0 or i == num_portfolios - 1:
-        progress_percent = ((i + 1) / num_portfolios) * 100
-        print(f"Progress: {progress_percent:.2f}%")
-
-# Apply minimum return filter
-valid_indices = np.where(results[0] >= min_required_return)
-filtered_results = results[:, valid_indices[0]]
-filtered_weights = [weights_record[i] for i in valid_indices[0]]
-
-# Find the optimal portfolios from filtered results
-highest_sharpe_idx = filtered_results[2].argmax()
-min_variance_idx = filtered_results[1].argmin()
+# 精确求解满足最低收益率约束的最大夏普比率组合与最小方差组合
+max_sharpe_weights = tangency_portfolio(mean_returns, cov_matrix, risk_free_rate, min_return=min_required_return)
+max_sharpe_return, max_sharpe_std, _ = portfolio_performance(max_sharpe_weights, mean_returns, cov_matrix, risk_free_rate)
 
-max_sharpe_return = filtered_results[0, highest_sharpe_idx]
-max_sharpe_std = filtered_results[1, highest_sharpe_idx]
-max_sharpe_weights = filtered_weights[highest_sharpe_idx]
+min_variance_weights = min_variance_portfolio(mean_returns, cov_matrix, min_return=min_required_return)
+min_variance_return, min_variance_std, _ = portfolio_performance(min_variance_weights, mean_returns, cov_matrix, risk_free_rate)
 
-min_variance_return = filtered_results[0, min_variance_idx]
-min_variance_std = filtered_results[1, min_variance_idx]
-min_variance_weights = filtered_weights[min_variance_idx]
+# 完整的有效边界 [收益率, 标准差, 夏普比率]，用于画图
+frontier = efficient_frontier(mean_returns, cov_matrix, num_points=num_frontier_points, risk_free_rate=risk_free_rate)
+results = np.vstack([frontier['returns'], frontier['stds'], frontier['sharpes']])
 
 # Print optimal portfolio information
 print("Optimal Sharpe Portfolio")
@@ -158,11 +134,9 @@ def unique_filename(directory, base_name, extension):
             return full_path
         counter += 1
 
-# Calculate the desired name part
-million_portfolios = (num_portfolios) / 1000000
 # Generate unique filenames
-weights_file = unique_filename(script_path, f"{million_portfolios:.2f}mil_{min_required_return}Return_Random_portfolio_weights", 'txt')
-frontier_image = unique_filename(script_path, f"{million_portfolios:.2f}mil_{min_required_return}Return_Random_efficient_frontier", 'png')
+weights_file = unique_filename(script_path, f"{min_required_return}Return_QP_portfolio_weights", 'txt')
+frontier_image = unique_filename(script_path, f"{min_required_return}Return_QP_efficient_frontier", 'png')
 
 # Saving portfolio weights to a text file
 with open(weights_file, 'w') as file:
@@ -1,6 +1,11 @@
 import numpy as np
 import matplotlib.pyplot as plt
 import os
+import sys
+
+# 共用的退火优化器位于上级目录 金融/
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '../..')))
+from annealing_optimizer import anneal_portfolios
 
 # Hard-coded parameters
 asset_classes = np.array(["AE", "WE,U", "WE,H", "EM", "WLP", "ALP", "ADP", "COM", "GD", "HF", "PE", "AFI", "ILB", "WFI", "AC"])
@@ -67,55 +72,26 @@ initial_temp = 1.0
 cooling_rate = 0.9999
 min_required_return = (1.08 ** 0.25) - 1   # Minimum required return
 
-# Initialize results and weights storage
-results = np.zeros((3, num_iterations * num_portfolios_per_iteration))  # Stores [returns, std_dev, sharpe_ratio]
-weights_record = []
-
-current_weights = np.random.random(len(asset_classes))
-current_weights /= np.sum(current_weights)
-
-for i in range(num_iterations):
-    temp = initial_temp * (cooling_rate ** i)
-    
-    for j in range(num_portfolios_per_iteration):
-        new_weights = np.abs(current_weights + np.random.normal(0, temp, size=len(asset_classes)))
-        new_weights /= np.sum(new_weights)
-        
-        portfolio_return = np.dot(new_weights, mean_returns)
-        portfolio_std = np.sqrt(np.dot(new_weights.T, np.dot(cov_matrix, new_weights)))
-        sharpe_ratio = (portfolio_return - risk_free_rate) / portfolio_std
-
-        index = i * num_portfolios_per_iteration + j
-        results[0, index] = portfolio_return
-        results[1, index] = portfolio_std
-        results[2, index] = sharpe_ratio
-        weights_record.append(new_weights)
-
-        # Update current weights if the new portfolio has a better Sharpe ratio
-        if index == 0 or sharpe_ratio > np.max(results[2, :index]):
-            current_weights = new_weights
-
-    # Output progress periodically
-    if (i + 1) % 100 == 0:
-        print(f"Progress: {(i + 1) / num_iterations * 100 :.2f}%")
-
-# Identify portfolios meeting the minimum required return
-valid_indices = [idx for idx, ret in enumerate(results[0]) if ret >= min_required_return]
-filtered_results = results[:, valid_indices]
-filtered_weights = [weights_record[idx] for idx in valid_indices]
-
-# Identify portfolios with highest Sharpe ratio and minimum variance among filtered results
-if len(filtered_results[0]) > 0:  # Ensure there are valid portfolios
-    highest_sharpe_idx = np.argmax(filtered_results[2])
-    min_variance_idx = np.argmin(filtered_results[1])
-
-    max_sharpe_return = filtered_results[0, highest_sharpe_idx]
-    max_sharpe_std = filtered_results[1, highest_sharpe_idx]
-    max_sharpe_weights = filtered_weights[highest_sharpe_idx]
-
-    min_variance_return = filtered_results[0, min_variance_idx]
-    min_variance_std = filtered_results[1, min_variance_idx]
-    min_variance_weights = filtered_weights[min_variance_idx]
+# 批量退火：每个温度一次评估整批组合，只保留有效边界与抽样组合
+anneal = anneal_portfolios(mean_returns, cov_matrix, risk_free_rate,
+                           num_iterations=num_iterations,
+                           batch_size=num_portfolios_per_iteration,
+                           initial_temp=initial_temp,
+                           cooling_rate=cooling_rate,
+                           min_required_return=min_required_return)
+frontier = anneal['frontier']
+# 用于画图的组合：抽样组合 + 有效边界点
+results = np.hstack([anneal['results'], np.vstack([frontier['returns'], frontier['stds'], frontier['sharpes']])])
+
+# Identify portfolios with highest Sharpe ratio and minimum variance among portfolios meeting the minimum required return
+if anneal['max_sharpe'] is not None:  # Ensure there are valid portfolios
+    max_sharpe_return = anneal['max_sharpe']['return']
+    max_sharpe_std = anneal['max_sharpe']['std']
+    max_sharpe_weights = anneal['max_sharpe']['weights']
+
+    min_variance_return = anneal['min_variance']['return']
+    min_variance_std = anneal['min_variance']['std']
+    min_variance_weights = anneal['min_variance']['weights']
 else:
     print("No portfolios meet the minimum required return.")
     max_sharpe_return = max_sharpe_std = max_sharpe_weights = None
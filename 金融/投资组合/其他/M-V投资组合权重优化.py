@@ -1,5 +1,11 @@
 import numpy as np
 import matplotlib.pyplot as plt
+import os
+import sys
+
+# 共用的有效边界求解器位于上级目录 金融/
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '../..')))
+from efficient_frontier import tangency_portfolio, min_variance_portfolio, efficient_frontier, portfolio_performance
 
 # Hard-coded parameters
 asset_classes = np.array(["AE", "WE,U", "WE,H", "EM", "WLP", "ALP", "ADP", "COM", "GD", "HF", "PE", "AFI", "ILB", "WFI", "AC"])
@@ -58,36 +64,18 @@ cov_matrix = np.array([
 ])
 
 risk_free_rate = 0.0075  # (quarterly) 无风险利率(季度)
-num_portfolios = 999999
-
-# Simulate random portfolios
-results = np.zeros((3,num_portfolios))
-weights_record = []
+num_frontier_points = 200  # 有效边界上求解的点数
 
-for i in range(num_portfolios):
-    weights = np.random.random(len(asset_classes))
-    weights /= np.sum(weights)
-    weights_record.append(weights)
-    
-    portfolio_return = np.dot(weights, mean_returns)
-    portfolio_std = np.sqrt(np.dot(weights.T, np.dot(cov_matrix, weights)))
-    sharpe_ratio = (portfolio_return - risk_free_rate) / portfolio_std
-    
-    results[0,i] = portfolio_return
-    results[1,i] = portfolio_std
-    results[2,i] = sharpe_ratio
-    
-# Find the portfolio with highest Sharpe ratio and minimum variance
-highest_sharpe_idx = results[2].argmax()
-min_variance_idx = results[1].argmin()
+# 精确求解切点组合（最大夏普比率）与最小方差组合
+max_sharpe_weights = tangency_portfolio(mean_returns, cov_matrix, risk_free_rate)
+max_sharpe_return, max_sharpe_std, _ = portfolio_performance(max_sharpe_weights, mean_returns, cov_matrix, risk_free_rate)
 
-max_sharpe_return = results[0, highest_sharpe_idx]
-max_sharpe_std = results[1, highest_sharpe_idx] 
-max_sharpe_weights = weights_record[highest_sharpe_idx]
+min_variance_weights = min_variance_portfolio(mean_returns, cov_matrix)
+min_variance_return, min_variance_std, _ = portfolio_performance(min_variance_weights, mean_returns, cov_matrix, risk_free_rate)
 
-min_variance_return = results[0, min_variance_idx]
-min_variance_std = results[1, min_variance_idx]
-min_variance_weights = weights_record[min_variance_idx]
+# 有效边界上的组合 [收益率, 标准差, 夏普比率]，用于画图
+frontier = efficient_frontier(mean_returns, cov_matrix, num_points=num_frontier_points, risk_free_rate=risk_free_rate)
+results = np.vstack([frontier['returns'], frontier['stds'], frontier['sharpes']])
 
 # Print optimal portfolio information
 print("Optimal Sharpe Portfolio")
@@ -2,12 +2,19 @@ import pandas as pd
 import tensorflow as tf
 import joblib
 import numpy as np
-from sklearn.metrics.pairwise import euclidean_distances
-from tqdm import tqdm
+import os
+import sys
+
+# 共用的历史片段索引、特征库、批量滚动预测和 Excel 缓存读取位于目录 金融/
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '../../..')))
+from pattern_index import PatternIndex
+from feature_store import FeatureStore
+from rolling_forecast import repeated_rolling_predictions
+from excel_cache import read_excel
 
 # 加载数据,跳过前两行
 predicted_data_path = 'predict_data.xlsx'
-df_predict = pd.read_excel(predicted_data_path, header=None, skiprows=2)
+df_predict = read_excel(predicted_data_path, header=None, skiprows=2)
 
 filter_col_indices1 = range(87, 89)  # 基本面-前60%
 filter_col_indices2 = range(84, 86)  # 风险收益-前60%
@@ -41,37 +48,15 @@ model = tf.keras.models.load_model('model/trained_model.h5')
 feature_scaler = joblib.load('model/feature_scaler.gz')
 target_scaler = joblib.load('model/target_scaler.gz')
 
-# 预测函数,重复进行预测并计算平均值
-def repeated_rolling_predictions(data, model, feature_scaler, target_scaler, time_step, days=7, repeats=3):
-    all_avg_predictions = []
-    for _ in range(repeats):
-        predictions = []
-        current_data = data.copy()
-        for _ in range(days):
-            scaled_data = feature_scaler.transform(current_data[-time_step:].reshape(1, -1))
-            scaled_data = scaled_data.reshape(1, time_step, 1)
-            predicted = model.predict(scaled_data)  
-            predicted = target_scaler.inverse_transform(predicted).flatten()[0]
-            predictions.append(predicted)
-
-            current_data = np.append(current_data, predicted)[-time_step:]
-
-        all_avg_predictions.append(np.mean(predictions))
-
-    return np.mean(all_avg_predictions)
-
-# 对每一行数据进行预测
-results = []
-for index, (code, name, row) in enumerate(zip(stock_codes, stock_names, df_predict.values)):
-    print(f"正在进行第 {index + 1} 行数据的预测: {code} {name}")
-
-    # 检查行数据长度
-    if len(row) < 40:
-        print(f"跳过 {code} 的预测,因为数据长度不足40。")
-        continue
-
-    final_avg_prediction = repeated_rolling_predictions(row, model, feature_scaler, target_scaler, time_step=40, days=7, repeats=3)
-    results.append((code, name, final_avg_prediction))
+# 全部股票的窗口一起滚动预测,每个预测日只调用一次模型
+time_step = 40
+if df_predict.shape[1] < time_step:
+    print(f"跳过预测,因为数据长度不足{time_step}。")
+    final_avg_predictions = np.full(len(stock_codes), np.nan)
+else:
+    print(f"正在对 {len(stock_codes)} 支股票进行批量预测")
+    final_avg_predictions = repeated_rolling_predictions(df_predict.values, model, feature_scaler, target_scaler, time_step=time_step, days=7, repeats=3)
+results = list(zip(stock_codes, stock_names, final_avg_predictions))
 
 # 过滤掉任何包含NaN的预测结果  
 results = [(code, name, prediction) for code, name, prediction in results if not np.isnan(prediction)]
@@ -81,43 +66,28 @@ results.sort(key=lambda x: x[2], reverse=True)
 # 将预测结果保存为字典
 predict_dict = {code: prediction for code, name, prediction in results}
 
-# 读取历史数据
-df_history = pd.read_csv('train_cleaned_stock_data.csv', header=None)
-
 # 定义窗口大小和预测天数
 window_size = 30
 next_7_days = 7
 
-# 预计算所有30日片段的特征向量
-feature_vectors = []  
-return_values = []
-
-print("Calculating feature vectors...")
-for _, history_data in tqdm(df_history.iterrows(), total=df_history.shape[0]):
-    for start_index in range(len(history_data) - window_size - next_7_days + 1):
-        window_data = history_data[start_index : start_index + window_size]
-        feature_vectors.append(window_data.values)
-
-        next_7_days_data = history_data[start_index + window_size : start_index + window_size + next_7_days]
-        if next_7_days_data.iloc[0] != 0:
-            total_return = (next_7_days_data.iloc[-1] - next_7_days_data.iloc[0]) / next_7_days_data.iloc[0]
-        else:
-            total_return = np.nan
-        return_values.append(total_return)
-
-print("Feature vector calculation completed.")
+# 由 模型构建.py 写入的特征库建立历史30日片段索引（新交易日只追加新的片段，已有片段直接内存映射）
+print("Building pattern index...")
+pattern_index = PatternIndex.from_store(FeatureStore('feature_store'), window_size, next_7_days)
+print("Pattern index ready.")
 
 # 对每支股票,找到与其最近30天走势最接近的10段历史30天片段,并计算这10段历史片段之后7天的总收益率 
+# 一次批量查询全部股票
+latest_windows = df_predict.values[:, -window_size:].astype(float)
+match_distances, match_indices = pattern_index.query(latest_windows, k=10)
+
 pattern_results = []
 for i, (code, name, predict_data) in enumerate(zip(stock_codes, stock_names, df_predict.values)):
     print(f"Processing stock {i + 1}/{len(stock_codes)}: {code} {name}")
 
     latest_30_days = predict_data[-window_size:]
-    distances = euclidean_distances([latest_30_days], feature_vectors)[0]
-
-    top_10_indices = distances.argsort()[:10]
-    top_10_distances = distances[top_10_indices] 
-    top_10_returns = [return_values[i] for i in top_10_indices]
+    top_10_indices = match_indices[i]
+    top_10_distances = match_distances[i]
+    top_10_returns = pattern_index.returns[top_10_indices]
 
     avg_total_return = np.nanmean(top_10_returns)
 
@@ -2,6 +2,13 @@ import pandas as pd
 from tensorflow.keras.models import load_model
 import joblib
 import numpy as np
+import os
+import sys
+
+# 共用的批量滚动预测和 Excel 缓存读取位于目录 金融/
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '../../..')))
+from rolling_forecast import repeated_rolling_predictions
+from excel_cache import read_excel
 
 '''
 1. 跳过前两行读取
@@ -15,7 +22,7 @@ import numpy as np
 
 # 加载数据，跳过前两行
 predicted_data_path = 'predict_data.xlsx'
-df = pd.read_excel(predicted_data_path, header=None, skiprows=2)
+df = read_excel(predicted_data_path, header=None, skiprows=2)
 
 filter_col_indices1 = range(87, 89)  # 基本面-前60%
 filter_col_indices2 = range(84, 86)  # 风险收益-前60%
@@ -51,37 +58,15 @@ feature_scaler = joblib.load('model/feature_scaler.gz')
 target_scaler = joblib.load('model/target_scaler.gz')
 
 
-# 预测函数，重复进行预测并计算平均值
-def repeated_rolling_predictions(data, model, feature_scaler, target_scaler, time_step, days=7, repeats=3):
-    all_avg_predictions = []
-    for _ in range(repeats):
-        predictions = []
-        current_data = data.copy()
-        for _ in range(days):
-            scaled_data = feature_scaler.transform(current_data[-time_step:].reshape(1, -1))
-            scaled_data = scaled_data.reshape(1, time_step, 1)
-            predicted = model.predict(scaled_data)
-            predicted = target_scaler.inverse_transform(predicted).flatten()[0]
-            predictions.append(predicted)
-
-            current_data = np.append(current_data, predicted)[-time_step:]
-
-        all_avg_predictions.append(np.mean(predictions))
-    
-    return np.mean(all_avg_predictions)
-
-# 对每一行数据进行预测
-results = []
-for index, (code, name, row) in enumerate(zip(stock_codes, stock_names, df.values)):
-    print(f"正在进行第 {index + 1} 行数据的预测: {code} {name}")
-
-    # 检查行数据长度
-    if len(row) < 40:
-        print(f"跳过 {code} 的预测，因为数据长度不足40。")
-        continue
-
-    final_avg_prediction = repeated_rolling_predictions(row, model, feature_scaler, target_scaler, time_step=40, days=7, repeats=3)
-    results.append((code, name, final_avg_prediction))
+# 全部股票的窗口一起滚动预测，每个预测日只调用一次模型
+time_step = 40
+if df.shape[1] < time_step:
+    print(f"跳过预测，因为数据长度不足{time_step}。")
+    final_avg_predictions = np.full(len(stock_codes), np.nan)
+else:
+    print(f"正在对 {len(stock_codes)} 支股票进行批量预测")
+    final_avg_predictions = repeated_rolling_predictions(df.values, model, feature_scaler, target_scaler, time_step=time_step, days=7, repeats=3)
+results = list(zip(stock_codes, stock_names, final_avg_predictions))
 
 
 # 过滤掉任何包含NaN的预测结果
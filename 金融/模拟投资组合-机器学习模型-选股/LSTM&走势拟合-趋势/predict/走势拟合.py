@@ -1,37 +1,26 @@
 import pandas as pd
 import numpy as np
-from sklearn.metrics.pairwise import euclidean_distances
-from tqdm import tqdm  # 用于显示进度条
+import os
+import sys
 
-# 读取历史数据
-df_history = pd.read_csv('train_cleaned_stock_data.csv', header=None)
+# 共用的历史片段索引、特征库和 Excel 缓存读取位于目录 金融/
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '../../..')))
+from pattern_index import PatternIndex
+from feature_store import FeatureStore
+from excel_cache import read_excel
 
 # 定义窗口大小和预测天数
 window_size = 30
 next_7_days = 7
 
-# 预计算所有30日片段的特征向量
-feature_vectors = []
-return_values = []
-
-print("Calculating feature vectors...")
-for _, history_data in tqdm(df_history.iterrows(), total=df_history.shape[0]):
-    for start_index in range(len(history_data) - window_size - next_7_days + 1):
-        window_data = history_data[start_index : start_index + window_size]
-        feature_vectors.append(window_data.values)
-        
-        next_7_days_data = history_data[start_index + window_size : start_index + window_size + next_7_days]
-        if next_7_days_data.iloc[0] != 0:
-            total_return = (next_7_days_data.iloc[-1] - next_7_days_data.iloc[0]) / next_7_days_data.iloc[0]
-        else:
-            total_return = np.nan
-        return_values.append(total_return)
-
-print("Feature vector calculation completed.")
+# 由 模型构建.py 写入的特征库建立历史30日片段索引（新交易日只追加新的片段，已有片段直接内存映射）
+print("Building pattern index...")
+pattern_index = PatternIndex.from_store(FeatureStore('feature_store'), window_size, next_7_days)
+print("Pattern index ready.")
 
 # 读取并处理predict_data.xlsx中的数据
 predicted_data_path = 'predict_data.xlsx'
-df_predict = pd.read_excel(predicted_data_path, header=None, skiprows=2)
+df_predict = read_excel(predicted_data_path, header=None, skiprows=2)
 
 # 筛选个股
 filter_col_indices1 = range(87, 89)  # 基本面-前60%
@@ -61,24 +50,23 @@ df_predict = df_predict.loc[:, (df_predict != 0).any(axis=0)]
 # 反转数据顺序,使其从旧到新
 df_predict = df_predict.apply(lambda row: row[::-1], axis=1)
 
-# 读取train_cleaned_stock_data.csv中的历史数据
-df_history = pd.read_csv('train_cleaned_stock_data.csv', header=None)
-
 # 定义窗口大小
 window_size = 30
 next_7_days = 7
 
 # 对每支股票,找到与其最近30天走势最接近的10段历史30天片段,并计算这10段历史片段之后7天的总收益率
+# 一次批量查询全部股票
+latest_windows = df_predict.values[:, -window_size:].astype(float)
+match_distances, match_indices = pattern_index.query(latest_windows, k=10)
+
 results = []
 for i, (code, name, predict_data) in enumerate(zip(stock_codes, stock_names, df_predict.values)):
     print(f"Processing stock {i + 1}/{len(stock_codes)}: {code} {name}")
-    
+
     latest_30_days = predict_data[-window_size:]
-    distances = euclidean_distances([latest_30_days], feature_vectors)[0]
-    
-    top_10_indices = distances.argsort()[:10]
-    top_10_distances = distances[top_10_indices]
-    top_10_returns = [return_values[i] for i in top_10_indices]
+    top_10_indices = match_indices[i]
+    top_10_distances = match_distances[i]
+    top_10_returns = pattern_index.returns[top_10_indices]
     
     avg_total_return = np.nanmean(top_10_returns)
     
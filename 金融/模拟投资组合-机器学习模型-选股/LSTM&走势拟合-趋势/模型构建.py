@@ -7,13 +7,22 @@ from tensorflow.keras.layers import LSTM, Dense, Dropout, BatchNormalization
 from tensorflow.keras.callbacks import EarlyStopping, ModelCheckpoint
 from sklearn.model_selection import train_test_split
 from sklearn.metrics import mean_squared_error
+import os
+import sys
+
+# 共用的特征库和 Excel 缓存读取位于目录 金融/，滑动窗口数据集构建位于目录 通用机器学习/
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '../..')))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '../../../通用机器学习')))
+from feature_store import FeatureStore
+from window_dataset import build_dataset
+from excel_cache import read_excel
 
 # 数据和模型配置
 file_path = 'train_stock_data.xlsx'
-cleaned_file_path = 'train_cleaned_stock_data.csv'
 model_file_path = "model/trained_model.h5"
 feature_scaler_file = 'model/feature_scaler.gz'
 target_scaler_file = 'model/target_scaler.gz'
+feature_store_dir = 'feature_store'
 time_step = 40
 test_size = 0.1
 batch_size = 64
@@ -30,38 +39,37 @@ dense_units_3 = 8
 dense_units_4 = 1
 
 # 第一部分：数据加载和预处理
-# 加载数据，跳过前2行和前2列，并忽略列名
-df = pd.read_excel(file_path, skiprows=2, header=None, usecols=lambda column: column not in [0, 1])
+# 加载数据，前2行为表头（第1行为交易日期），前2列为股票代码和名称
+raw = read_excel(file_path, header=None)
+stock_codes = raw.iloc[2:, 0].values
+trade_dates = raw.iloc[0, 2:]
+df = raw.iloc[2:, 2:].apply(pd.to_numeric, errors='coerce')
 
 # 删除全为0的列
-df = df.loc[:, (df != 0).any(axis=0)]
+nonzero_columns = (df != 0).any(axis=0)
+df = df.loc[:, nonzero_columns]
+trade_dates = trade_dates[nonzero_columns]
 
 # 反转数据顺序，使其从旧到新
 df = df.apply(lambda row: row[::-1], axis=1)
 
-# 数据预处理 - 归一化
-scaler = MinMaxScaler(feature_range=(0, 1))
-scaled_data = scaler.fit_transform(df)
-
-# 保存归一化后的数据
-pd.DataFrame(scaled_data).to_csv(cleaned_file_path, index=False, header=False)
+# 写入特征库：只追加库中还没有的交易日，走势拟合脚本直接从特征库读取
+# 第1行应为各列的交易日期；有缺失或重复时（如合并单元格的标题行）无法按交易日增量更新，改用列序号并整体重建
+date_labels = trade_dates.values[::-1]
+dates_valid = not pd.isna(date_labels).any() and len(set(map(str, date_labels))) == len(date_labels)
+if not dates_valid:
+    print("警告: 第1行的交易日期有缺失或重复，按列序号整体重建特征库")
+    date_labels = [f"#{i}" for i in range(len(date_labels))]
+store = FeatureStore(feature_store_dir)
+new_days = store.update(stock_codes, date_labels, df.values, rebuild=not dates_valid)
+print(f"特征库新增 {new_days} 个交易日，共 {store.num_days} 个交易日")
 
 # 第二部分：模型训练
-# 加载清洗后的数据
-df_cleaned = pd.read_csv(cleaned_file_path)
-df_cleaned = df_cleaned.apply(lambda row: row[::-1], axis=1)
-df_cleaned = df_cleaned.apply(lambda row: row.dropna().reset_index(drop=True), axis=1)
-
-# 数据集构建函数
-def create_dataset(dataframe, time_step):
-    X_data, y_data = [], []
-    for index, row in dataframe.iterrows():
-        for i in range(len(row) - time_step):
-            X_data.append(row[i:(i + time_step)].values)
-            y_data.append(row[i + time_step])
-    return np.array(X_data), np.array(y_data)
-
-X, y = create_dataset(df_cleaned, time_step)
+# 按交易日归一化后的数据直接由特征库计算（与对整表做 MinMaxScaler 相同），不再写出再读回清洗后的CSV
+scaled_data = store.scaled().T
+
+# 数据集构建：每行反转顺序并去掉缺失值后，用滑动窗口视图一次性生成全部窗口（不含缺失值的窗口）
+X, y = build_dataset(scaled_data[:, ::-1], time_step, dropna=True)
 
 # 归一化处理
 feature_scaler = MinMaxScaler(feature_range=(0, 1))
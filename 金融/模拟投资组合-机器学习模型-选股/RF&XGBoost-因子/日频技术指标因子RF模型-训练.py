@@ -1,14 +1,19 @@
+import os
+import sys
+from functools import partial
 import pandas as pd
 from sklearn.ensemble import RandomForestRegressor
 from sklearn.model_selection import train_test_split
 from sklearn.metrics import mean_squared_error
 import joblib
-from skopt import BayesSearchCV
-from skopt.callbacks import VerboseCallback
-from skopt.utils import use_named_args
+
+# 共用的超参数搜索模块和 Excel 缓存读取位于目录 金融/
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '../..')))
+from hyperparam_search import cache_arrays, run_search
+from excel_cache import read_excel
 
 # 读取数据
-train_df = pd.read_excel('日频技术指标因子数据-训练.xlsx')
+train_df = read_excel('日频技术指标因子数据-训练.xlsx')
 
 # 数据预处理
 # 获取特征和目标
@@ -30,41 +35,16 @@ param_space = {
     'min_weight_fraction_leaf': (0.0, 0.2)  # 叶子节点所需的最小权重分数
 }
 
-# 自定义早停机制
-class CustomEarlyStopper:
-    def __init__(self, no_improvement_stop):
-        self.no_improvement_stop = no_improvement_stop
-        self.best_score = None
-        self.counter = 0
-
-    def __call__(self, result):
-        current_score = result.func_vals[-1]
-        if self.best_score is None or current_score < self.best_score:
-            self.best_score = current_score
-            self.counter = 0
-        else:
-            self.counter += 1
-        if self.counter >= self.no_improvement_stop:
-            print("No improvement for {} iterations, stopping search.".format(self.no_improvement_stop))
-            return True
-
-# 训练随机森林模型并进行贝叶斯优化
-rf_model = RandomForestRegressor(random_state=42)
-bayes_search = BayesSearchCV(estimator=rf_model, search_spaces=param_space, 
-                             n_iter=100, cv=3, n_jobs=-1, verbose=2, scoring='neg_mean_squared_error', random_state=42)
-
-# 自定义早停机制实例
-early_stopper = CustomEarlyStopper(no_improvement_stop=5)
-verbose_callback = VerboseCallback(n_total=100)
+# 训练数组缓存为 .npy，各并行试验以内存映射方式共享
+data_paths = cache_arrays('rf_search_cache', '日频技术指标因子数据-训练.xlsx',
+                          lambda: {'X': X_train_part.values, 'y': y_train_part.values})
 
-# 执行贝叶斯优化
-try:
-    bayes_search.fit(X_train_part, y_train_part, callback=[early_stopper, verbose_callback])
-except StopIteration:
-    print("Early stopping triggered, finishing search.")
+# 训练随机森林模型并进行贝叶斯优化：并行评估，每个试验写入 rf_search_trials.jsonl，中断后重新运行可续跑；
+# 连续5个试验没有改进时停止，第一折明显较差的试验不再跑剩余折
+best_params, trials = run_search(partial(RandomForestRegressor, random_state=42), param_space, data_paths,
+                                 'rf_search_trials.jsonl', n_iter=100, cv=3, n_jobs=-1, no_improvement_stop=5)
 
 # 输出最佳参数
-best_params = bayes_search.best_params_
 print(f'最佳参数组合: {best_params}')
 
 # 使用最佳参数重新训练模型
@@ -1,13 +1,19 @@
+import os
+import sys
+from functools import partial
 import pandas as pd
 from xgboost import XGBRegressor
 from sklearn.model_selection import train_test_split
 from sklearn.metrics import mean_squared_error
 import joblib
-from skopt import BayesSearchCV
-from skopt.callbacks import VerboseCallback
+
+# 共用的超参数搜索模块和 Excel 缓存读取位于目录 金融/
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '../..')))
+from hyperparam_search import cache_arrays, run_search, xgb_eval_mse
+from excel_cache import read_excel
 
 # 读取数据
-train_df = pd.read_excel('日频技术指标因子数据-训练.xlsx')
+train_df = read_excel('日频技术指标因子数据-训练.xlsx')
 
 # 数据预处理
 # 获取特征和目标
@@ -28,47 +34,26 @@ param_space = {
     'n_estimators': (100, 10000),             # 树的数量
 }
 
-# 自定义早停机制
-class CustomEarlyStopper:
-    def __init__(self, no_improvement_stop):
-        self.no_improvement_stop = no_improvement_stop
-        self.best_score = None
-        self.counter = 0
-
-    def __call__(self, result):
-        current_score = result.func_vals[-1]
-        if self.best_score is None or current_score < self.best_score:
-            self.best_score = current_score
-            self.counter = 0
-        else:
-            self.counter += 1
-        if self.counter >= self.no_improvement_stop:
-            print("No improvement for {} iterations, stopping search.".format(self.no_improvement_stop))
-            return True
+# 训练数组和验证集缓存为 .npy，各并行试验以内存映射方式共享
+data_paths = cache_arrays('xgboost_search_cache', '日频技术指标因子数据-训练.xlsx',
+                          lambda: {'X': X_train_part.values, 'y': y_train_part.values,
+                                   'X_val': X_val_part.values, 'y_val': y_val_part.values})
 
-# 训练XGBoost模型并进行贝叶斯优化
-xgb_model = XGBRegressor(objective='reg:squarederror', random_state=42, eval_metric='rmse', early_stopping_rounds=10)
 
-bayes_search = BayesSearchCV(estimator=xgb_model, search_spaces=param_space, 
-                             n_iter=100, cv=3, n_jobs=-1, verbose=2, scoring='neg_mean_squared_error', random_state=42)
+def validation_fit_params(arrays):
+    return {"eval_set": [(arrays['X_val'], arrays['y_val'])], "verbose": False}
 
-# 自定义早停机制实例
-early_stopper = CustomEarlyStopper(no_improvement_stop=5)
-verbose_callback = VerboseCallback(n_total=100)
-
-# 执行贝叶斯优化
-fit_params = {
-    "eval_set": [(X_val_part, y_val_part)],
-    "verbose": True,
-}
 
-try:
-    bayes_search.fit(X_train_part, y_train_part, callback=[early_stopper, verbose_callback], **fit_params)
-except StopIteration:
-    print("Early stopping triggered, finishing search.")
+# 训练XGBoost模型并进行贝叶斯优化：并行评估，每个试验写入 xgboost_search_trials.jsonl，中断后重新运行可续跑；
+# 连续5个试验没有改进时停止；第一折在验证集上的评估历史明显较差的试验不再跑剩余折。
+# 试验之间已经并行，单个模型只用一个线程
+xgb_model = partial(XGBRegressor, objective='reg:squarederror', random_state=42, eval_metric='rmse',
+                    early_stopping_rounds=10, n_jobs=1)
+best_params, trials = run_search(xgb_model, param_space, data_paths, 'xgboost_search_trials.jsonl',
+                                 n_iter=100, cv=3, n_jobs=-1, fit_params=validation_fit_params,
+                                 prune_metric=xgb_eval_mse, no_improvement_stop=5)
 
 # 输出最佳参数
-best_params = bayes_search.best_params_
 print(f'最佳参数组合: {best_params}')
 
 # 使用最佳参数重新训练模型
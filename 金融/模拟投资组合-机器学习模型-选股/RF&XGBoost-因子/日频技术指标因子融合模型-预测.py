@@ -1,9 +1,15 @@
 import pandas as pd
 import joblib
 import numpy as np
+import os
+import sys
+
+# 共用的 Excel 缓存读取位于目录 金融/
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '../..')))
+from excel_cache import read_excel
 
 # 读取数据
-predict_df = pd.read_excel('日频技术指标因子数据-预测.xlsx')
+predict_df = read_excel('日频技术指标因子数据-预测.xlsx')
 
 # 保存股票代码和股票名称
 stock_info = predict_df.iloc[:, :2]  # 前两列是股票代码和股票名称
@@ -1,12 +1,18 @@
 import pandas as pd
+import os
+import sys
+
+# 共用的 Excel 缓存读取位于上级目录 金融/
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')))
+from excel_cache import read_excel
 
 # 读取第一个 Excel 文件
 file1 = 'RF&XGBoost因子-预测结果.xlsx'
-df1 = pd.read_excel(file1)
+df1 = read_excel(file1)
 
 # 读取第二个 Excel 文件
 file2 = 'LSTM-预测结果.xlsx'
-df2 = pd.read_excel(file2)
+df2 = read_excel(file2)
 
 # 提取股票名称和位置
 df1['原始位置'] = df1.index
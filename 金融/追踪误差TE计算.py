@@ -1,8 +1,10 @@
 import pandas as pd
 import numpy as np
+from excel_cache import read_excel
+import risk_metrics
 
 # 读取Excel文件中的Qtr Returns表，跳过前两行并忽略第一列和最后一列
-df = pd.read_excel('FINM3008 - Assignment Analysis S1 2024.xlsx', sheet_name='Qtr Returns', skiprows=2, usecols="B:P")
+df = read_excel('FINM3008 - Assignment Analysis S1 2024.xlsx', sheet_name='Qtr Returns', skiprows=2, usecols="B:P")
 # 打印列名以确认数据帧的结构
 print(df.columns)
 # 移除包含缺失值的行
@@ -50,11 +52,10 @@ benchmark_weights = np.array([
 ])
 
 # 计算两个投资组合每一期的预期回报
-benchmark_returns = df.dot(benchmark_weights)
-current_returns = df.dot(current_weights)
+benchmark_returns = df.values @ benchmark_weights
+current_returns = df.values @ current_weights
 
 # 计算Tracking Error
-differences = current_returns - benchmark_returns
-tracking_error = np.sqrt(np.mean(differences**2))
+tracking_error = risk_metrics.tracking_error(current_returns, benchmark_returns)
 
 print(f"Tracking Error: {100*tracking_error:.4f}{'%'}")
@@ -7,6 +7,11 @@ from tensorflow.keras.layers import LSTM, Dropout, Dense, Input, Concatenate
 from tensorflow.keras.callbacks import ModelCheckpoint, ReduceLROnPlateau
 from tensorflow.keras.utils import Sequence
 import joblib
+import sys
+
+# 共用的滑动窗口数据集构建位于目录 通用机器学习/
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '../../通用机器学习')))
+from window_dataset import sliding_windows
 
 # === 可调整参数 ===
 sequence_length = 32
@@ -31,42 +36,34 @@ encoded_notes = onehot_encoder.fit_transform(df['note/chord_encoded'].values.res
 scaler = MinMaxScaler()
 df[['offset', 'duration', 'velocity']] = scaler.fit_transform(df[['offset', 'duration', 'velocity']])
 
+# 音符独热编码与 offset/duration/velocity 拼成一个特征矩阵
+features = np.hstack([encoded_notes, df[['offset', 'duration', 'velocity']].values.astype(np.float32)])
+
 split_index = int(len(df) * (1 - test_size))
-train_data = df[:split_index]
-test_data = df[split_index:]
+train_data = features[:split_index]
+test_data = features[split_index:]
 
 # === 修改数据生成器 ===
 class DataGenerator(Sequence):
-    def __init__(self, df, batch_size=64, sequence_length=32, shuffle=True):
-        self.df = df
+    def __init__(self, data, batch_size=64, sequence_length=32, shuffle=True):
         self.batch_size = batch_size
         self.sequence_length = sequence_length
         self.shuffle = shuffle
-        self.indexes = np.arange(len(df) - sequence_length + 1)  # 调整索引以防越界
+        # 目标为窗口的最后一步，X、y 都是 data 上的滑动窗口视图，不复制数据
+        self.X, self.y = sliding_windows(data, sequence_length, horizon=0)
+        self.indexes = np.arange(len(self.X))
         if self.shuffle:
             np.random.shuffle(self.indexes)
 
     def __len__(self):
-        return int(np.floor((len(self.df) - self.sequence_length + 1) / self.batch_size))
+        return len(self.X) // self.batch_size
 
     def __getitem__(self, index):
         indexes = self.indexes[index * self.batch_size:(index + 1) * self.batch_size]
-
-        X = np.empty((self.batch_size, self.sequence_length, encoded_notes.shape[1] + 3), dtype=np.float32)
-        y = np.empty((self.batch_size, encoded_notes.shape[1] + 3), dtype=np.float32)
-
-        for i, idx in enumerate(indexes):
-            X[i, :, :-3] = encoded_notes[idx: idx + self.sequence_length]
-            X[i, :, -3:] = self.df.iloc[idx: idx + self.sequence_length, :][['offset', 'duration', 'velocity']].values  # 使用 iloc 而不是 loc
-
-            y_notes = encoded_notes[idx + self.sequence_length - 1]  # 调整索引
-            y_others = self.df.iloc[idx + self.sequence_length - 1, :][['offset', 'duration', 'velocity']].values
-            y[i] = np.concatenate([y_notes, y_others])
-
-        return X, y
+        # 只在取批次时复制这一批窗口
+        return self.X[indexes], self.y[indexes]
 
     def on_epoch_end(self):
-        self.indexes = np.arange(len(self.df) - self.sequence_length)
         if self.shuffle:
             np.random.shuffle(self.indexes)
 